@@ -1,36 +1,57 @@
 import os
-from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, BackgroundTasks, Body
+import re
+import sys
+import asyncio
+from contextlib import asynccontextmanager
+import hashlib
+import logging
+import heapq
+import itertools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Dict, Any, Set, Tuple, Union
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, BackgroundTasks, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from pydantic import BaseModel
 import uvicorn
 from datetime import datetime
-import json
+import orjson
 import uuid
-import requests
-from dotenv import load_dotenv
+import httpx
 from pathlib import Path
-import tempfile
-import shutil
+from urllib.parse import quote
 import random
+import shutil
+import tempfile
+import numpy as np
 
 # Import services
 try:
-    from services.pdf_service import extract_text_from_pdf, extract_with_pdfplumber
+    from services.pdf_service import PDF_HEADER_SEARCH_BYTES, extract_text_from_pdf, extract_with_pdfplumber, looks_like_pdf
 except ImportError:
     # Create a fallback if PyMuPDF is not installed
+    PDF_HEADER_SEARCH_BYTES = 1024
+    def looks_like_pdf(head):
+        return b"%PDF-" in head[:PDF_HEADER_SEARCH_BYTES]
     def extract_text_from_pdf(file_path):
         return "This is mock text extracted from a PDF. PyMuPDF (fitz) is not installed."
     def extract_with_pdfplumber(file_path):
         return "This is mock text extracted from a PDF. pdfplumber is not installed."
 
+from services.config_service import load_env
 from services.llm_service import get_resume_summary
-from services.embedding_service import get_embedding, calculate_similarity
+from services.embedding_service import EMBEDDING_BATCH_SIZE, EMBEDDING_INT8, get_embedding, get_embeddings, calculate_similarity
 from services.storage_service import upload_to_storage, get_download_url, LOCAL_STORAGE_DIR
 from services.database_service import save_resume_to_db, get_resumes, search_resumes
-from services.claude_service import analyze_resume_with_regex
+from services.claude_service import analyze_resume_with_regex, analyze_resume_with_regex_fallback, REGEX_FALLBACK_SOURCE
 from services.openrouter_service import get_relevance_score_with_openrouter
+from services.cache_service import LRUCache, SemanticCache
+from services.batch_service import AsyncBatcher
+from services.vector_index import EmbeddingMatrix
 
 # Import OpenRouter service for Mistral 7B
 try:
@@ -39,44 +60,200 @@ try:
 except ImportError:
     OPENROUTER_API_AVAILABLE = False
     # Create fallback functions
-    def analyze_resume_with_openrouter(text):
-        return analyze_resume_with_regex(text)
-    def get_openrouter_model_status():
+    async def analyze_resume_with_openrouter(text, fallback_to_mock=True, client=None):
+        return analyze_resume_with_regex_fallback(text)
+    async def get_openrouter_model_status(fallback_to_mock=True, client=None):
         return {"status": "unavailable", "message": "OpenRouter service not installed", "using_fallback": True}
 
 # Try to import offline Mistral (this might not be available on all systems)
 try:
-    from services.mistral_offline import analyze_resume_with_mistral_offline, is_mistral_model_available, preload_model
+    from services.mistral_offline import analyze_resume_with_mistral_offline, is_mistral_model_available, is_mistral_model_downloaded, preload_model
     OFFLINE_MISTRAL_AVAILABLE = True
 except ImportError:
     OFFLINE_MISTRAL_AVAILABLE = False
     # Create fallback functions
     def analyze_resume_with_mistral_offline(text):
-        return analyze_resume_with_regex(text)
+        return analyze_resume_with_regex_fallback(text)
     def is_mistral_model_available():
         return False
+    def is_mistral_model_downloaded():
+        return False
+    def preload_model():
+        return None
 
 # Import local LLM service
 try:
-    from services.llama_cpp_service import analyze_resume_with_llama_cpp, download_model, is_llama_cpp_available
+    from services.llama_cpp_service import analyze_resume_with_llama_cpp, analyze_resumes_batch, download_model, is_llama_cpp_available, is_llama_cpp_model_downloaded, preload_llm
     LLAMA_CPP_AVAILABLE = True
 except ImportError:
     LLAMA_CPP_AVAILABLE = False
     # Create fallback functions
     def analyze_resume_with_llama_cpp(text):
-        return analyze_resume_with_regex(text)
+        return analyze_resume_with_regex_fallback(text)
+    def analyze_resumes_batch(texts):
+        return [analyze_resume_with_regex_fallback(text) for text in texts]
     def is_llama_cpp_available():
         return False
     def download_model(url=None):
         return None
+    def is_llama_cpp_model_downloaded():
+        return False
+    def preload_llm():
+        return False
 
 # Load environment variables
-load_dotenv()
+load_env()
+
+# Request-level detail (text samples, per-resume listings) is logged at DEBUG; set LOG_LEVEL=DEBUG locally
+logger = logging.getLogger("resumatch")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 
 # Get the desired analyzer mode from environment
 ANALYZER_MODE = os.getenv("ANALYZER_MODE", "auto").lower()  # "auto", "api", "offline", "regex", "llama_cpp"
 
-app = FastAPI(title="ResuMatch API", description="API for ResuMatch Resume Selection App")
+# Cap concurrent local (llama.cpp / offline) inference; these models are CPU/RAM heavy
+# and the llama.cpp instance is shared, so by default only one inference runs at a time
+LOCAL_INFERENCE_CONCURRENCY = int(os.getenv("LOCAL_INFERENCE_CONCURRENCY", "1"))
+LOCAL_INFERENCE_SEMAPHORE = asyncio.Semaphore(LOCAL_INFERENCE_CONCURRENCY)
+
+async def run_llama_cpp_batch(resume_texts: List[str]) -> List[Dict[str, Any]]:
+    """Run a batch of llama.cpp analyses in a worker thread, holding the local inference slot"""
+    async with LOCAL_INFERENCE_SEMAPHORE:
+        return await asyncio.to_thread(analyze_resumes_batch, resume_texts)
+
+# Concurrent llama.cpp analyze requests arriving within 20 ms are grouped into one batch
+LLAMA_CPP_BATCHER = AsyncBatcher(run_llama_cpp_batch, max_batch=8, max_wait_ms=20)
+
+# Regex analysis is pure-Python CPU work, so concurrent uploads (e.g. the bulk upload script) run
+# it in worker processes rather than queueing on the GIL in threads. 0 keeps it on a thread, as
+# does any environment that can't start worker processes (e.g. AWS Lambda, which has no /dev/shm).
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(min(4, os.cpu_count() or 1))))
+_analysis_pool: Optional[ProcessPoolExecutor] = None
+_analysis_pool_unavailable = False
+
+def get_analysis_pool() -> ProcessPoolExecutor:
+    """Process pool for regex analysis, started on first use ("spawn", since the server is threaded)"""
+    global _analysis_pool
+    if _analysis_pool is None:
+        _analysis_pool = ProcessPoolExecutor(
+            max_workers=ANALYSIS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _analysis_pool
+
+async def run_regex_analysis(resume_text: str) -> Dict[str, Any]:
+    """Run analyze_resume_with_regex in the analysis pool, falling back to a thread when processes are unavailable"""
+    global _analysis_pool, _analysis_pool_unavailable
+    if ANALYSIS_WORKERS > 0 and not _analysis_pool_unavailable:
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(get_analysis_pool(), analyze_resume_with_regex, resume_text)
+        except BrokenProcessPool as e:
+            # A worker died; start a fresh pool next time and analyze this resume in a thread
+            logger.warning("Analysis process pool broke, analyzing in a thread: %s", e)
+            _analysis_pool = None
+        except (OSError, NotImplementedError) as e:
+            # No process support here (e.g. no /dev/shm for semaphores), so stop trying
+            logger.warning("Analysis process pool unavailable, analyzing in threads: %s", e)
+            _analysis_pool_unavailable = True
+            _analysis_pool = None
+    return await asyncio.to_thread(analyze_resume_with_regex, resume_text)
+
+# Uploads are streamed to disk in chunks of this size instead of being read into memory at once
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MB
+
+def copy_upload(src, dest) -> None:
+    """
+    Copy an upload's spooled file into an open binary file in UPLOAD_CHUNK_SIZE chunks
+    
+    Runs in a worker thread: one thread hop per upload instead of one per chunk read and write.
+    
+    Args:
+        src: The UploadFile's underlying file object
+        dest: Destination file opened for binary writing
+    """
+    src.seek(0)
+    shutil.copyfileobj(src, dest, UPLOAD_CHUNK_SIZE)
+
+def save_upload(src, path: Path) -> None:
+    """Copy an upload's spooled file to path"""
+    with open(path, "wb") as dest:
+        copy_upload(src, dest)
+
+def save_upload_to_temp(src, suffix: str) -> str:
+    """Copy an upload's spooled file to a new temporary file and return its path"""
+    with tempfile.NamedTemporaryFile("wb", delete=False, suffix=suffix) as dest:
+        copy_upload(src, dest)
+        return dest.name
+
+# Largest body accepted by /api/resumes/upload-stream, which bypasses the multipart parser's limits
+MAX_STREAM_UPLOAD_BYTES = int(os.getenv("MAX_STREAM_UPLOAD_BYTES", str(20 << 20)))  # 20 MB
+
+def discard_upload(dest, path: Path) -> None:
+    """Close and delete a partially written or rejected upload"""
+    dest.close()
+    path.unlink(missing_ok=True)
+
+# PDFs smaller than this are extracted straight from memory instead of via a temporary file
+IN_MEMORY_PDF_LIMIT = 5 << 20  # 5 MB
+
+async def warm_local_models(ready: asyncio.Event):
+    """
+    Load local model weights in the background so the first analysis doesn't pay the cold start
+    
+    Args:
+        ready: Set once warm-up has finished (successfully or not)
+    """
+    # In auto mode only preload weights that are already on disk rather than downloading at boot
+    preloads = []
+    if OFFLINE_MISTRAL_AVAILABLE and (
+        ANALYZER_MODE == "offline" or (ANALYZER_MODE == "auto" and is_mistral_model_downloaded())
+    ):
+        logger.info("Preloading TinyLlama model for resume analysis...")
+        preloads.append(asyncio.to_thread(preload_model))
+    if LLAMA_CPP_AVAILABLE and (
+        ANALYZER_MODE == "llama_cpp" or (ANALYZER_MODE == "auto" and is_llama_cpp_model_downloaded())
+    ):
+        logger.info("Preloading llama.cpp model for resume analysis...")
+        preloads.append(asyncio.to_thread(preload_llm))
+    try:
+        # The two models load independently, so overlap their disk reads
+        for result in await asyncio.gather(*preloads, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error("Error preloading local model: %s", result)
+    finally:
+        ready.set()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start caches and background warm-up without delaying startup, and stop background tasks on shutdown"""
+    # One pooled HTTP client for all outbound API calls (OpenRouter, embeddings)
+    app.state.http = httpx.AsyncClient(timeout=60, http2=True, limits=httpx.Limits(max_connections=100))
+    load_resume_file_paths()
+    app.state.model_status_task = asyncio.create_task(refresh_model_status_periodically())
+    app.state.embedding_backfill_task = asyncio.create_task(backfill_resume_embeddings())
+    
+    # Health checks and API-backed analysis are served while local models load
+    app.state.local_models_ready = asyncio.Event()
+    app.state.model_warmup_task = asyncio.create_task(warm_local_models(app.state.local_models_ready))
+    
+    yield
+    
+    app.state.model_status_task.cancel()
+    app.state.embedding_backfill_task.cancel()
+    app.state.model_warmup_task.cancel()
+    await LLAMA_CPP_BATCHER.close()
+    await EMBEDDING_BATCHER.close()
+    await app.state.http.aclose()
+    if _analysis_pool is not None:
+        _analysis_pool.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(
+    title="ResuMatch API",
+    description="API for ResuMatch Resume Selection App",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 # Configure CORS
 app.add_middleware(
@@ -96,26 +273,252 @@ os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
 
 # Resume storage file path
 RESUMES_FILE = Path("./storage/resumes.json")
+RESUME_STORAGE_DIR = Path("./storage/resumes")
 
 # Initialize resumes from file if it exists
 def load_resumes():
     if RESUMES_FILE.exists():
         try:
-            with open(RESUMES_FILE, 'r') as f:
-                return json.load(f)
+            return orjson.loads(RESUMES_FILE.read_bytes())
         except Exception as e:
-            print(f"Error loading resumes: {str(e)}")
+            logger.error("Error loading resumes: %s", e)
     return []
 
-def save_resumes(resumes):
+# Snapshots written from worker threads are numbered so an older one never overwrites a newer one
+_resumes_write_lock = threading.Lock()
+_resumes_snapshot_seq = itertools.count(1)
+_resumes_written_seq = 0
+
+def _write_resumes_snapshot(seq: int, data: bytes):
+    global _resumes_written_seq
+    with _resumes_write_lock:
+        if seq < _resumes_written_seq:
+            return
+        try:
+            RESUMES_FILE.write_bytes(data)
+            _resumes_written_seq = seq
+        except Exception as e:
+            logger.error("Error saving resumes: %s", e)
+
+async def persist_resumes():
+    """Write USER_RESUMES to RESUMES_FILE without blocking the event loop"""
+    # Serialize on the loop so the snapshot is consistent; only the file write runs in a thread.
+    # orjson serializes straight to bytes, without the stdlib encoder's intermediate strings
+    data = orjson.dumps(list(USER_RESUMES.values()), option=orjson.OPT_INDENT_2)
+    await asyncio.to_thread(_write_resumes_snapshot, next(_resumes_snapshot_seq), data)
+
+def extract_pdf(file_path: Union[str, bytes]) -> str:
+    """Extract text from a PDF (path or in-memory bytes), retrying with pdfplumber if the primary extraction yields too little"""
     try:
-        with open(RESUMES_FILE, 'w') as f:
-            json.dump(resumes, f, indent=2)
+        if isinstance(file_path, bytes):
+            logger.info("Extracting text from in-memory PDF (%d bytes)", len(file_path))
+        else:
+            logger.info("Extracting text from PDF: %s", file_path)
+        resume_text = extract_text_from_pdf(file_path)
+        logger.debug("Extracted text length: %d characters", len(resume_text))
+        logger.debug("Text sample: %s", resume_text[:200].replace(chr(10), ' '))
+        
+        # If text extraction failed, let's try the other method directly
+        if not resume_text or len(resume_text.strip()) < 100:
+            logger.warning("Primary extraction yielded too little text, trying fallback method...")
+            resume_text = extract_with_pdfplumber(file_path)
+            logger.debug("Fallback extracted text length: %d characters", len(resume_text))
+            logger.debug("Fallback text sample: %s", resume_text[:200].replace(chr(10), ' '))
+        
+        # If we still don't have good text, report the error
+        if not resume_text or len(resume_text.strip()) < 100:
+            raise Exception("Failed to extract meaningful text from PDF")
+        
+        return resume_text
     except Exception as e:
-        print(f"Error saving resumes: {str(e)}")
+        logger.error("Error extracting PDF text: %s", e)
+        return f"Error extracting text from PDF: {str(e)}"
+
+def read_txt(file_path: str) -> str:
+    """Read a plain text resume"""
+    with open(file_path, "r") as f:
+        resume_text = f.read()
+    logger.debug("Text file contents (%d chars): %s...", len(resume_text), resume_text[:100])
+    return resume_text
+
+def warn_doc(file_path: str) -> str:
+    """Placeholder for Word documents - we should add real docx extraction"""
+    return "This appears to be a Word document. Note: Full Word document extraction is coming soon. For now, please use PDF format for best results."
+
+# Text extractor for each supported upload extension
+_EXTRACTORS: Dict[str, Callable[[str], str]] = {
+    ".pdf": extract_pdf,
+    ".txt": read_txt,
+    ".doc": warn_doc,
+    ".docx": warn_doc,
+}
+
+# Analysis results keyed by (blake2b hash of resume text, analyzer mode)
+ANALYSIS_CACHE = LRUCache(max_entries=512)
+
+# Stand-in query embedding when the embedding API is unavailable
+_ZERO_EMBED = np.zeros(4096, dtype=np.float32)
 
-# Load existing resumes
-USER_RESUMES = load_resumes()
+# (top_k, results) of recent searches, keyed by query embedding; cleared whenever the resume set changes
+SEARCH_CACHE = SemanticCache(threshold=0.95, max_entries=1024)
+
+# Lowercased (summary tokens, skills) sets per resume ID, used for keyword scoring in search
+RESUME_KEYWORD_SETS: Dict[str, Any] = {}
+
+# Stripped from the ends of summary and query tokens so "Python," indexes and matches as "python"
+TOKEN_PUNCTUATION = ".,;:!?()[]{}\"'"
+
+def tokenize(text: str) -> frozenset:
+    """
+    Lowercased whitespace tokens of text with surrounding punctuation removed
+    
+    Tokens are interned, so every resume's keyword sets and SKILL_INDEX share one string per
+    distinct token, and index lookups with query tokens match by identity.
+    """
+    return frozenset(sys.intern(token) for token in (word.strip(TOKEN_PUNCTUATION) for word in text.lower().split()) if token)
+
+def compile_keyword_pattern(keywords) -> Optional[re.Pattern]:
+    """
+    Compile query keywords into one case-insensitive alternation so each field is scanned once
+    
+    Args:
+        keywords: Lowercased query keywords
+        
+    Returns:
+        Compiled pattern matching any keyword as a whole word, or None if there are no keywords
+    """
+    if not keywords:
+        return None
+    # Longest first so a keyword is not cut short by one of its prefixes; lookarounds instead of
+    # \b so keywords ending in symbols (c++, c#) still match
+    alternation = "|".join(map(re.escape, sorted(keywords, key=len, reverse=True)))
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE)
+
+def get_keyword_sets(resume):
+    """Return the cached (summary tokens, skill tokens) frozensets for a resume, computing them on first use"""
+    keyword_sets = RESUME_KEYWORD_SETS.get(resume["id"])
+    if keyword_sets is None:
+        skills = [str(skill) for skill in resume.get("skills") or []]
+        summary_set = tokenize(str(resume.get("summary") or ""))
+        # Whole skills plus their words, so single-word queries find multi-word skills
+        skills_set = frozenset(sys.intern(skill.lower()) for skill in skills) | tokenize(" ".join(skills))
+        keyword_sets = RESUME_KEYWORD_SETS[resume["id"]] = (summary_set, skills_set)
+    return keyword_sets
+
+def keyword_score(keyword_pattern, resume, candidate_ids, reason, source, similarity=None):
+    """
+    Score a resume by keyword matches with the query (used when LLM scoring is not possible)
+    
+    Args:
+        keyword_pattern: Compiled query keyword pattern from compile_keyword_pattern (or None)
+        resume: Resume dictionary
+        candidate_ids: IDs of resumes that share at least one keyword with the query
+        reason: Explanation of why the keyword fallback was used
+        source: Value for the score_source field
+        similarity: Cosine similarity of the query and resume embeddings, if both are available
+        
+    Returns:
+        Dictionary with score, reason, source and the matched keywords (hits); the matched
+        keywords are left out of the reason so it is only formatted for results that are returned
+    """
+    if keyword_pattern is not None and resume["id"] in candidate_ids:
+        summary_hits = {match.lower() for match in keyword_pattern.findall(str(resume.get("summary") or ""))}
+        skill_hits = {match.lower() for match in keyword_pattern.findall("\n".join(str(skill) for skill in resume.get("skills") or []))}
+        score = min(100, len(summary_hits) * 10 + len(skill_hits) * 15)
+        hits = summary_hits | skill_hits
+    else:
+        score, hits = 0, frozenset()
+    if similarity is not None:
+        # Embedding similarity catches matches that share no literal keyword with the query
+        score = max(score, int(round(max(similarity, 0.0) * 100)))
+    return {"score": score, "reason": reason, "source": source, "hits": hits}
+
+# Inverted index: lowercased summary token / skill -> IDs of resumes containing it
+SKILL_INDEX: Dict[str, Set[str]] = {}
+
+def index_resume(resume):
+    """Add a resume's summary tokens and skills to SKILL_INDEX"""
+    summary_set, skills_set = get_keyword_sets(resume)
+    for token in summary_set | skills_set:
+        SKILL_INDEX.setdefault(token, set()).add(resume["id"])
+
+def unindex_resume(resume_id):
+    """Remove a resume from SKILL_INDEX and drop its cached keyword sets"""
+    keyword_sets = RESUME_KEYWORD_SETS.pop(resume_id, None)
+    if keyword_sets is None:
+        return
+    for token in keyword_sets[0] | keyword_sets[1]:
+        ids = SKILL_INDEX.get(token)
+        if ids is not None:
+            ids.discard(resume_id)
+            if not ids:
+                del SKILL_INDEX[token]
+
+def set_resumes(resumes):
+    """Replace the in-memory resume store with the given list and rebuild the keyword indexes"""
+    USER_RESUMES.clear()
+    RESUME_KEYWORD_SETS.clear()
+    SKILL_INDEX.clear()
+    for resume in resumes:
+        USER_RESUMES[resume["id"]] = resume
+        index_resume(resume)
+    EMBED_INDEX.retain(USER_RESUMES)
+
+# Normalized resume embeddings, scored against the query embedding with one matrix product
+# (stored as int8 with EMBEDDING_INT8=true, a quarter of the memory for large resume sets)
+EMBED_INDEX = EmbeddingMatrix(quantize=EMBEDDING_INT8)
+
+def resume_embedding_text(resume) -> str:
+    """Text embedded for a resume: its summary, skills and category"""
+    skills = ", ".join(str(skill) for skill in resume.get("skills") or [])
+    return f"{resume.get('summary') or ''}\nSkills: {skills}\nCategory: {resume.get('category') or ''}"
+
+async def embed_resume_texts(texts: List[str]) -> List[Optional[np.ndarray]]:
+    """Embed a batch of resume texts in as few embedding requests as possible"""
+    return await get_embeddings(texts, fallback_to_mock=False, client=app.state.http)
+
+# Concurrent uploads (e.g. a bulk upload script) arriving within 10 ms share one embedding request;
+# these are network calls, so a few batches run at once rather than queueing behind a slow one
+EMBEDDING_BATCHER = AsyncBatcher(embed_resume_texts, max_batch=EMBEDDING_BATCH_SIZE, max_wait_ms=10, max_concurrency=4)
+
+async def embed_resume(resume) -> bool:
+    """Embed a resume into EMBED_INDEX; returns False if no embedding could be obtained"""
+    if not resume.get("summary") and not resume.get("skills"):
+        return True  # Nothing meaningful to embed
+    embedding = await EMBEDDING_BATCHER.submit(resume_embedding_text(resume))
+    return embedding is not None and EMBED_INDEX.add(resume["id"], embedding)
+
+async def backfill_resume_embeddings():
+    """Embed stored resumes missing from EMBED_INDEX with batched embedding requests"""
+    missing = [
+        resume for resume in USER_RESUMES.values()
+        if resume["id"] not in EMBED_INDEX and (resume.get("summary") or resume.get("skills"))
+    ]
+    if not missing:
+        return
+    embeddings = await get_embeddings(
+        [resume_embedding_text(resume) for resume in missing], fallback_to_mock=False, client=app.state.http
+    )
+    for resume, embedding in zip(missing, embeddings):
+        if embedding is not None and resume["id"] in USER_RESUMES:
+            EMBED_INDEX.add(resume["id"], embedding)
+    logger.info("Resume embeddings ready for %d resumes", len(EMBED_INDEX))
+
+# Load existing resumes, keyed by resume ID
+USER_RESUMES: Dict[str, dict] = {}
+set_resumes(load_resumes())
+
+# Stored file for each resume ID, so downloads never have to scan the storage directory
+RESUME_FILE_PATHS: Dict[str, Path] = {}
+
+def load_resume_file_paths():
+    """Map resume IDs to their stored files with a single scan of the storage directory"""
+    if not RESUME_STORAGE_DIR.exists():
+        return
+    for path in RESUME_STORAGE_DIR.glob("*_*"):
+        resume_id = path.name.split("_", 1)[0]
+        RESUME_FILE_PATHS.setdefault(resume_id, path)
+    logger.info("Indexed %d stored resume files", len(RESUME_FILE_PATHS))
 
 class ResumeAnalysisResponse(BaseModel):
     skills: List[str]
@@ -134,6 +537,7 @@ class ResumeUploadRequest(BaseModel):
 class SearchQuery(BaseModel):
     query: str
     filters: Optional[dict] = None
+    top_k: int = 20
 
 class AnalysisResult(BaseModel):
     summary: str
@@ -158,16 +562,75 @@ async def root():
     """
     return {"status": "ok", "message": "ResuMatch API is running"}
 
+# Seconds a computed model status stays valid, and how often the background task refreshes it
+MODEL_STATUS_TTL = 30
+MODEL_STATUS_REFRESH_INTERVAL = 25
+# Upper bound on one status check, so a slow OpenRouter probe can't stall /api/model/status
+MODEL_STATUS_TIMEOUT = 10
+
+_MODEL_STATUS_CACHE: Dict[str, Any] = {"value": None, "expires_at": 0.0}
+# In-flight status check shared by concurrent callers
+_model_status_refresh: Optional[asyncio.Task] = None
+
 @app.get("/api/model/status", response_model=ModelStatusResponse)
 async def model_status():
     """
     Check the status of the LLM model (OpenRouter, offline, or local)
+    
+    The status is served from a short-lived cache that a background task keeps warm,
+    so health checks don't probe OpenRouter on every call.
+    """
+    if _MODEL_STATUS_CACHE["value"] is not None and time.monotonic() < _MODEL_STATUS_CACHE["expires_at"]:
+        return _MODEL_STATUS_CACHE["value"]
+    return await refresh_model_status()
+
+async def refresh_model_status() -> Dict[str, Any]:
+    """Recompute the model status and store it in the cache; concurrent callers share one check"""
+    global _model_status_refresh
+    if _model_status_refresh is None or _model_status_refresh.done():
+        _model_status_refresh = asyncio.create_task(_refresh_model_status())
+    # Shielded so a caller disconnecting doesn't cancel the check for everyone else
+    return await asyncio.shield(_model_status_refresh)
+
+async def _refresh_model_status() -> Dict[str, Any]:
+    try:
+        status = await asyncio.wait_for(compute_model_status(), timeout=MODEL_STATUS_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Model status check timed out after %ss", MODEL_STATUS_TIMEOUT)
+        # Serve the last known status rather than failing the request
+        if _MODEL_STATUS_CACHE["value"] is not None:
+            return _MODEL_STATUS_CACHE["value"]
+        return {
+            "status": "unknown",
+            "message": "Model status check timed out",
+            "using_fallback": True,
+            "mode": ANALYZER_MODE
+        }
+    _MODEL_STATUS_CACHE["value"] = status
+    _MODEL_STATUS_CACHE["expires_at"] = time.monotonic() + MODEL_STATUS_TTL
+    return status
+
+async def refresh_model_status_periodically():
+    """Keep the cached model status warm"""
+    while True:
+        try:
+            await refresh_model_status()
+        except Exception as e:
+            logger.error("Error refreshing model status: %s", e)
+        await asyncio.sleep(MODEL_STATUS_REFRESH_INTERVAL)
+
+async def compute_model_status() -> Dict[str, Any]:
+    """
+    Check the status of the LLM model (OpenRouter, offline, or local)
+    
+    Returns:
+        Dictionary matching ModelStatusResponse
     """
     try:
         # Check if we're in a specific mode
         if ANALYZER_MODE == "api" and OPENROUTER_API_AVAILABLE:
             # Check OpenRouter API
-            status = get_openrouter_model_status(fallback_to_mock=True)
+            status = await get_openrouter_model_status(fallback_to_mock=True, client=app.state.http)
             
             # Ensure all required fields are present
             if "using_fallback" not in status:
@@ -224,7 +687,7 @@ async def model_status():
         elif ANALYZER_MODE == "auto":
             # First try OpenRouter API
             if OPENROUTER_API_AVAILABLE:
-                status = get_openrouter_model_status(fallback_to_mock=True)
+                status = await get_openrouter_model_status(fallback_to_mock=True, client=app.state.http)
                 
                 # Ensure all required fields are present
                 if "using_fallback" not in status:
@@ -270,7 +733,7 @@ async def model_status():
         }
     
     except Exception as e:
-        print(f"Error in model status check: {str(e)}")
+        logger.error("Error in model status check: %s", e)
         return {
             "status": "error",
             "message": f"Error checking model status: {str(e)}",
@@ -278,6 +741,154 @@ async def model_status():
             "mode": "fallback"
         }
 
+async def run_analyzers(resume_text: str) -> Tuple[Dict[str, Any], bool]:
+    """
+    Analyze resume text with the best available method for the configured ANALYZER_MODE
+    
+    Args:
+        resume_text: The text content of the resume
+        
+    Returns:
+        (dictionary containing extracted information, whether it came from the first analyzer
+        the mode tried rather than a fallback after that analyzer failed)
+    """
+    # Set once an analyzer has failed and auto mode moves on to the next one
+    fell_back = False
+    try:
+        # Try to use OpenRouter API first (best quality)
+        if ANALYZER_MODE in ["api", "auto"] and OPENROUTER_API_AVAILABLE:
+            try:
+                logger.info("Attempting to use OpenRouter API with Mistral 7B")
+                # The status only decides whether API-only mode fails fast, so auto mode skips it;
+                # it is read from the background-refreshed status cache rather than probed per request
+                if ANALYZER_MODE == "api":
+                    status = await model_status()
+                    logger.debug("OpenRouter API status: %s", status)
+                    
+                    # Check if we're using fallback mode
+                    if status.get("using_fallback", False) and not status.get("status") == "available":
+                        logger.warning("OpenRouter API is using fallback mode")
+                        raise HTTPException(status_code=503, 
+                            detail=f"OpenRouter API analysis unavailable: {status.get('message')}. Using fallback analysis.")
+                
+                # Proceed with OpenRouter API resume analysis (with fallback)
+                logger.info("Proceeding with OpenRouter API resume analysis...")
+                analysis_result = await analyze_resume_with_openrouter(resume_text, fallback_to_mock=True, client=app.state.http)
+                
+                # Add a source field to indicate where the analysis came from
+                if "source" not in analysis_result:
+                    analysis_result["source"] = "openrouter_api"
+                    
+                return analysis_result, True
+            except ValueError as e:
+                # The OpenRouter API had an authentication or connection error
+                logger.error("OpenRouter API error: %s", e)
+                if ANALYZER_MODE == "api":
+                    # If user explicitly requested API mode, return the error
+                    raise HTTPException(status_code=503, 
+                        detail=f"OpenRouter API analysis failed: {str(e)}. Please check your API key or try again later.")
+                fell_back = True
+            except Exception as e:
+                logger.error("Unexpected error with OpenRouter API: %s", e)
+                if ANALYZER_MODE == "api":
+                    raise HTTPException(status_code=500,
+                        detail=f"Unexpected error with OpenRouter API: {str(e)}.")
+                else:
+                    # For auto mode, log the error and continue to fallback methods
+                    logger.warning("Falling back to alternative analysis method due to error: %s", e)
+                    # We'll continue to the next analysis method
+                
+                # Otherwise in auto mode, try other methods
+                fell_back = True
+                logger.warning("Falling back to other analysis methods...")
+        
+        # Local models are still loading right after startup; wait for the warm-up
+        # rather than loading the same weights a second time
+        await app.state.local_models_ready.wait()
+        
+        # Try llama.cpp method next (often reliable on CPU)
+        if ANALYZER_MODE in ["llama_cpp", "auto"] and LLAMA_CPP_AVAILABLE and is_llama_cpp_available():
+            try:
+                logger.info("Using llama.cpp analysis method")
+                analysis_result = await LLAMA_CPP_BATCHER.submit(resume_text)
+                return analysis_result, not fell_back
+            except Exception as e:
+                logger.error("llama.cpp analysis error: %s", e)
+                if ANALYZER_MODE == "llama_cpp":
+                    # If user explicitly requested llama_cpp mode, return the error
+                    raise HTTPException(status_code=500, 
+                        detail=f"llama.cpp analysis failed: {str(e)}. Please try another analysis mode.")
+                
+                # Otherwise in auto mode, continue to next method
+                fell_back = True
+                logger.warning("Falling back to other analysis methods...")
+        
+        # Try offline Mistral model next
+        if ANALYZER_MODE in ["offline", "auto"] and OFFLINE_MISTRAL_AVAILABLE and is_mistral_model_available():
+            try:
+                logger.info("Using offline Mistral analysis method")
+                async with LOCAL_INFERENCE_SEMAPHORE:
+                    analysis_result = await asyncio.to_thread(analyze_resume_with_mistral_offline, resume_text)
+                return analysis_result, not fell_back
+            except Exception as e:
+                logger.error("Offline Mistral analysis error: %s", e)
+                if ANALYZER_MODE == "offline":
+                    # If user explicitly requested offline mode, return the error
+                    raise HTTPException(status_code=500, 
+                        detail=f"Offline Mistral analysis failed: {str(e)}. Please try another analysis mode.")
+                
+                # Otherwise in auto mode, fall back to regex
+                fell_back = True
+                logger.warning("Falling back to regex analysis method...")
+        
+        # Use regex as last resort or if explicitly requested
+        if ANALYZER_MODE == "regex" or ANALYZER_MODE == "auto":
+            logger.info("Using regex-based analysis method")
+            analysis_result = await run_regex_analysis(resume_text)
+            return analysis_result, not fell_back
+        
+        # If we get here, no analysis method succeeded
+        raise HTTPException(status_code=500, 
+            detail="Failed to analyze resume with any available method. Please check your configuration.")
+            
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error("Error in resume analysis: %s", e)
+        raise HTTPException(status_code=500, 
+            detail=f"Resume analysis error: {str(e)}")
+
+async def extract_via_temp_file(file: UploadFile, ext: str, extractor: Callable[[str], str]) -> str:
+    """
+    Stream an upload to a temporary file and run the extractor on it
+    
+    Args:
+        file: The uploaded file
+        ext: Lowercased file extension, used as the temp file suffix
+        extractor: Text extractor for the extension
+        
+    Returns:
+        The extracted text
+    """
+    temp_file_path = await asyncio.to_thread(save_upload_to_temp, file.file, ext)
+        
+    # Extract text from the file
+    try:
+        resume_text = await asyncio.to_thread(extractor, temp_file_path)
+            
+        # Clean up temporary file
+        if os.path.exists(temp_file_path):
+            await asyncio.to_thread(os.unlink, temp_file_path)
+        
+        return resume_text
+    except Exception as e:
+        # Clean up temporary file
+        if os.path.exists(temp_file_path):
+            await asyncio.to_thread(os.unlink, temp_file_path)
+        logger.error("Error processing file: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to process the file: {str(e)}")
+
 @app.post("/api/resumes/analyze", response_model=AnalysisResult)
 async def analyze_resume(file: Optional[UploadFile] = File(None), text: Optional[Any] = Body(None)):
     """
@@ -292,16 +903,16 @@ async def analyze_resume(file: Optional[UploadFile] = File(None), text: Optional
         
         # Handle direct text input
         if text:
-            print(f"Received text input: {type(text)}")
+            logger.debug("Received text input: %s", type(text))
             if isinstance(text, dict) and "text" in text:
                 resume_text = text["text"]
-                print(f"Extracted text from JSON: {resume_text[:100]}...")
+                logger.debug("Extracted text from JSON: %s...", resume_text[:100])
             elif isinstance(text, str):
                 resume_text = text
-                print(f"Using text as string: {resume_text[:100]}...")
+                logger.debug("Using text as string: %s...", resume_text[:100])
             else:
                 resume_text = str(text)
-                print(f"Converted to string: {resume_text[:100]}...")
+                logger.debug("Converted to string: %s...", resume_text[:100])
             
             # Ensure we have meaningful text
             if not resume_text or len(resume_text.strip()) < 20:
@@ -310,171 +921,117 @@ async def analyze_resume(file: Optional[UploadFile] = File(None), text: Optional
         # Handle file upload
         elif file:
             # Print file information for debugging
-            print(f"File received: {file.filename}, Content-Type: {file.content_type}, Size: {file.size} bytes")
+            logger.debug("File received: %s, Content-Type: %s, Size: %s bytes", file.filename, file.content_type, file.size)
             
-            # Save uploaded file to a temporary location
-            temp_file_path = ""
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-                temp_file_path = temp_file.name
-                shutil.copyfileobj(file.file, temp_file)
-                
-            # Extract text from the file
-            try:
-                if file.filename.lower().endswith(".pdf"):
-                    try:
-                        # Log the process for debugging
-                        print(f"Extracting text from PDF: {file.filename}")
-                        resume_text = extract_text_from_pdf(temp_file_path)
-                        print(f"Extracted text length: {len(resume_text)} characters")
-                        print(f"Text sample: {resume_text[:200].replace(chr(10), ' ')}")
-                        
-                        # If text extraction failed, let's try the other method directly
-                        if not resume_text or len(resume_text.strip()) < 100:
-                            print("Primary extraction yielded too little text, trying fallback method...")
-                            resume_text = extract_with_pdfplumber(temp_file_path)
-                            print(f"Fallback extracted text length: {len(resume_text)} characters")
-                            print(f"Fallback text sample: {resume_text[:200].replace(chr(10), ' ')}")
-                        
-                        # If we still don't have good text, report the error
-                        if not resume_text or len(resume_text.strip()) < 100:
-                            raise Exception("Failed to extract meaningful text from PDF")
-                            
-                    except Exception as e:
-                        print(f"Error extracting PDF text: {str(e)}")
-                        resume_text = f"Error extracting text from PDF: {str(e)}"
-                elif file.filename.lower().endswith((".doc", ".docx")):
-                    # Mock implementation for Word docs - we should add real docx extraction
-                    resume_text = "This appears to be a Word document. Note: Full Word document extraction is coming soon. For now, please use PDF format for best results."
-                elif file.filename.lower().endswith(".txt"):
-                    with open(temp_file_path, "r") as f:
-                        resume_text = f.read()
-                        print(f"Text file contents ({len(resume_text)} chars): {resume_text[:100]}...")
-                else:
-                    raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a PDF, Word, or text file.")
-                    
-                # Clean up temporary file
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-                    
-            except Exception as e:
-                # Clean up temporary file
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-                print(f"Error processing file: {str(e)}")
-                raise HTTPException(status_code=500, detail=f"Failed to process the file: {str(e)}")
+            ext = os.path.splitext(file.filename)[1].lower()
+            extractor = _EXTRACTORS.get(ext)
+            if extractor is None:
+                raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a PDF, Word, or text file.")
+            
+            # Small PDFs are parsed from memory, skipping the temp file write/read/unlink
+            if ext == ".pdf" and file.size is not None and file.size < IN_MEMORY_PDF_LIMIT:
+                resume_text = await asyncio.to_thread(extract_pdf, await file.read())
+            elif ext == ".txt":
+                # Plain text is already in memory once read, so decode it directly
+                resume_text = (await file.read()).decode("utf-8", errors="replace")
+            else:
+                resume_text = await extract_via_temp_file(file, ext, extractor)
         
         else:
             raise HTTPException(status_code=400, detail="No file or text provided")
         
         # Analyze the resume text using the appropriate model based on mode
         if resume_text:
-            print(f"Analyzing resume text (first 100 chars): {resume_text[:100]}...")
+            logger.debug("Analyzing resume text (first 100 chars): %s...", resume_text[:100])
+            
+            text_hash = hashlib.blake2b(resume_text.encode("utf-8"), digest_size=16).hexdigest()
+            cache_key = (text_hash, ANALYZER_MODE)
+            cached_result = ANALYSIS_CACHE.get(cache_key)
+            if cached_result is not None:
+                logger.info("Returning cached analysis for text hash %s", text_hash)
+                return dict(cached_result)
             
             # We got text, now analyze it using the best available method
-            try:
-                # Try to use OpenRouter API first (best quality)
-                if ANALYZER_MODE in ["api", "auto"] and OPENROUTER_API_AVAILABLE:
-                    try:
-                        print("Attempting to use OpenRouter API with Mistral 7B")
-                        # Check OpenRouter API status first
-                        status = get_openrouter_model_status(fallback_to_mock=True)
-                        print(f"OpenRouter API status: {status}")
-                        
-                        # Check if we're using fallback mode
-                        if status.get("using_fallback", False):
-                            print("OpenRouter API is using fallback mode")
-                            # If we're in API-only mode, check if we should return an error
-                            if ANALYZER_MODE == "api" and not status.get("status") == "available":
-                                raise HTTPException(status_code=503, 
-                                    detail=f"OpenRouter API analysis unavailable: {status.get('message')}. Using fallback analysis.")
-                        
-                        # Proceed with OpenRouter API resume analysis (with fallback)
-                        print("Proceeding with OpenRouter API resume analysis...")
-                        analysis_result = analyze_resume_with_openrouter(resume_text, fallback_to_mock=True)
-                        
-                        # Add a source field to indicate where the analysis came from
-                        if "source" not in analysis_result:
-                            analysis_result["source"] = "openrouter_api"
-                            
-                        return analysis_result
-                    except ValueError as e:
-                        # The OpenRouter API had an authentication or connection error
-                        print(f"OpenRouter API error: {str(e)}")
-                        if ANALYZER_MODE == "api":
-                            # If user explicitly requested API mode, return the error
-                            raise HTTPException(status_code=503, 
-                                detail=f"OpenRouter API analysis failed: {str(e)}. Please check your API key or try again later.")
-                    except Exception as e:
-                        print(f"Unexpected error with OpenRouter API: {str(e)}")
-                        if ANALYZER_MODE == "api":
-                            raise HTTPException(status_code=500,
-                                detail=f"Unexpected error with OpenRouter API: {str(e)}.")
-                        else:
-                            # For auto mode, log the error and continue to fallback methods
-                            print(f"Falling back to alternative analysis method due to error: {str(e)}")
-                            # We'll continue to the next analysis method
-                        
-                        # Otherwise in auto mode, try other methods
-                        print("Falling back to other analysis methods...")
-                
-                # Try llama.cpp method next (often reliable on CPU)
-                if ANALYZER_MODE in ["llama_cpp", "auto"] and LLAMA_CPP_AVAILABLE and is_llama_cpp_available():
-                    try:
-                        print("Using llama.cpp analysis method")
-                        analysis_result = analyze_resume_with_llama_cpp(resume_text)
-                        return analysis_result
-                    except Exception as e:
-                        print(f"llama.cpp analysis error: {str(e)}")
-                        if ANALYZER_MODE == "llama_cpp":
-                            # If user explicitly requested llama_cpp mode, return the error
-                            raise HTTPException(status_code=500, 
-                                detail=f"llama.cpp analysis failed: {str(e)}. Please try another analysis mode.")
-                        
-                        # Otherwise in auto mode, continue to next method
-                        print("Falling back to other analysis methods...")
-                
-                # Try offline Mistral model next
-                if ANALYZER_MODE in ["offline", "auto"] and OFFLINE_MISTRAL_AVAILABLE and is_mistral_model_available():
-                    try:
-                        print("Using offline Mistral analysis method")
-                        analysis_result = analyze_resume_with_mistral_offline(resume_text)
-                        return analysis_result
-                    except Exception as e:
-                        print(f"Offline Mistral analysis error: {str(e)}")
-                        if ANALYZER_MODE == "offline":
-                            # If user explicitly requested offline mode, return the error
-                            raise HTTPException(status_code=500, 
-                                detail=f"Offline Mistral analysis failed: {str(e)}. Please try another analysis mode.")
-                        
-                        # Otherwise in auto mode, fall back to regex
-                        print("Falling back to regex analysis method...")
-                
-                # Use regex as last resort or if explicitly requested
-                if ANALYZER_MODE == "regex" or ANALYZER_MODE == "auto":
-                    print("Using regex-based analysis method")
-                    analysis_result = analyze_resume_with_regex(resume_text)
-                    return analysis_result
-                
-                # If we get here, no analysis method succeeded
-                raise HTTPException(status_code=500, 
-                    detail="Failed to analyze resume with any available method. Please check your configuration.")
-                    
-            except HTTPException:
-                # Re-raise HTTP exceptions
-                raise
-            except Exception as e:
-                print(f"Error in resume analysis: {str(e)}")
-                raise HTTPException(status_code=500, 
-                    detail=f"Resume analysis error: {str(e)}")
+            analysis_result, preferred = await run_analyzers(resume_text)
+            
+            # Only cache the answer of the analyzer the mode tried first: a fallback after a transient
+            # failure (a later analyzer, or mock/regex results standing in for a failed model call)
+            # would otherwise be pinned under this mode for every later request
+            if preferred and analysis_result.get("source") not in ("mock_data", REGEX_FALLBACK_SOURCE):
+                ANALYSIS_CACHE.put(cache_key, dict(analysis_result))
+            return analysis_result
         else:
             raise HTTPException(status_code=400, detail="Failed to extract text from the provided file")
             
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
+def check_pdf_upload(filename: str, head: bytes) -> None:
+    """Reject an upload named .pdf whose first bytes aren't a PDF header (the extension alone is client-supplied)"""
+    if Path(filename).suffix.lower() == ".pdf" and not looks_like_pdf(head):
+        raise HTTPException(status_code=400, detail="The uploaded file is not a valid PDF")
+
+def new_resume_file_path(filename: str):
+    """
+    Allocate an ID and a storage path for an uploaded resume file
+    
+    Returns:
+        (resume ID, path under RESUME_STORAGE_DIR)
+    """
+    resume_id = str(uuid.uuid4())
+    RESUME_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+    return resume_id, RESUME_STORAGE_DIR / f"{resume_id}_{filename}"
+
+async def register_uploaded_resume(resume_id: str, filename: str, file_path: Path, meta_dict: Dict[str, Any]):
+    """
+    Add a resume whose file has been saved to the store, persist it and embed it
+    
+    Args:
+        resume_id: ID from new_resume_file_path
+        filename: Original filename of the upload
+        file_path: Where the file was saved
+        meta_dict: Parsed upload metadata (summary, skills, experience, ...)
+        
+    Returns:
+        The resume dictionary
+    """
+    RESUME_FILE_PATHS[resume_id] = file_path
+    logger.info("Saved resume file to %s", file_path)
+    
+    # Create a resume object
+    resume = {
+        "id": resume_id,
+        "filename": filename,
+        "download_url": f"/api/resumes/download/{resume_id}",
+        "upload_date": datetime.now().isoformat(),
+        "status": "processed",
+        "match_score": random.randint(65, 95),
+        "summary": meta_dict.get("summary", ""),
+        "skills": meta_dict.get("skills", []),
+        "experience": meta_dict.get("experience", ""),
+        "educationLevel": meta_dict.get("educationLevel", ""),
+        "category": meta_dict.get("category", ""),
+        "file_path": str(file_path)
+    }
+    
+    # Add to our storage and save to file
+    USER_RESUMES[resume_id] = resume
+    index_resume(resume)
+    # Persisting the resume list and embedding the resume are independent, so overlap them
+    await asyncio.gather(persist_resumes(), embed_resume(resume))
+    SEARCH_CACHE.clear()
+    
+    # Print the current resumes for debugging
+    logger.info("Current resumes in storage: %d", len(USER_RESUMES))
+    if logger.isEnabledFor(logging.DEBUG):
+        for r in USER_RESUMES.values():
+            logger.debug("  - %s: %s", r['id'], r['filename'])
+    
+    return resume
+
 @app.post("/api/resumes/upload")
 async def upload_resume(file: UploadFile = File(...), metadata: str = Form(...)):
     """
@@ -482,58 +1039,93 @@ async def upload_resume(file: UploadFile = File(...), metadata: str = Form(...))
     """
     try:
         # Parse metadata
-        meta_dict = json.loads(metadata)
-        
-        # Generate a unique ID for the resume
-        resume_id = str(uuid.uuid4())
-        
-        # Get the current timestamp
-        timestamp = datetime.now().isoformat()
-        
-        # Create storage directory if it doesn't exist
-        storage_dir = Path("./storage/resumes")
-        storage_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Save the file to disk
-        file_path = storage_dir / f"{resume_id}_{file.filename}"
-        
-        # Read the uploaded file
-        contents = await file.read()
-        
-        # Write to disk
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        
-        print(f"Saved resume file to {file_path}")
-        
-        # Create a resume object
-        resume = {
-            "id": resume_id,
-            "filename": file.filename,
-            "download_url": f"/api/resumes/download/{resume_id}",
-            "upload_date": timestamp,
-            "status": "processed",
-            "match_score": random.randint(65, 95),
-            "summary": meta_dict.get("summary", ""),
-            "skills": meta_dict.get("skills", []),
-            "experience": meta_dict.get("experience", ""),
-            "educationLevel": meta_dict.get("educationLevel", ""),
-            "category": meta_dict.get("category", ""),
-            "file_path": str(file_path)
-        }
+        meta_dict = orjson.loads(metadata)
+        check_pdf_upload(file.filename, await file.read(PDF_HEADER_SEARCH_BYTES))
         
-        # Add to our storage and save to file
-        USER_RESUMES.append(resume)
-        save_resumes(USER_RESUMES)
+        resume_id, file_path = new_resume_file_path(file.filename)
         
-        # Print the current resumes for debugging
-        print(f"Current resumes in storage: {len(USER_RESUMES)}")
-        for r in USER_RESUMES:
-            print(f"  - {r['id']}: {r['filename']}")
+        # Stream the uploaded file to disk in chunks (copy_upload rewinds past the header check)
+        await asyncio.to_thread(save_upload, file.file, file_path)
         
-        return resume
+        return await register_uploaded_resume(resume_id, file.filename, file_path, meta_dict)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in upload_resume: {str(e)}")
+        logger.error("Error in upload_resume: %s", e)
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+async def write_request_body(request: Request, dest, filename: str) -> None:
+    """
+    Write a streamed request body to an open binary file, off the event loop
+    
+    The ASGI server's small body chunks are collected into UPLOAD_CHUNK_SIZE writes, each run in
+    a worker thread. Nothing is written until the first PDF_HEADER_SEARCH_BYTES bytes (or the whole
+    body, if shorter) have passed check_pdf_upload, so a bad upload is rejected without storing it.
+    
+    Args:
+        request: The incoming request
+        dest: Destination file opened for binary writing
+        filename: Name of the uploaded file, used for the PDF header check
+        
+    Raises:
+        HTTPException: 400 if a .pdf body has no PDF header, 413 once the body exceeds
+            MAX_STREAM_UPLOAD_BYTES
+    """
+    size = 0
+    pending = bytearray()
+    header_checked = False
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_STREAM_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="The uploaded file is too large")
+        pending += chunk
+        if not header_checked:
+            if len(pending) < PDF_HEADER_SEARCH_BYTES:
+                continue
+            # Nothing has been written yet, so pending starts at the beginning of the body
+            check_pdf_upload(filename, bytes(pending[:PDF_HEADER_SEARCH_BYTES]))
+            header_checked = True
+        if len(pending) >= UPLOAD_CHUNK_SIZE:
+            await asyncio.to_thread(dest.write, pending)
+            pending = bytearray()
+    if not header_checked:
+        check_pdf_upload(filename, bytes(pending))
+    if pending:
+        await asyncio.to_thread(dest.write, pending)
+
+@app.post("/api/resumes/upload-stream")
+async def upload_resume_stream(request: Request, filename: str, metadata: str = "{}"):
+    """
+    Upload a resume sent as the raw request body, with the filename and metadata JSON as query parameters
+    
+    The body is written to its final path as it arrives, skipping the multipart parse and the
+    spooled temporary copy that /api/resumes/upload goes through.
+    """
+    try:
+        meta_dict = orjson.loads(metadata)
+        filename = Path(filename).name
+        if not filename:
+            raise HTTPException(status_code=400, detail="A filename is required")
+        
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > MAX_STREAM_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="The uploaded file is too large")
+        
+        resume_id, file_path = new_resume_file_path(filename)
+        dest = await asyncio.to_thread(open, file_path, "wb")
+        try:
+            await write_request_body(request, dest, filename)
+            await asyncio.to_thread(dest.close)
+        except BaseException:
+            # Don't leave a partial or rejected file behind
+            await asyncio.to_thread(discard_upload, dest, file_path)
+            raise
+        
+        return await register_uploaded_resume(resume_id, filename, file_path, meta_dict)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error in upload_resume_stream: %s", e)
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 @app.get("/api/resumes/user")
@@ -542,14 +1134,14 @@ async def get_user_resumes():
     Get resumes for the current user
     """
     try:
-        # Reload resumes from file to ensure we have the latest data
-        global USER_RESUMES
-        USER_RESUMES = load_resumes()
+        # USER_RESUMES is the source of truth (loaded from resumes.json at startup and written back
+        # on every change); reloading the file here could drop a resume whose write is in flight
         
         # Print the current resumes for debugging
-        print(f"Returning {len(USER_RESUMES)} resumes from storage")
-        for r in USER_RESUMES:
-            print(f"  - {r['id']}: {r['filename']}")
+        logger.info("Returning %d resumes from storage", len(USER_RESUMES))
+        if logger.isEnabledFor(logging.DEBUG):
+            for r in USER_RESUMES.values():
+                logger.debug("  - %s: %s", r['id'], r['filename'])
             
         # If we have no resumes, create some mock data
         if not USER_RESUMES:
@@ -583,24 +1175,64 @@ async def get_user_resumes():
                     "category": ""
                 }
             ]
-            USER_RESUMES.extend(mock_resumes)
-            save_resumes(USER_RESUMES)
+            for mock_resume in mock_resumes:
+                USER_RESUMES[mock_resume["id"]] = mock_resume
+                index_resume(mock_resume)
+            await persist_resumes()
             
-        return USER_RESUMES
+        return list(USER_RESUMES.values())
     except Exception as e:
-        print(f"Error in get_user_resumes: {str(e)}")
-        return JSONResponse(
+        logger.error("Error in get_user_resumes: %s", e)
+        return ORJSONResponse(
             status_code=500,
             content={"detail": f"Failed to get resumes: {str(e)}"}
         )
 
+# Resumes whose relevance is being scored by the LLM at the same time during one search
+SEARCH_SCORING_CONCURRENCY = 8
+
+def read_resume_content(resume) -> str:
+    """
+    Extract the text of a stored resume file for relevance scoring
+    
+    Args:
+        resume: Stored resume with a file_path
+        
+    Returns:
+        The resume text ("" for unsupported formats)
+    """
+    file_extension = Path(resume["file_path"]).suffix.lower()
+    if file_extension == ".pdf":
+        resume_content = extract_text_from_pdf(resume["file_path"])
+        if not resume_content or len(resume_content.strip()) < 100:
+            logger.warning("Primary PDF extraction failed for %s. Trying pdfplumber fallback.", resume['filename'])
+            resume_content = extract_with_pdfplumber(resume["file_path"])
+        return resume_content
+    if file_extension == ".txt":
+        with open(resume["file_path"], "r") as f:
+            return f.read()
+    logger.warning("Unsupported file format for %s. Skipping LLM scoring.", resume['filename'])
+    return ""
+
 @app.post("/api/resumes/search")
 async def search_resume(search_query: SearchQuery):
     """
     Search for resumes based on query and filters
     """
     try:
-        print(f"Received search query: {search_query.query}")
+        logger.info("Received search query: %s", search_query.query)
+        
+        # Serve repeated (semantically identical) queries from the cache
+        # A random mock embedding would never match anything and would only pollute the cache,
+        # so without a real embedding use the zero vector, which the cache ignores
+        query_embedding = await get_embedding(search_query.query, fallback_to_mock=False, client=app.state.http)
+        if query_embedding is None:
+            query_embedding = _ZERO_EMBED
+        top_k = search_query.top_k or 20
+        cached = SEARCH_CACHE.get(query_embedding)
+        if cached is not None and cached[0] >= top_k:
+            logger.info("Returning cached results for a similar search query")
+            return cached[1][:top_k]
         
         # If no results or no user resumes, return mock data
         mock_results_data = [
@@ -643,68 +1275,76 @@ async def search_resume(search_query: SearchQuery):
         ]
         
         if USER_RESUMES and len(USER_RESUMES) > 0:
-            print(f"Searching through {len(USER_RESUMES)} user resumes")
+            logger.info("Searching through %d user resumes", len(USER_RESUMES))
             
-            results = []
-            for resume in USER_RESUMES:
-                resume_content = ""
+            keywords = tokenize(search_query.query)
+            keyword_pattern = compile_keyword_pattern(keywords)
+            # Only resumes sharing at least one keyword can get a non-zero keyword score
+            candidate_ids = set().union(*(SKILL_INDEX.get(keyword, ()) for keyword in keywords))
+            # Embedding similarity for every embedded resume in a single matrix-vector product
+            semantic_scores = EMBED_INDEX.scores(query_embedding)
+            semaphore = asyncio.Semaphore(SEARCH_SCORING_CONCURRENCY)
+            
+            async def score_resume(resume):
                 # Try to extract text from PDF or TXT, falling back if needed
                 if resume.get("file_path"):
                     try:
-                        file_extension = Path(resume["file_path"]).suffix.lower()
-                        if file_extension == ".pdf":
-                            resume_content = extract_text_from_pdf(resume["file_path"])
-                            if not resume_content or len(resume_content.strip()) < 100:
-                                print(f"Warning: Primary PDF extraction failed for {resume['filename']}. Trying pdfplumber fallback.")
-                                resume_content = extract_with_pdfplumber(resume["file_path"])
-                        elif file_extension == ".txt":
-                            with open(resume["file_path"], "r") as f:
-                                resume_content = f.read()
-                        else:
-                            print(f"Warning: Unsupported file format for {resume['filename']}. Skipping LLM scoring.")
-                            llm_score_result = {"score": 0, "reason": "Unsupported file format for LLM analysis.", "source": "unsupported_format_fallback"}
-
+                        # Extraction is blocking file and CPU work, so it runs off the event loop
+                        resume_content = await asyncio.to_thread(read_resume_content, resume)
+                        
                         if resume_content and len(resume_content.strip()) >= 50: # Minimum content length to attempt LLM scoring
                             # Get LLM-based relevance score
-                            print(f"Getting LLM relevance score for {resume['filename']} with query: {search_query.query[:50]}...")
-                            llm_score_result = await get_relevance_score_with_openrouter(
-                                job_query=search_query.query,
-                                resume_text=resume_content
-                            )
+                            logger.debug("Getting LLM relevance score for %s with query: %s...", resume['filename'], search_query.query[:50])
+                            async with semaphore:
+                                llm_score_result = await get_relevance_score_with_openrouter(
+                                    job_query=search_query.query,
+                                    resume_text=resume_content,
+                                    client=app.state.http
+                                )
                             llm_score_result["source"] = llm_score_result.get("source", "openrouter_llm")
                         else:
-                            print(f"Warning: Not enough content extracted from {resume['filename']}. Using mock score.")
-                            llm_score_result = {"score": random.randint(30, 60), "reason": "Insufficient resume content for LLM analysis.", "source": "mock_content_fallback"}
+                            logger.warning("Not enough content extracted from %s. Using keyword score.", resume['filename'])
+                            llm_score_result = keyword_score(keyword_pattern, resume, candidate_ids, "Insufficient resume content for LLM analysis.", "mock_content_fallback", similarity=semantic_scores.get(resume["id"]))
 
                     except Exception as e:
-                        print(f"Error processing resume {resume.get('filename', '')}: {str(e)}. Using mock score.")
-                        llm_score_result = {"score": random.randint(30, 60), "reason": f"Error during LLM analysis: {str(e)}", "source": "llm_error_fallback"}
+                        logger.error("Error processing resume %s: %s. Using keyword score.", resume.get('filename', ''), e)
+                        llm_score_result = keyword_score(keyword_pattern, resume, candidate_ids, f"Error during LLM analysis: {str(e)}", "llm_error_fallback", similarity=semantic_scores.get(resume["id"]))
                 else:
-                    print(f"No file_path for {resume.get('filename', '')}. Using mock score.")
-                    llm_score_result = {"score": random.randint(20, 50), "reason": "Resume file path missing.", "source": "no_file_path_fallback"}
+                    logger.warning("No file_path for %s. Using keyword score.", resume.get('filename', ''))
+                    llm_score_result = keyword_score(keyword_pattern, resume, candidate_ids, "Resume file path missing.", "no_file_path_fallback", similarity=semantic_scores.get(resume["id"]))
 
                 result = resume.copy()
                 result["match_score"] = llm_score_result["score"]
                 result["match_reason"] = llm_score_result["reason"]
                 result["score_source"] = llm_score_result["source"]
-                results.append(result)
+                return result, llm_score_result.get("hits")
             
-            # Sort by match score
-            results.sort(key=lambda x: x.get("match_score", 0), reverse=True)
+            # Resumes are scored concurrently, with at most SEARCH_SCORING_CONCURRENCY LLM calls in flight
+            scored = await asyncio.gather(*(score_resume(resume) for resume in list(USER_RESUMES.values())))
+            results = [result for result, _ in scored]
+            keyword_hits = {result["id"]: hits for result, hits in scored if hits}
+            
+            # Keep only the top_k results by match score
+            results = heapq.nlargest(top_k, results, key=lambda x: x.get("match_score", 0))
+            for result in results:
+                hits = keyword_hits.get(result["id"])
+                if hits:
+                    result["match_reason"] = f"{result['match_reason']} Keyword match on: {', '.join(sorted(hits))}."
             
             if results:
-                print(f"Found {len(results)} matching resumes using LLM scoring")
+                logger.info("Found %d matching resumes using LLM scoring", len(results))
+                SEARCH_CACHE.put(query_embedding, (top_k, results))
                 return results
             else:
-                print("No matches found after LLM scoring attempts, returning mock data.")
+                logger.warning("No matches found after LLM scoring attempts, returning mock data.")
                 return mock_results_data # Fallback if LLM scoring yielded no relevant results
         else:
-            print("No user resumes found, returning mock data.")
+            logger.info("No user resumes found, returning mock data.")
             return mock_results_data
 
     except Exception as e:
-        print(f"Error in search_resume: {str(e)}")
-        return JSONResponse(
+        logger.error("Error in search_resume: %s", e)
+        return ORJSONResponse(
             status_code=500,
             content={"detail": f"Resume search failed: {str(e)}"}
         )
@@ -718,60 +1358,77 @@ async def get_all_resumes():
         # Return user resumes for now
         return await get_user_resumes()
     except Exception as e:
-        print(f"Error in get_all_resumes: {str(e)}")
-        return JSONResponse(
+        logger.error("Error in get_all_resumes: %s", e)
+        return ORJSONResponse(
             status_code=500,
             content={"detail": f"Failed to get resumes: {str(e)}"}
         )
 
+# Placeholder served when a resume's file is missing; small enough to send straight from memory
+MOCK_PDF_BYTES = b"%PDF-1.5\n%Mock Resume PDF"
+
+def mock_pdf_response(filename: str) -> Response:
+    """Build a download response for the mock PDF with an explicit type, length and filename"""
+    quoted_filename = quote(filename)
+    if quoted_filename != filename:
+        content_disposition = f"attachment; filename*=utf-8''{quoted_filename}"
+    else:
+        content_disposition = f'attachment; filename="{filename}"'
+    return Response(
+        content=MOCK_PDF_BYTES,
+        media_type="application/pdf",
+        headers={"Content-Disposition": content_disposition}
+    )
+
+def stored_file_response(request: Request, path: Path, filename: str) -> Response:
+    """
+    Build a download response for a stored file
+    
+    The file is stat'ed once and the result handed to FileResponse, which derives the
+    ETag and Last-Modified headers from it. When the client's If-None-Match matches,
+    a bodiless 304 is returned and the file isn't read at all.
+    
+    Args:
+        request: The incoming request (for its conditional headers)
+        path: Path of the stored file
+        filename: Filename for the Content-Disposition header
+        
+    Returns:
+        A FileResponse, or a 304 Not Modified response
+    """
+    response = FileResponse(path=path, filename=filename, media_type="application/pdf", stat_result=os.stat(path))
+    etag = response.headers["etag"]
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag, "Last-Modified": response.headers["last-modified"]})
+    return response
+
 @app.get("/api/resumes/download/{resume_id}")
-async def download_resume(resume_id: str):
+async def download_resume(resume_id: str, request: Request):
     """
     Download a resume by ID
     """
     try:
         # Find the resume in our in-memory storage
-        resume = next((r for r in USER_RESUMES if r["id"] == resume_id), None)
+        resume = USER_RESUMES.get(resume_id)
         
         if not resume:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=404,
                 content={"detail": f"Resume {resume_id} not found"}
             )
         
-        # Look for the file in the storage directory
-        storage_dir = Path("./storage/resumes")
+        # Look up the stored file for this resume ID
+        file_path = RESUME_FILE_PATHS.get(resume_id)
         
-        # Try to find the file with the resume ID prefix
-        resume_files = list(storage_dir.glob(f"{resume_id}_*"))
-        
-        if not resume_files:
+        if file_path is None:
             # If no file found, return a mock PDF
-            print(f"No file found for resume {resume_id}, returning mock PDF")
-            mock_pdf_path = Path("./storage/mock_resume.pdf")
-            
-            # Create a mock PDF if it doesn't exist
-            if not mock_pdf_path.exists():
-                mock_pdf_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(mock_pdf_path, "wb") as f:
-                    f.write(b"%PDF-1.5\n%Mock Resume PDF")
-            
-            return FileResponse(
-                path=str(mock_pdf_path),
-                filename=f"{resume['filename']}",
-                media_type="application/pdf"
-            )
+            logger.warning("No file found for resume %s, returning mock PDF", resume_id)
+            return mock_pdf_response(resume["filename"])
         
-        # Return the first matching file
-        file_path = resume_files[0]
-        return FileResponse(
-            path=str(file_path),
-            filename=resume["filename"],
-            media_type="application/pdf"
-        )
+        return stored_file_response(request, Path(file_path), resume["filename"])
     except Exception as e:
-        print(f"Error in download_resume: {str(e)}")
-        return JSONResponse(
+        logger.error("Error in download_resume: %s", e)
+        return ORJSONResponse(
             status_code=500,
             content={"detail": f"Failed to download resume: {str(e)}"}
         )
@@ -782,29 +1439,31 @@ async def delete_resume(resume_id: str):
     Delete a resume by ID
     """
     try:
-        global USER_RESUMES
         # Find the resume to delete
-        resume_to_delete = next((r for r in USER_RESUMES if r["id"] == resume_id), None)
+        resume_to_delete = USER_RESUMES.pop(resume_id, None)
         if resume_to_delete:
             # Delete the file if it exists
-            file_path = Path(resume_to_delete.get("file_path", ""))
-            if file_path.exists():
-                file_path.unlink()
+            file_path = resume_to_delete.get("file_path")
+            if file_path:
+                await asyncio.to_thread(Path(file_path).unlink, missing_ok=True)
+            RESUME_FILE_PATHS.pop(resume_id, None)
             
             # Remove from storage
-            USER_RESUMES = [r for r in USER_RESUMES if r["id"] != resume_id]
-            save_resumes(USER_RESUMES)
+            await persist_resumes()
+            unindex_resume(resume_id)
+            EMBED_INDEX.remove(resume_id)
+            SEARCH_CACHE.clear()
             
         return {"status": "success", "message": f"Resume {resume_id} deleted successfully"}
     except Exception as e:
-        print(f"Error in delete_resume: {str(e)}")
-        return JSONResponse(
+        logger.error("Error in delete_resume: %s", e)
+        return ORJSONResponse(
             status_code=500,
             content={"detail": f"Failed to delete resume: {str(e)}"}
         )
 
 @app.get("/download/{file_path:path}")
-async def download_file(file_path: str):
+async def download_file(file_path: str, request: Request):
     """
     Download a file from local storage
     """
@@ -812,26 +1471,12 @@ async def download_file(file_path: str):
         file_full_path = LOCAL_STORAGE_DIR / file_path
         if not file_full_path.exists():
             # Return a mock PDF for demo
-            mock_file = LOCAL_STORAGE_DIR / "mock_resume.pdf"
-            if not mock_file.exists():
-                # Create an empty file
-                with open(mock_file, "wb") as f:
-                    f.write(b"Mock PDF content")
-            
-            return FileResponse(
-                path=mock_file,
-                filename="mock_resume.pdf",
-                media_type="application/pdf"
-            )
+            return mock_pdf_response("mock_resume.pdf")
         
-        return FileResponse(
-            path=file_full_path,
-            filename=file_full_path.name,
-            media_type="application/pdf"
-        )
+        return stored_file_response(request, file_full_path, file_full_path.name)
     except Exception as e:
-        print(f"Error in download_file: {str(e)}")
-        return JSONResponse(
+        logger.error("Error in download_file: %s", e)
+        return ORJSONResponse(
             status_code=500,
             content={"detail": f"Failed to download file: {str(e)}"}
         )
@@ -843,24 +1488,17 @@ if __name__ == "__main__":
         
         # Handle model loading based on selected mode
         if ANALYZER_MODE == "llama_cpp" and LLAMA_CPP_AVAILABLE:
-            print("Starting llama.cpp model download and setup...")
-            # Download a quantized, small GGUF model that runs well on CPU
-            model_url = "https://huggingface.co/TheBloke/Llama-2-7B-Chat-GGUF/resolve/main/llama-2-7b-chat.Q4_K_M.gguf"
-            model_path = download_model(model_url)
+            logger.info("Starting llama.cpp model download and setup...")
+            # Download the quantized GGUF model selected by LLAMA_CPP_QUANT (Q4_K_M by default, runs well on CPU)
+            model_path = download_model()
             if model_path:
-                print(f"Model downloaded to {model_path}. Will use this for resume analysis.")
+                logger.info("Model downloaded to %s. Will use this for resume analysis.", model_path)
             else:
-                print("Failed to download model. Will fall back to regex analysis.")
+                logger.error("Failed to download model. Will fall back to regex analysis.")
                 ANALYZER_MODE = "regex"
-                
-        # Preload the TinyLlama model if we're using offline mode
-        elif ANALYZER_MODE == "offline" and OFFLINE_MISTRAL_AVAILABLE:
-            from services.mistral_offline import preload_model
-            print("Preloading TinyLlama model for resume analysis...")
-            preload_model()
-            print("Model preloaded successfully")
         
+        # Local models are preloaded by the app's lifespan handler in the server process
         # Run the app
         uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
     except Exception as e:
-        print(f"Failed to start server: {str(e)}") 
\ No newline at end of file
+        logger.error("Failed to start server: %s", e)
\ No newline at end of file
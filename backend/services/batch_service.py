@@ -0,0 +1,125 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class AsyncBatcher:
+    """
+    Collects items submitted by concurrent callers into small batches.
+
+    Each caller awaits its own result while a single consumer task drains the
+    queue, waiting at most max_wait_ms for up to max_batch items, and hands the
+    whole batch to batch_fn. batch_fn must return one result per item, in order.
+
+    Up to max_concurrency batches run at once, each in its own task. Keep the
+    default of 1 for a single in-process model that can only run one batch at a
+    time; network-backed batch_fns can overlap so one slow request doesn't hold
+    up every later batch.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch: int = 8,
+        max_wait_ms: float = 20,
+        max_concurrency: int = 1,
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+        self._queue: Optional["asyncio.Queue[Tuple[Any, asyncio.Future]]"] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        # Batch tasks in flight, with the batch each one is running
+        self._running: Dict[asyncio.Task, List[Tuple[Any, asyncio.Future]]] = {}
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue an item and wait for its result
+
+        Args:
+            item: Input for batch_fn
+
+        Returns:
+            The result batch_fn produced for this item
+        """
+        # Created lazily so the queue, semaphore and task belong to the running event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.create_task(self._consume())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Items keep queueing (and so batch up further) while every slot is busy
+                await self._slots.acquire()
+            except asyncio.CancelledError:
+                _fail(batch, RuntimeError("The batcher was closed"))
+                raise
+
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running[task] = batch
+            task.add_done_callback(lambda done: self._running.pop(done, None))
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except asyncio.CancelledError:
+            _fail(batch, RuntimeError("The batcher was closed"))
+            raise
+        except Exception as e:
+            _fail(batch, e)
+            return
+        finally:
+            self._slots.release()
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Stop the consumer and running batches, failing every caller still waiting for a result"""
+        error = RuntimeError("The batcher was closed")
+        running = dict(self._running)
+        tasks = list(running)
+        if self._consumer is not None:
+            tasks.append(self._consumer)
+            self._consumer = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # A batch task cancelled before it started never ran its own cleanup
+        for batch in running.values():
+            _fail(batch, error)
+        if self._queue is not None:
+            while not self._queue.empty():
+                _fail([self._queue.get_nowait()], error)
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+
+def _fail(batch: List[Tuple[Any, asyncio.Future]], error: BaseException) -> None:
+    """Resolve the still-pending futures of a batch with an exception"""
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+import numpy as np
+
+# Optional MinHash LSH for near-duplicate lookups
+try:
+    from datasketch import MinHash, MinHashLSH
+    DATASKETCH_AVAILABLE = True
+except ImportError:
+    DATASKETCH_AVAILABLE = False
+
+
+class SemanticCache:
+    """
+    In-process cache of search results keyed by query embedding.
+
+    Entries are kept as one contiguous float32 matrix of unit-normalized query
+    embeddings so a lookup is a single matrix-vector product. A cached result is
+    returned when the cosine similarity to a previous query reaches the threshold.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1024):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None  # (N, D) float32, rows normalized
+        self._results: List[Any] = []
+        self._last_used: List[float] = []
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+        return vector / norm
+
+    def get(self, embedding) -> Optional[Any]:
+        """
+        Return the cached result for the most similar previous query, if any
+
+        Args:
+            embedding: Embedding of the incoming query
+
+        Returns:
+            The cached result or None on a miss
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                return None
+
+            scores = self._matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            self._last_used[best] = time.monotonic()
+            return self._results[best]
+
+    def put(self, embedding, result: Any) -> None:
+        """
+        Store a result for a query embedding, evicting the least recently used entry when full
+
+        Args:
+            embedding: Embedding of the query
+            result: Result to return for similar queries
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return
+
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                # First entry (or the embedding model changed): start a fresh matrix
+                self._matrix = query[np.newaxis, :]
+                self._results = [result]
+                self._last_used = [time.monotonic()]
+                return
+
+            if len(self._results) >= self.max_entries:
+                lru = int(np.argmin(self._last_used))
+                self._matrix[lru] = query
+                self._results[lru] = result
+                self._last_used[lru] = time.monotonic()
+                return
+
+            self._matrix = np.vstack([self._matrix, query])
+            self._results.append(result)
+            self._last_used.append(time.monotonic())
+
+    def clear(self) -> None:
+        """Drop all cached entries (e.g. when the underlying documents change)"""
+        with self._lock:
+            self._matrix = None
+            self._results = []
+            self._last_used = []
+
+
+class LRUCache:
+    """
+    Small thread-safe least-recently-used cache for hashable keys.
+
+    Used for results that are expensive to recompute but exactly keyed,
+    such as resume analyses keyed by a hash of the resume text.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for a key (marking it recently used), or None on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index over previously cached texts, used to find a near-duplicate
+    (e.g. the same resume with whitespace or header tweaks) when an exact-hash lookup misses.
+
+    Texts are whitespace-normalized, lowercased and split into character shingles. Without
+    datasketch installed the index is a no-op and every lookup misses.
+    """
+
+    def __init__(self, threshold: float = 0.95, num_perm: int = 128, shingle_size: int = 5, max_entries: int = 10000):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._minhashes: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lsh = MinHashLSH(threshold=threshold, num_perm=num_perm) if DATASKETCH_AVAILABLE else None
+
+    def _minhash(self, text: str):
+        normalized = " ".join(text.lower().split())
+        k = self.shingle_size
+        shingles = {normalized[i:i + k] for i in range(max(1, len(normalized) - k + 1))}
+        minhash = MinHash(num_perm=self.num_perm)
+        minhash.update_batch([shingle.encode("utf-8") for shingle in shingles])
+        return minhash
+
+    def find(self, text: str) -> Optional[Hashable]:
+        """
+        Return the key of the most similar indexed text, if any is a near-duplicate
+
+        Args:
+            text: Text to look up
+
+        Returns:
+            Key of the near-duplicate or None
+        """
+        if self._lsh is None:
+            return None
+        minhash = self._minhash(text)
+        with self._lock:
+            best_key, best_similarity = None, self.threshold
+            # LSH candidates are approximate, so re-check the estimated Jaccard similarity
+            for key in self._lsh.query(minhash):
+                similarity = minhash.jaccard(self._minhashes[key])
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+            return best_key
+
+    def add(self, key: Hashable, text: str) -> None:
+        """Index a text under a key, evicting the oldest entry when full"""
+        if self._lsh is None:
+            return
+        minhash = self._minhash(text)
+        with self._lock:
+            if key in self._minhashes:
+                return
+            self._lsh.insert(key, minhash)
+            self._minhashes[key] = minhash
+            while len(self._minhashes) > self.max_entries:
+                oldest, _ = self._minhashes.popitem(last=False)
+                self._lsh.remove(oldest)
+
+    def clear(self) -> None:
+        """Drop all indexed texts"""
+        if self._lsh is None:
+            return
+        with self._lock:
+            self._minhashes.clear()
+            self._lsh = MinHashLSH(threshold=self.threshold, num_perm=self.num_perm)
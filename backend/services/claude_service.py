@@ -1,14 +1,292 @@
 import re
 import json
+import hashlib
 import random
-from typing import Dict, List, Any
+import threading
+from collections import defaultdict
+from typing import Dict, List, Any, NamedTuple, Optional, Set
 from datetime import datetime, timedelta
 import logging
+from services.cache_service import LRUCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Optional Hyperscan engine, matching every skill, education and category pattern in one scan
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# Patterns are compiled once at import instead of on every call (each re.search with a string
+# pattern goes through re's compile cache lookup). Patterns that only ever run on the text
+# analyze_resume_with_regex has already lowercased are written in lowercase and compiled without
+# IGNORECASE, so matching doesn't case-fold every character again.
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\.]')
+
+# Direct mentions of years of experience
+_DIRECT_EXPERIENCE_PATTERNS = [re.compile(pattern) for pattern in (
+    r'(\d+)\+?\s+years?(?:\s+of)?\s+experience',
+    r'experience\s+(?:of\s+)?(\d+)\+?\s+years?',
+    r'(?:over|more\s+than)\s+(\d+)\s+years?(?:\s+of)?\s+experience',
+    r'(\d+)\s*\+\s*years?(?:\s+of)?\s+(?:industry|professional|work)',
+)]
+
+# Date ranges in work history
+_DATE_RANGE_PATTERNS = [re.compile(pattern) for pattern in (
+    # Mon Year - Mon Year or Present format
+    r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(\d{4})\s*(?:–|-|to)\s*(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(\d{4})|present|current)',
+    # Year - Year or Present format
+    r'(\d{4})\s*(?:–|-|to)\s*(?:(\d{4})|present|current)',
+)]
+
+_GRADUATION_PATTERNS = [re.compile(pattern) for pattern in (
+    r'graduated\s+(?:in|on)?\s*(\d{4})',
+    r'class\s+of\s+(\d{4})',
+    r'(?:degree|diploma|certificate)\s+(?:received|awarded|conferred)\s+(?:in|on)?\s*(\d{4})'
+)]
+
+# Education levels and their keyword patterns, highest first
+_EDUCATION_PATTERNS = [(level, re.compile(pattern)) for level, pattern in (
+    ("PhD", r'\b(?:ph\.?d\.?|doctor\s+of\s+philosophy|doctoral)\b'),
+    ("Master's", r'\b(?:master\'?s?|ms\.?|m\.s\.?|m\.a\.?|mba|m\.b\.a\.?)\b'),
+    ("Bachelor's", r'\b(?:bachelor\'?s?|ba|b\.a\.?|bs|b\.s\.?|b\.e\.?|btech|b\.tech\.?)\b'),
+    ("Associate's", r'\b(?:associate\'?s?|a\.a\.?|a\.s\.?|a\.a\.s\.?)\b'),
+    ("High School", r'\b(?:high\s+school|secondary\s+school|diploma|g\.?e\.?d\.?)\b')
+)]
+
+_COLLEGE_PATTERNS = [re.compile(pattern) for pattern in (
+    r'\b(?:university|college|institute|school)\s+of\b',
+    r'\b(?:university|college|institute)\b'
+)]
+
+# Comprehensive list of common technical and soft skills (as regex fragments)
+_COMMON_TECH_SKILLS = [
+    # Programming Languages
+    "python", "java", "javascript", "typescript", "c\\+\\+", "c#", "ruby", "php", "swift", "kotlin", "go", "rust",
+    "scala", "perl", "r", "matlab", "bash", "shell", "sql", "html", "css", "sass", "less",
+
+    # Frameworks & Libraries
+    "react", "angular", "vue", "django", "flask", "spring", "asp\\.net", "node\\.js", "express\\.js", 
+    "jquery", "bootstrap", "tailwind", "laravel", "symfony", "rails", "pytorch", "tensorflow",
+    "keras", "scikit-learn", "pandas", "numpy", "matplotlib", "seaborn", 
+
+    # Cloud & DevOps
+    "aws", "azure", "gcp", "google cloud", "docker", "kubernetes", "terraform", "jenkins", "github actions",
+    "circleci", "travis", "ansible", "chef", "puppet", "serverless", "lambda", "s3", "ec2", "rds",
+
+    # Databases
+    "mysql", "postgresql", "mongodb", "sqlite", "oracle", "sql server", "dynamodb", "cassandra", "redis",
+    "elasticsearch", "firebase", "neo4j",
+
+    # Tools & Methodologies
+    "git", "github", "gitlab", "bitbucket", "jira", "confluence", "agile", "scrum", "kanban", "tdd", "ci/cd",
+    "rest", "graphql", "soap", "microservices", "mvc", "oop", "functional programming",
+
+    # Data Science & AI
+    "machine learning", "deep learning", "artificial intelligence", "nlp", "computer vision", "data mining",
+    "data analysis", "data visualization", "statistical analysis", "a/b testing", "big data", "hadoop", "spark",
+
+    # Design & UX
+    "figma", "sketch", "adobe xd", "photoshop", "illustrator", "ui design", "ux design", "wireframing",
+    "prototyping", "responsive design", "accessibility", "user research",
+
+    # Soft Skills
+    "leadership", "communication", "teamwork", "problem solving", "critical thinking", "time management",
+    "project management", "customer service", "presentation", "negotiation", "conflict resolution"
+]
+
+# Each skill with word boundaries for more precise matching
+_SKILL_PATTERNS = [(skill, re.compile(r'\b' + skill + r'\b', re.IGNORECASE)) for skill in _COMMON_TECH_SKILLS]
+
+# Every skill in one alternation (longest first, one named group per skill) so the text is
+# scanned once instead of once per skill. An alternation reports one skill per position, so
+# skills that occur inside another one ("sql" in "sql server") are looked up in that match.
+_SKILL_ORDER = sorted(range(len(_COMMON_TECH_SKILLS)), key=lambda i: -len(_COMMON_TECH_SKILLS[i]))
+_SKILL_RE = re.compile(
+    r'\b(?:' + '|'.join(f'(?P<s{i}>{_COMMON_TECH_SKILLS[i]})' for i in _SKILL_ORDER) + r')\b',
+    re.IGNORECASE
+)
+_NESTED_SKILLS = {
+    f's{i}': [
+        (f's{j}', pattern) for j, (_, pattern) in enumerate(_SKILL_PATTERNS)
+        if j != i and pattern.search(_COMMON_TECH_SKILLS[i].replace('\\', ''))
+    ]
+    for i in range(len(_COMMON_TECH_SKILLS))
+}
+
+# Skill-specific sections in the resume
+_SKILL_SECTION_PATTERNS = [re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in (
+    r'(?:technical|core|key|professional)\s+skills?[\s\:]+(.+?)(?:\n\n|\n[A-Z])',
+    r'skills(?:\s+&|\s+and)?\s+(?:expertise|proficiencies)[\s\:]+(.+?)(?:\n\n|\n[A-Z])',
+    r'(?:technical|professional|areas\s+of)\s+expertise[\s\:]+(.+?)(?:\n\n|\n[A-Z])'
+)]
+# Common separators in skill lists
+_SKILL_SEPARATOR_RE = re.compile(r'[,•|;]|\s+and\s+|\n-\s+|\n•\s+')
+_CERTIFICATION_RE = re.compile(r'\b(?:certified|certification|certificate)\s+(?:in|as|on)?\s+([a-z0-9\s\-]+)')
+_CAPITALIZED_WORD_RE = re.compile(r'\b[A-Z][a-zA-Z]+\b')
+
+# Job categories and their associated keywords
+_JOB_CATEGORIES = {
+    "Software Engineering": ["software engineer", "developer", "programmer", "coding", "java", "python", "c#", 
+                           "javascript", "react", "angular", "vue", "web development", "frontend", "backend",
+                           "full stack", "mobile app", "android", "ios", "api", "agile", "scrum", "devops"],
+
+    "Data Science": ["data scientist", "machine learning", "ml", "ai", "artificial intelligence", "deep learning",
+                    "statistics", "statistical analysis", "r", "python", "pandas", "numpy", "tensorflow",
+                    "pytorch", "data mining", "data analysis", "big data", "data visualization", "model"],
+
+    "Data Engineering": ["data engineer", "data pipeline", "etl", "hadoop", "spark", "kafka", "data warehouse",
+                       "data modeling", "sql", "database", "nosql", "data infrastructure", "airflow"],
+
+    "Project Management": ["project manager", "product manager", "program manager", "agile", "scrum", "kanban",
+                         "waterfall", "pmp", "prince2", "stakeholder", "requirement", "roadmap", "timeline",
+                         "project plan", "risk management", "delivery", "milestone"],
+
+    "Marketing": ["marketing", "seo", "sem", "digital marketing", "content marketing", "social media",
+                "campaign", "analytics", "advertising", "market research", "brand", "content strategy",
+                "google analytics", "conversion rate", "growth hacking", "customer acquisition"],
+
+    "Sales": ["sales", "account executive", "business development", "customer acquisition", "lead generation",
+             "sales funnel", "crm", "salesforce", "negotiation", "cold calling", "relationship building",
+             "revenue", "quota", "client relationship", "closing deals"],
+
+    "Customer Support": ["customer support", "customer service", "technical support", "help desk", "client success",
+                       "service desk", "ticketing system", "zendesk", "customer satisfaction", "issue resolution"],
+
+    "Design": ["designer", "graphic design", "ui", "ux", "user interface", "user experience", "visual design",
+              "figma", "sketch", "adobe", "photoshop", "illustrator", "indesign", "typography", "web design"],
+
+    "Human Resources": ["hr", "human resources", "recruitment", "talent acquisition", "onboarding", "employee relations",
+                      "training", "development", "compensation", "benefits", "hr policy", "performance management"],
+
+    "Finance": ["finance", "accounting", "financial analysis", "budget", "forecast", "audit", "tax", "cpa", "cfa",
+              "bookkeeping", "accounts payable", "accounts receivable", "financial statement", "balance sheet"]
+}
+
+_CATEGORY_KEYWORD_PATTERNS = {
+    category: [re.compile(r'\b' + re.escape(keyword) + r'\b') for keyword in keywords]
+    for category, keywords in _JOB_CATEGORIES.items()
+}
+
+# A keyword can only match between word boundaries if each of its words is a whole word of the
+# text, so the re fallback collects the text's words once and only runs the keyword patterns
+# that pass that set check (a few of the ~150 on a typical resume)
+_WORD_RE = re.compile(r'\w+')
+_CATEGORY_KEYWORD_CHECKS = [
+    (category, frozenset(_WORD_RE.findall(keyword)), pattern)
+    for category, keywords in _JOB_CATEGORIES.items()
+    for keyword, pattern in zip(keywords, _CATEGORY_KEYWORD_PATTERNS[category])
+]
+
+class _TermScan(NamedTuple):
+    """Known terms found by one Hyperscan pass over a resume"""
+    skills: Set[str]  # First occurrence of each known skill, with its original capitalization
+    education_levels: Set[str]
+    category_counts: Dict[str, int]
+
+# Hyperscan's word boundaries are ASCII-only (\b isn't supported in its Unicode mode), which
+# only differs from re next to non-ASCII letters
+_HYPERSCAN_FLAGS = (
+    hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST if HYPERSCAN_AVAILABLE else 0
+)
+
+def _build_hyperscan_database():
+    """
+    Compile the skill, education and category patterns into one Hyperscan database
+    
+    Returns:
+        (database, (kind, key) for each expression ID), or (None, []) if Hyperscan is
+        unavailable or rejects a pattern
+    """
+    if not HYPERSCAN_AVAILABLE:
+        return None, []
+    expressions, kinds = [], []
+    for index, (_, pattern) in enumerate(_SKILL_PATTERNS):
+        expressions.append(pattern.pattern)
+        kinds.append(("skill", index))
+    for level, pattern in _EDUCATION_PATTERNS:
+        expressions.append(pattern.pattern)
+        kinds.append(("education", level))
+    for category, patterns in _CATEGORY_KEYWORD_PATTERNS.items():
+        for pattern in patterns:
+            expressions.append(pattern.pattern)
+            kinds.append(("category", category))
+    try:
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[expression.encode("utf-8") for expression in expressions],
+            ids=list(range(len(expressions))),
+            elements=len(expressions),
+            flags=[_HYPERSCAN_FLAGS] * len(expressions)
+        )
+    except Exception as e:
+        logger.warning(f"Could not compile Hyperscan database, using re: {str(e)}")
+        return None, []
+    return database, kinds
+
+_HYPERSCAN_DATABASE, _HYPERSCAN_EXPRESSION_KINDS = _build_hyperscan_database()
+# Hyperscan scratch space can't be shared by concurrent scans, so each thread gets its own
+_hyperscan_local = threading.local()
+
+def _scan_known_terms(original_text: str) -> Optional[_TermScan]:
+    """
+    Find known skills, education levels and category keywords in one Hyperscan pass
+    
+    Args:
+        original_text: The resume text
+        
+    Returns:
+        The terms found, or None when Hyperscan isn't available (callers use re instead)
+    """
+    if _HYPERSCAN_DATABASE is None:
+        return None
+    scratch = getattr(_hyperscan_local, "scratch", None)
+    if scratch is None:
+        scratch = _hyperscan_local.scratch = hyperscan.Scratch(_HYPERSCAN_DATABASE)
+    
+    data = original_text.encode("utf-8", errors="replace")
+    result = _TermScan(set(), set(), defaultdict(int))
+    seen_skills = set()
+    
+    def on_match(expression_id, start, end, flags, context):
+        kind, key = _HYPERSCAN_EXPRESSION_KINDS[expression_id]
+        if kind == "skill":
+            # Matches arrive in order of end offset, so the first one per skill is its first occurrence
+            if key not in seen_skills:
+                seen_skills.add(key)
+                result.skills.add(data[start:end].decode("utf-8", errors="replace"))
+        elif kind == "education":
+            result.education_levels.add(key)
+        else:
+            result.category_counts[key] += 1
+    
+    _HYPERSCAN_DATABASE.scan(data, match_event_handler=on_match, scratch=scratch)
+    return result
+
+# Common job title patterns
+_JOB_TITLE_PATTERNS = [re.compile(pattern) for pattern in (
+    r'(?:^|\n)(?:professional\s+)?(?:experience|title|position)[:\s]+([A-Za-z\s\,\-\&]+)(?:\n|$)',
+    r'(?:^|\n)([A-Z][A-Za-z\s\-]+)(?:\n|$)'  # Look for capitalized lines that might be job titles
+)]
+
+# Candidate name and most recent role
+_NAME_PATTERNS = [re.compile(pattern, re.MULTILINE) for pattern in (
+    r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})$',  # Common format at start of resume
+    r'(?:name|contact)[\s\:]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})'  # After "Name:" or "Contact:"
+)]
+_ROLE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(?:current|present|latest|recent)\s+(?:position|role|title)[:\s]+([A-Za-z\s\,\-\&]+)',
+    r'(?:^|\n)([A-Z][A-Za-z\s\-]+)(?:\n|$)'  # Look for capitalized lines that might be job titles
+)]
+
+# Regex analyses keyed by the blake2b digest of the resume text. Every other analyzer falls back
+# to this one, so duplicate uploads and repeated fallbacks for the same text skip the extractors.
+_REGEX_ANALYSIS_CACHE = LRUCache(max_entries=4096)
+
 def analyze_resume_with_regex(resume_text: str) -> Dict[str, Any]:
     """
     Analyze a resume using regex pattern matching to extract key information.
@@ -20,20 +298,40 @@ def analyze_resume_with_regex(resume_text: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing extracted information
     """
+    text_hash = hashlib.blake2b(resume_text.encode("utf-8", errors="replace"), digest_size=16).digest()
+    cached_result = _REGEX_ANALYSIS_CACHE.get(text_hash)
+    if cached_result is None:
+        cached_result = _analyze_resume_uncached(resume_text)
+        _REGEX_ANALYSIS_CACHE.put(text_hash, cached_result)
+    # Callers may add fields to the result, so each gets its own copy
+    return dict(cached_result, skills=list(cached_result["skills"]))
+
+# Source recorded on regex results that stand in for a failed model analysis
+REGEX_FALLBACK_SOURCE = "regex_fallback"
+
+def analyze_resume_with_regex_fallback(resume_text: str) -> Dict[str, Any]:
+    """
+    analyze_resume_with_regex for an analyzer that failed, marked with source REGEX_FALLBACK_SOURCE
+    so callers can tell it from the model's own answer (e.g. to avoid caching it)
+    """
+    result = analyze_resume_with_regex(resume_text)
+    result["source"] = REGEX_FALLBACK_SOURCE
+    return result
+
+def _analyze_resume_uncached(resume_text: str) -> Dict[str, Any]:
+    """Run every extractor over the resume text (analyze_resume_with_regex without the cache)"""
     # Log a sample of the text for debugging
     logger.info(f"Analyzing resume with regex. Text sample (first 200 chars): {resume_text[:200].replace(chr(10), ' ')}")
     
     # Normalize text for better pattern matching
     normalized_text = resume_text.lower()
     
-    # Clean the text - remove extra whitespace
-    cleaned_text = re.sub(r'\s+', ' ', resume_text).strip()
-    
-    # Extract information using pattern matching
-    skills = extract_skills(normalized_text, resume_text)
+    # Extract information using pattern matching (known terms in one Hyperscan pass when available)
+    term_scan = _scan_known_terms(resume_text)
+    skills = extract_skills(normalized_text, resume_text, term_scan)
     experience_years = extract_experience(normalized_text, resume_text)
-    education_level = extract_education_level(normalized_text, resume_text)
-    job_category = determine_job_category(normalized_text, resume_text)
+    education_level = extract_education_level(normalized_text, resume_text, term_scan)
+    job_category = determine_job_category(normalized_text, resume_text, term_scan)
     
     # Generate a summary
     summary = generate_summary(resume_text, skills, experience_years, education_level, job_category)
@@ -56,13 +354,13 @@ def normalize_text(text: str) -> str:
     text = text.lower()
     
     # Replace multiple spaces with single space
-    text = re.sub(r'\s+', ' ', text)
+    text = _WHITESPACE_RE.sub(' ', text)
     
     # Replace newlines with spaces
     text = text.replace('\n', ' ')
     
     # Remove special characters that might interfere with regex
-    text = re.sub(r'[^\w\s\.]', ' ', text)
+    text = _SPECIAL_CHARS_RE.sub(' ', text)
     
     return text
 
@@ -70,16 +368,8 @@ def extract_experience(normalized_text: str, original_text: str) -> int:
     """
     Extract years of experience from resume text
     """
-    # Pattern for direct mention of years of experience
-    direct_patterns = [
-        r'(\d+)\+?\s+years?(?:\s+of)?\s+experience',
-        r'experience\s+(?:of\s+)?(\d+)\+?\s+years?',
-        r'(?:over|more\s+than)\s+(\d+)\s+years?(?:\s+of)?\s+experience',
-        r'(\d+)\s*\+\s*years?(?:\s+of)?\s+(?:industry|professional|work)',
-    ]
-    
-    for pattern in direct_patterns:
-        match = re.search(pattern, normalized_text)
+    for pattern in _DIRECT_EXPERIENCE_PATTERNS:
+        match = pattern.search(normalized_text)
         if match:
             # Direct mention found
             return int(match.group(1))
@@ -87,16 +377,8 @@ def extract_experience(normalized_text: str, original_text: str) -> int:
     # Try to calculate experience from job history
     job_dates = []
     
-    # Pattern to find date ranges in work history
-    date_patterns = [
-        # Mon Year - Mon Year or Present format
-        r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(\d{4})\s*(?:–|-|to)\s*(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(\d{4})|present|current)',
-        # Year - Year or Present format
-        r'(\d{4})\s*(?:–|-|to)\s*(?:(\d{4})|present|current)',
-    ]
-    
-    for pattern in date_patterns:
-        matches = re.finditer(pattern, normalized_text, re.IGNORECASE)
+    for pattern in _DATE_RANGE_PATTERNS:
+        matches = pattern.finditer(normalized_text)
         for match in matches:
             if match.group(2) and match.group(2).isdigit():
                 # Both years are specified
@@ -140,14 +422,8 @@ def extract_experience(normalized_text: str, original_text: str) -> int:
         return max(total_exp, 1)
     
     # Fallback: Check graduation date if present
-    grad_patterns = [
-        r'graduated\s+(?:in|on)?\s*(\d{4})',
-        r'class\s+of\s+(\d{4})',
-        r'(?:degree|diploma|certificate)\s+(?:received|awarded|conferred)\s+(?:in|on)?\s*(\d{4})'
-    ]
-    
-    for pattern in grad_patterns:
-        match = re.search(pattern, normalized_text)
+    for pattern in _GRADUATION_PATTERNS:
+        match = pattern.search(normalized_text)
         if match:
             grad_year = int(match.group(1))
             current_year = datetime.now().year
@@ -156,7 +432,7 @@ def extract_experience(normalized_text: str, original_text: str) -> int:
                 return max(current_year - grad_year, 0)
     
     # Final fallback: Make an educated guess based on content volume and structure
-    line_count = len(normalized_text.split('\n'))
+    line_count = normalized_text.count('\n') + 1
     word_count = len(normalized_text.split())
     
     if line_count > 70 or word_count > 700:
@@ -166,32 +442,18 @@ def extract_experience(normalized_text: str, original_text: str) -> int:
     else:
         return 1  # Shorter resume suggests less experience
 
-def extract_education_level(normalized_text: str, original_text: str) -> str:
+def extract_education_level(normalized_text: str, original_text: str, term_scan: Optional[_TermScan] = None) -> str:
     """
     Determine the highest level of education from resume text
     """
-    # Define education levels and their keywords patterns
-    education_patterns = {
-        "PhD": r'\b(?:ph\.?d\.?|doctor\s+of\s+philosophy|doctoral)\b',
-        "Master's": r'\b(?:master\'?s?|ms\.?|m\.s\.?|m\.a\.?|mba|m\.b\.a\.?)\b',
-        "Bachelor's": r'\b(?:bachelor\'?s?|ba|b\.a\.?|bs|b\.s\.?|b\.e\.?|btech|b\.tech\.?)\b',
-        "Associate's": r'\b(?:associate\'?s?|a\.a\.?|a\.s\.?|a\.a\.s\.?)\b',
-        "High School": r'\b(?:high\s+school|secondary\s+school|diploma|g\.?e\.?d\.?)\b'
-    }
-    
     # Check for each education level in order of highest to lowest
-    for level, pattern in education_patterns.items():
-        if re.search(pattern, normalized_text, re.IGNORECASE):
+    for level, pattern in _EDUCATION_PATTERNS:
+        if level in term_scan.education_levels if term_scan is not None else pattern.search(normalized_text):
             return level
     
     # If no education level is explicitly mentioned but college names are present
-    college_patterns = [
-        r'\b(?:university|college|institute|school)\s+of\b',
-        r'\b(?:university|college|institute)\b'
-    ]
-    
-    for pattern in college_patterns:
-        if re.search(pattern, normalized_text, re.IGNORECASE):
+    for pattern in _COLLEGE_PATTERNS:
+        if pattern.search(normalized_text):
             # Found a college reference but no specific degree
             # Default to Bachelor's as most common
             return "Bachelor's"
@@ -199,71 +461,38 @@ def extract_education_level(normalized_text: str, original_text: str) -> str:
     # Default if no education information found
     return "High School"
 
-def extract_skills(normalized_text: str, original_text: str) -> List[str]:
+def _find_known_skills(original_text: str) -> Set[str]:
+    """
+    Find the known skills in one pass over the original text
+    
+    Returns:
+        The first occurrence of each skill, with its original capitalization
+    """
+    found_skills = set()
+    seen_skills = set()
+    for match in _SKILL_RE.finditer(original_text):
+        if match.lastgroup not in seen_skills:
+            seen_skills.add(match.lastgroup)
+            found_skills.add(match.group(0))
+        for nested, pattern in _NESTED_SKILLS[match.lastgroup]:
+            if nested not in seen_skills:
+                nested_match = pattern.search(match.group(0))
+                if nested_match:
+                    seen_skills.add(nested)
+                    found_skills.add(nested_match.group(0))
+    return found_skills
+
+def extract_skills(normalized_text: str, original_text: str, term_scan: Optional[_TermScan] = None) -> List[str]:
     """
     Extract skills from resume text using pattern matching and common skill lists
     """
-    # Comprehensive list of common technical and soft skills
-    common_tech_skills = [
-        # Programming Languages
-        "python", "java", "javascript", "typescript", "c\\+\\+", "c#", "ruby", "php", "swift", "kotlin", "go", "rust",
-        "scala", "perl", "r", "matlab", "bash", "shell", "sql", "html", "css", "sass", "less",
-        
-        # Frameworks & Libraries
-        "react", "angular", "vue", "django", "flask", "spring", "asp\\.net", "node\\.js", "express\\.js", 
-        "jquery", "bootstrap", "tailwind", "laravel", "symfony", "rails", "pytorch", "tensorflow",
-        "keras", "scikit-learn", "pandas", "numpy", "matplotlib", "seaborn", 
-        
-        # Cloud & DevOps
-        "aws", "azure", "gcp", "google cloud", "docker", "kubernetes", "terraform", "jenkins", "github actions",
-        "circleci", "travis", "ansible", "chef", "puppet", "serverless", "lambda", "s3", "ec2", "rds",
-        
-        # Databases
-        "mysql", "postgresql", "mongodb", "sqlite", "oracle", "sql server", "dynamodb", "cassandra", "redis",
-        "elasticsearch", "firebase", "neo4j",
-        
-        # Tools & Methodologies
-        "git", "github", "gitlab", "bitbucket", "jira", "confluence", "agile", "scrum", "kanban", "tdd", "ci/cd",
-        "rest", "graphql", "soap", "microservices", "mvc", "oop", "functional programming",
-        
-        # Data Science & AI
-        "machine learning", "deep learning", "artificial intelligence", "nlp", "computer vision", "data mining",
-        "data analysis", "data visualization", "statistical analysis", "a/b testing", "big data", "hadoop", "spark",
-        
-        # Design & UX
-        "figma", "sketch", "adobe xd", "photoshop", "illustrator", "ui design", "ux design", "wireframing",
-        "prototyping", "responsive design", "accessibility", "user research",
-        
-        # Soft Skills
-        "leadership", "communication", "teamwork", "problem solving", "critical thinking", "time management",
-        "project management", "customer service", "presentation", "negotiation", "conflict resolution"
-    ]
-    
     # Extract skills by finding matches with word boundaries
-    found_skills = set()
-    for skill in common_tech_skills:
-        # Use word boundary for more precise matching
-        pattern = r'\b' + skill + r'\b'
-        if re.search(pattern, normalized_text, re.IGNORECASE):
-            # Use the original capitalization if possible by searching in the original text
-            original_match = re.search(pattern, original_text, re.IGNORECASE)
-            if original_match:
-                found_skills.add(original_match.group(0))
-            else:
-                # Format multi-word skills with proper capitalization
-                found_skills.add(' '.join(word.capitalize() if word.lower() not in ('and', 'of', 'the', 'for', 'with') 
-                                        else word.lower() for word in skill.split()))
+    found_skills = _find_known_skills(original_text) if term_scan is None else set(term_scan.skills)
     
     # Look for skill-specific sections in the resume
     skill_sections = []
-    skill_section_patterns = [
-        r'(?:technical|core|key|professional)\s+skills?[\s\:]+(.+?)(?:\n\n|\n[A-Z])',
-        r'skills(?:\s+&|\s+and)?\s+(?:expertise|proficiencies)[\s\:]+(.+?)(?:\n\n|\n[A-Z])',
-        r'(?:technical|professional|areas\s+of)\s+expertise[\s\:]+(.+?)(?:\n\n|\n[A-Z])'
-    ]
-    
-    for pattern in skill_section_patterns:
-        skill_section_match = re.search(pattern, normalized_text, re.IGNORECASE | re.DOTALL)
+    for pattern in _SKILL_SECTION_PATTERNS:
+        skill_section_match = pattern.search(normalized_text)
         if skill_section_match:
             skill_sections.append(skill_section_match.group(1))
     
@@ -271,15 +500,14 @@ def extract_skills(normalized_text: str, original_text: str) -> List[str]:
     if skill_sections:
         for section in skill_sections:
             # Split by common separators in skill lists
-            items = re.split(r'[,•|;]|\s+and\s+|\n-\s+|\n•\s+', section)
+            items = _SKILL_SEPARATOR_RE.split(section)
             for item in items:
                 item = item.strip()
                 if len(item) > 2 and len(item) < 30:  # Reasonable skill name length
                     found_skills.add(item.strip())
     
     # Check for certifications
-    cert_pattern = r'\b(?:certified|certification|certificate)\s+(?:in|as|on)?\s+([A-Za-z0-9\s\-]+)'
-    cert_matches = re.finditer(cert_pattern, normalized_text, re.IGNORECASE)
+    cert_matches = _CERTIFICATION_RE.finditer(normalized_text)
     for match in cert_matches:
         cert = match.group(1).strip()
         if len(cert) > 2 and len(cert) < 50:  # Reasonable certification name length
@@ -291,7 +519,7 @@ def extract_skills(normalized_text: str, original_text: str) -> List[str]:
     # Ensure we have at least some skills even if none were found
     if not skills_list:
         # Look for capitalized words that might be technologies or tools
-        capitalized_words = re.findall(r'\b[A-Z][a-zA-Z]+\b', original_text)
+        capitalized_words = _CAPITALIZED_WORD_RE.findall(original_text)
         for word in capitalized_words:
             if len(word) > 2 and word not in ('I', 'A', 'The', 'In', 'And', 'For'):
                 skills_list.append(word)
@@ -299,56 +527,21 @@ def extract_skills(normalized_text: str, original_text: str) -> List[str]:
     # Limit to top 15 skills to avoid overwhelming results
     return sorted(list(skills_list))[:15]
 
-def determine_job_category(normalized_text: str, original_text: str) -> str:
+def determine_job_category(normalized_text: str, original_text: str, term_scan: Optional[_TermScan] = None) -> str:
     """
     Determine the most likely job category based on resume content
     """
-    # Define job categories and their associated keywords
-    categories = {
-        "Software Engineering": ["software engineer", "developer", "programmer", "coding", "java", "python", "c#", 
-                               "javascript", "react", "angular", "vue", "web development", "frontend", "backend",
-                               "full stack", "mobile app", "android", "ios", "api", "agile", "scrum", "devops"],
-                               
-        "Data Science": ["data scientist", "machine learning", "ml", "ai", "artificial intelligence", "deep learning",
-                        "statistics", "statistical analysis", "r", "python", "pandas", "numpy", "tensorflow",
-                        "pytorch", "data mining", "data analysis", "big data", "data visualization", "model"],
-                        
-        "Data Engineering": ["data engineer", "data pipeline", "etl", "hadoop", "spark", "kafka", "data warehouse",
-                           "data modeling", "sql", "database", "nosql", "data infrastructure", "airflow"],
-                           
-        "Project Management": ["project manager", "product manager", "program manager", "agile", "scrum", "kanban",
-                             "waterfall", "pmp", "prince2", "stakeholder", "requirement", "roadmap", "timeline",
-                             "project plan", "risk management", "delivery", "milestone"],
-                             
-        "Marketing": ["marketing", "seo", "sem", "digital marketing", "content marketing", "social media",
-                    "campaign", "analytics", "advertising", "market research", "brand", "content strategy",
-                    "google analytics", "conversion rate", "growth hacking", "customer acquisition"],
-                    
-        "Sales": ["sales", "account executive", "business development", "customer acquisition", "lead generation",
-                 "sales funnel", "crm", "salesforce", "negotiation", "cold calling", "relationship building",
-                 "revenue", "quota", "client relationship", "closing deals"],
-                 
-        "Customer Support": ["customer support", "customer service", "technical support", "help desk", "client success",
-                           "service desk", "ticketing system", "zendesk", "customer satisfaction", "issue resolution"],
-                           
-        "Design": ["designer", "graphic design", "ui", "ux", "user interface", "user experience", "visual design",
-                  "figma", "sketch", "adobe", "photoshop", "illustrator", "indesign", "typography", "web design"],
-                  
-        "Human Resources": ["hr", "human resources", "recruitment", "talent acquisition", "onboarding", "employee relations",
-                          "training", "development", "compensation", "benefits", "hr policy", "performance management"],
-                          
-        "Finance": ["finance", "accounting", "financial analysis", "budget", "forecast", "audit", "tax", "cpa", "cfa",
-                  "bookkeeping", "accounts payable", "accounts receivable", "financial statement", "balance sheet"]
-    }
-    
     # Count occurrences of keywords for each category
-    category_scores = {category: 0 for category in categories}
+    category_scores = {category: 0 for category in _JOB_CATEGORIES}
     
-    for category, keywords in categories.items():
-        for keyword in keywords:
-            # Count occurrences of the keyword surrounded by word boundaries
-            count = len(re.findall(r'\b' + re.escape(keyword) + r'\b', normalized_text, re.IGNORECASE))
-            category_scores[category] += count
+    if term_scan is not None:
+        category_scores.update(term_scan.category_counts)
+    else:
+        text_words = set(_WORD_RE.findall(normalized_text))
+        for category, keyword_words, pattern in _CATEGORY_KEYWORD_CHECKS:
+            if keyword_words <= text_words:
+                # Count occurrences of the keyword surrounded by word boundaries
+                category_scores[category] += len(pattern.findall(normalized_text))
     
     # Find the category with the highest score
     max_score = 0
@@ -361,15 +554,9 @@ def determine_job_category(normalized_text: str, original_text: str) -> str:
     
     # If no strong signal was found, try to extract job titles
     if max_score < 3:
-        # Common job title patterns
-        job_title_patterns = [
-            r'(?:^|\n)(?:professional\s+)?(?:experience|title|position)[:\s]+([A-Za-z\s\,\-\&]+)(?:\n|$)',
-            r'(?:^|\n)([A-Z][A-Za-z\s\-]+)(?:\n|$)'  # Look for capitalized lines that might be job titles
-        ]
-        
         job_titles = []
-        for pattern in job_title_patterns:
-            matches = re.finditer(pattern, original_text)
+        for pattern in _JOB_TITLE_PATTERNS:
+            matches = pattern.finditer(original_text)
             for match in matches:
                 title = match.group(1).strip()
                 if 3 < len(title) < 40:  # Reasonable title length
@@ -377,7 +564,7 @@ def determine_job_category(normalized_text: str, original_text: str) -> str:
         
         # Now check which category best matches these job titles
         for title in job_titles:
-            for category, keywords in categories.items():
+            for category, keywords in _JOB_CATEGORIES.items():
                 for keyword in keywords:
                     if keyword in title:
                         category_scores[category] += 2
@@ -390,40 +577,31 @@ def determine_job_category(normalized_text: str, original_text: str) -> str:
     
     return best_category
 
+def _last_pattern_match(patterns: List[re.Pattern], text: str, min_length: int, max_length: int) -> Optional[str]:
+    """
+    Group 1 of the first match, strictly between min_length and max_length characters, of the
+    last pattern that has one
+    
+    A later pattern's match takes precedence, so the patterns are tried from last to first and
+    the earlier ones are only scanned when the later ones find nothing.
+    """
+    for pattern in reversed(patterns):
+        for match in pattern.finditer(text):
+            value = match.group(1).strip()
+            if min_length < len(value) < max_length:
+                return value
+    return None
+
 def generate_summary(resume_text: str, skills: List[str], experience_years: int, education_level: str, job_category: str) -> str:
     """
     Generate a professional summary based on extracted information
     """
-    # Try to extract the candidate's name
-    name = "Professional"
-    name_patterns = [
-        r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})$',  # Common format at start of resume
-        r'(?:name|contact)[\s\:]+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})'  # After "Name:" or "Contact:"
-    ]
-    
-    for pattern in name_patterns:
-        name_matches = re.finditer(pattern, resume_text, re.MULTILINE)
-        for match in name_matches:
-            potential_name = match.group(1).strip()
-            # Check if it's a reasonable name (not too long or short)
-            if 4 < len(potential_name) < 40:
-                name = potential_name.split()[0]  # Just use first name
-                break
-    
-    # Try to extract their most recent role
-    recent_role = job_category + " professional"
-    role_patterns = [
-        r'(?:current|present|latest|recent)\s+(?:position|role|title)[:\s]+([A-Za-z\s\,\-\&]+)',
-        r'(?:^|\n)([A-Z][A-Za-z\s\-]+)(?:\n|$)'  # Look for capitalized lines that might be job titles
-    ]
+    # Try to extract the candidate's name (not too long or short)
+    potential_name = _last_pattern_match(_NAME_PATTERNS, resume_text, 4, 40)
+    name = potential_name.split()[0] if potential_name else "Professional"  # Just use first name
     
-    for pattern in role_patterns:
-        role_matches = re.finditer(pattern, resume_text, re.IGNORECASE)
-        for match in role_matches:
-            potential_role = match.group(1).strip()
-            if 3 < len(potential_role) < 40:  # Reasonable title length
-                recent_role = potential_role
-                break
+    # Try to extract their most recent role (reasonable title length)
+    recent_role = _last_pattern_match(_ROLE_PATTERNS, resume_text, 3, 40) or job_category + " professional"
     
     # Generate experience level description
     experience_description = ""
@@ -0,0 +1,28 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from dotenv import dotenv_values
+
+# backend/.env, independent of the working directory the app is started from
+ENV_PATH = Path(__file__).resolve().parent.parent / ".env"
+
+
+@lru_cache(maxsize=None)
+def load_env() -> Dict[str, Optional[str]]:
+    """
+    Parse backend/.env once per process and apply it to os.environ
+
+    Every module calls this instead of load_dotenv(), so the file is read and
+    parsed a single time no matter how many services are imported. Values in
+    .env take precedence over variables already set in the environment.
+
+    Returns:
+        The parsed .env values
+    """
+    values = dotenv_values(ENV_PATH)
+    for key, value in values.items():
+        if value is not None:
+            os.environ[key] = value
+    return values
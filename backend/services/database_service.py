@@ -2,10 +2,11 @@ import os
 import json
 import uuid
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import sqlite3
-from .embedding_service import get_embedding, rank_documents_by_query
+import numpy as np
+from .embedding_service import EMBEDDING_INT8, get_embeddings
+from .vector_index import EmbeddingMatrix
 
 # For Supabase integration (optional)
 try:
@@ -20,9 +21,82 @@ except ImportError:
 DB_PATH = Path("./storage/resumes.db")
 DB_PATH.parent.mkdir(exist_ok=True)
 
+# One connection shared by every call instead of opening (and fsync-closing) a new one each time
+_connection: Optional[sqlite3.Connection] = None
+
+def _get_connection() -> sqlite3.Connection:
+    """
+    Return the shared database connection, opening it on first use
+    
+    WAL lets reads proceed alongside a write, and synchronous=NORMAL only fsyncs
+    at checkpoints instead of on every commit (still safe against corruption in WAL mode).
+    """
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+        _connection.row_factory = sqlite3.Row  # Return rows as dictionaries
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("PRAGMA synchronous=NORMAL")
+        _connection.execute("PRAGMA temp_store=MEMORY")
+        _connection.execute("PRAGMA mmap_size=268435456")  # Map up to 256 MB of the file
+    return _connection
+
+# Embeddings are stored L2-normalized as raw float16 bytes: half the size of float32, and
+# normalized components are well inside float16 range, so cosine scores barely change.
+# PRAGMA user_version records the stored format (0: float32 or JSON text, 1: float16).
+_EMBEDDING_DTYPE = np.float16
+_SCHEMA_VERSION = 1
+
+def _embedding_to_blob(embedding) -> bytes:
+    """Serialize an embedding as L2-normalized raw float16 bytes"""
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vector))
+    if norm > 0.0:
+        vector = vector / norm
+    return vector.astype(_EMBEDDING_DTYPE).tobytes()
+
+def _embedding_from_blob(value, dtype=_EMBEDDING_DTYPE) -> np.ndarray:
+    """
+    Deserialize an embedding column value
+    
+    Args:
+        value: Raw bytes, or JSON text from rows written before embeddings were stored as BLOBs
+        dtype: Element type of raw bytes (float32 for rows written before schema version 1)
+        
+    Returns:
+        The embedding, a zero-copy view for raw bytes (empty if the column is NULL)
+    """
+    if not value:
+        return np.zeros(0, dtype=dtype)
+    if isinstance(value, str):
+        return np.asarray(json.loads(value), dtype=np.float32)
+    return np.frombuffer(value, dtype=dtype)
+
+def _skill_keys(skills: List[Any]) -> set:
+    """Distinct lowercased skill names, as stored in resume_skills"""
+    return {str(skill).strip().lower() for skill in skills if str(skill).strip()}
+
+# Rows per multi-row skills INSERT, keeping the bound parameters under SQLite's 999 limit
+_SKILL_ROWS_PER_INSERT = 400
+
+def _insert_skill_rows(cursor: sqlite3.Cursor, rows: List[Tuple[str, str]]) -> None:
+    """
+    Insert (resume_id, skill) rows with multi-row INSERT statements, ignoring duplicates
+    
+    One statement carries up to _SKILL_ROWS_PER_INSERT rows, so a resume's skills are written
+    by a single statement execution with deduplication done by the primary key.
+    """
+    for start in range(0, len(rows), _SKILL_ROWS_PER_INSERT):
+        chunk = rows[start:start + _SKILL_ROWS_PER_INSERT]
+        cursor.execute(
+            f"INSERT INTO resume_skills (resume_id, skill) VALUES {', '.join(['(?, ?)'] * len(chunk))} "
+            "ON CONFLICT DO NOTHING",
+            [value for row in chunk for value in row]
+        )
+
 def init_db():
     """Initialize the SQLite database with required tables"""
-    conn = sqlite3.connect(str(DB_PATH))
+    conn = _get_connection()
     cursor = conn.cursor()
     
     # Create resumes table
@@ -37,16 +111,117 @@ def init_db():
         education_level TEXT,
         category TEXT,
         created_at TEXT,
-        embedding TEXT
+        embedding BLOB
     )
     ''')
     
+    # get_resumes lists newest first, so let SQLite walk the index instead of sorting every row
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resumes_created_at ON resumes (created_at)")
+    # Index the range-filtered search column so minExperience doesn't scan the table
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resumes_experience ON resumes (experience)")
+    
+    # One row per (resume, lowercased skill), so skills can be matched in SQL rather than by
+    # decoding every resume's JSON skill list
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resume_skills'")
+    skills_table_exists = cursor.fetchone() is not None
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS resume_skills (
+        resume_id TEXT NOT NULL,
+        skill TEXT NOT NULL,
+        PRIMARY KEY (resume_id, skill)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_resume_skills_skill ON resume_skills (skill)")
+    if not skills_table_exists:
+        # Backfill from resumes saved before the table existed
+        cursor.execute("SELECT id, skills FROM resumes WHERE skills IS NOT NULL")
+        _insert_skill_rows(cursor, [
+            (resume_id, skill)
+            for resume_id, skills in cursor.fetchall()
+            for skill in _skill_keys(json.loads(skills) if skills else [])
+        ])
+    
+    # Rewrite embeddings stored by older versions (JSON text, then float32 BLOBs) as float16 BLOBs
+    cursor.execute("PRAGMA user_version")
+    if cursor.fetchone()[0] < _SCHEMA_VERSION:
+        cursor.execute("SELECT id, embedding FROM resumes WHERE embedding IS NOT NULL")
+        cursor.executemany(
+            "UPDATE resumes SET embedding = ? WHERE id = ?",
+            [
+                (_embedding_to_blob(_embedding_from_blob(embedding, dtype=np.float32)), resume_id)
+                for resume_id, embedding in cursor.fetchall()
+            ]
+        )
+        cursor.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+    
     conn.commit()
-    conn.close()
 
 # Initialize database
 init_db()
 
+# Every stored embedding as one row-normalized matrix (int8 with EMBEDDING_INT8), loaded from the
+# database on the first search and kept in step with inserts, so a search is a single matrix-vector product
+_embedding_index = EmbeddingMatrix(quantize=EMBEDDING_INT8)
+_embedding_index_loaded = False
+
+# Columns returned for listings and search results; the embedding blob is never sent to
+# clients (search scores it through _embedding_index), so it isn't read either
+_RESUME_COLUMNS = "id, file_path, download_url, summary, skills, experience, education_level, category, created_at"
+
+def _row_to_resume(row: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a _RESUME_COLUMNS row to a resume dict with its skills list decoded"""
+    resume = dict(row)
+    resume["skills"] = json.loads(resume["skills"]) if resume["skills"] else []
+    return resume
+
+def _get_embedding_index() -> EmbeddingMatrix:
+    """Return the in-memory embedding matrix, loading it from the database on first use"""
+    global _embedding_index_loaded
+    if not _embedding_index_loaded:
+        conn = _get_connection()
+        for resume_id, embedding in conn.execute("SELECT id, embedding FROM resumes"):
+            _embedding_index.add(resume_id, _embedding_from_blob(embedding))
+        _embedding_index_loaded = True
+    return _embedding_index
+
+def _insert_resume(
+    cursor: sqlite3.Cursor,
+    metadata: Dict[str, Any],
+    file_path: str,
+    download_url: str,
+    embedding
+) -> str:
+    """Insert a resume row and its skills (without committing) and return the new resume ID"""
+    resume_id = str(uuid.uuid4())
+    
+    # Process metadata
+    skills = metadata.get("skills", [])
+    if not isinstance(skills, list):
+        skills = []
+    
+    cursor.execute(
+        """
+        INSERT INTO resumes
+        (id, file_path, download_url, summary, skills, experience, education_level, category, created_at, embedding)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'), ?)
+        """,
+        (
+            resume_id,
+            file_path,
+            download_url,
+            metadata.get("summary", ""),
+            json.dumps(skills),
+            metadata.get("experience", 0),
+            metadata.get("educationLevel", ""),
+            metadata.get("category", ""),
+            _embedding_to_blob(embedding)
+        )
+    )
+    
+    # All of the resume's skills in one statement
+    _insert_skill_rows(cursor, [(resume_id, skill) for skill in _skill_keys(skills)])
+    return resume_id
+
 async def save_resume_to_db(
     resume_text: str,
     metadata: Dict[str, Any],
@@ -65,49 +240,44 @@ async def save_resume_to_db(
     Returns:
         ID of the saved resume
     """
-    try:
-        # Generate embedding for the resume
-        embedding = await get_embedding(resume_text[:2000])  # Truncate to avoid token limits
-        
-        # Generate ID
-        resume_id = str(uuid.uuid4())
+    return (await save_resumes_to_db([(resume_text, metadata, file_path, download_url)]))[0]
+
+async def save_resumes_to_db(resumes: List[Tuple[str, Dict[str, Any], str, str]]) -> List[str]:
+    """
+    Save several resumes with their embeddings in one transaction
+    
+    The embeddings are requested together (batched by get_embeddings) and every row is
+    written on the shared connection with a single commit, so a bulk upload pays for one
+    transaction instead of one per file.
+    
+    Args:
+        resumes: (resume_text, metadata, file_path, download_url) for each resume
         
-        # Process metadata
-        skills = metadata.get("skills", [])
-        if isinstance(skills, list):
-            skills_json = json.dumps(skills)
-        else:
-            skills_json = json.dumps([])
+    Returns:
+        ID of each saved resume, in order
+    """
+    try:
+        # Generate embeddings for the resumes
+        embeddings = await get_embeddings([resume_text[:2000] for resume_text, _, _, _ in resumes])  # Truncate to avoid token limits
         
-        # Connect to database
-        conn = sqlite3.connect(str(DB_PATH))
+        conn = _get_connection()
         cursor = conn.cursor()
+        try:
+            resume_ids = [
+                _insert_resume(cursor, metadata, file_path, download_url, embedding)
+                for (_, metadata, file_path, download_url), embedding in zip(resumes, embeddings)
+            ]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         
-        # Insert resume
-        cursor.execute(
-            """
-            INSERT INTO resumes
-            (id, file_path, download_url, summary, skills, experience, education_level, category, created_at, embedding)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                resume_id,
-                file_path,
-                download_url,
-                metadata.get("summary", ""),
-                skills_json,
-                metadata.get("experience", 0),
-                metadata.get("educationLevel", ""),
-                metadata.get("category", ""),
-                datetime.now().isoformat(),
-                json.dumps(embedding)
-            )
-        )
+        # Once the matrix is loaded, new resumes are added to it directly
+        if _embedding_index_loaded:
+            for resume_id, embedding in zip(resume_ids, embeddings):
+                _embedding_index.add(resume_id, embedding)
         
-        conn.commit()
-        conn.close()
-        
-        return resume_id
+        return resume_ids
         
     except Exception as e:
         print(f"Error saving resume to database: {str(e)}")
@@ -122,31 +292,12 @@ async def get_resumes() -> List[Dict[str, Any]]:
     """
     try:
         # Connect to database
-        conn = sqlite3.connect(str(DB_PATH))
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        conn = _get_connection()
         cursor = conn.cursor()
         
         # Get all resumes
-        cursor.execute("SELECT * FROM resumes ORDER BY created_at DESC")
-        rows = cursor.fetchall()
-        
-        # Process results
-        resumes = []
-        for row in rows:
-            resume = dict(row)
-            
-            # Parse JSON fields
-            resume["skills"] = json.loads(resume["skills"]) if resume["skills"] else []
-            
-            # Remove embedding from response
-            if "embedding" in resume:
-                del resume["embedding"]
-                
-            resumes.append(resume)
-            
-        conn.close()
-        
-        return resumes
+        cursor.execute(f"SELECT {_RESUME_COLUMNS} FROM resumes ORDER BY created_at DESC")
+        return [_row_to_resume(row) for row in cursor.fetchall()]
         
     except Exception as e:
         print(f"Error getting resumes: {str(e)}")
@@ -168,68 +319,61 @@ async def search_resumes(
     """
     try:
         # Connect to database
-        conn = sqlite3.connect(str(DB_PATH))
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        conn = _get_connection()
         cursor = conn.cursor()
         
-        # Get all resumes
-        cursor.execute("SELECT * FROM resumes")
-        rows = cursor.fetchall()
-        
-        # Process results
-        resumes = []
-        for row in rows:
-            resume = dict(row)
-            
-            # Parse JSON fields
-            resume["skills"] = json.loads(resume["skills"]) if resume["skills"] else []
-            resume["embedding"] = json.loads(resume["embedding"]) if resume["embedding"] else []
-            
-            # Apply filters if provided
-            if filters:
-                # Filter by minimum experience
-                if "minExperience" in filters and resume["experience"] < filters["minExperience"]:
-                    continue
-                    
-                # Filter by education level
-                if "educationLevel" in filters and resume["education_level"] != filters["educationLevel"]:
-                    continue
-                    
-                # Filter by category
-                if "category" in filters and resume["category"] != filters["category"]:
-                    continue
-                    
-                # Filter by skills
-                if "skills" in filters and isinstance(filters["skills"], list) and filters["skills"]:
-                    resume_skills = set(s.lower() for s in resume["skills"])
-                    filter_skills = set(s.lower() for s in filters["skills"])
-                    if not filter_skills.intersection(resume_skills):
-                        continue
-            
-            resumes.append(resume)
+        # Every filter goes into the WHERE clause, so non-matching rows are never fetched
+        filters = filters or {}
+        conditions, params = [], []
+        if "minExperience" in filters:
+            conditions.append("experience >= ?")
+            params.append(filters["minExperience"])
+        if "educationLevel" in filters:
+            conditions.append("education_level = ?")
+            params.append(filters["educationLevel"])
+        if "category" in filters:
+            conditions.append("category = ?")
+            params.append(filters["category"])
+        filter_skills = _skill_keys(filters["skills"]) if isinstance(filters.get("skills"), list) else set()
+        if filter_skills:
+            # A resume matches if it has any of the requested skills
+            conditions.append(
+                f"id IN (SELECT resume_id FROM resume_skills WHERE skill IN ({', '.join('?' * len(filter_skills))}))"
+            )
+            params.extend(filter_skills)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
         
-        conn.close()
+        # Only the IDs are needed to rank; full rows are fetched for the top 5 alone
+        cursor.execute(f"SELECT id FROM resumes{where}", params)
+        matching_ids = [row[0] for row in cursor.fetchall()]
+        if not matching_ids:
+            return []
         
         # Rank by similarity
-        if resumes:
-            ranked_resumes = await rank_documents_by_query(query_embedding, resumes)
+        ranked = _get_embedding_index().top_k(query_embedding, 5, allowed=set(matching_ids))
+        # Resumes without a usable embedding only fill any remaining slots, with a zero score
+        ranked_ids = {resume_id for resume_id, _ in ranked}
+        ranked += [(resume_id, 0.0) for resume_id in matching_ids if resume_id not in ranked_ids][:5 - len(ranked)]
+        
+        cursor.execute(
+            f"SELECT {_RESUME_COLUMNS} FROM resumes WHERE id IN ({', '.join('?' * len(ranked))})",
+            [resume_id for resume_id, _ in ranked]
+        )
+        resumes_by_id = {row["id"]: _row_to_resume(row) for row in cursor.fetchall()}
+        
+        # Process for response (format fields)
+        ranked_resumes = []
+        for resume_id, similarity in ranked:
+            resume = resumes_by_id[resume_id]
             
-            # Process for response (remove embedding, format fields)
-            for resume in ranked_resumes:
-                if "embedding" in resume:
-                    del resume["embedding"]
-                    
-                # Calculate match score (0-100)
-                if "similarity" in resume:
-                    resume["match_score"] = int(resume["similarity"] * 100)
-                    del resume["similarity"]
-                
-                # Generate match reason
-                resume["match_reason"] = generate_match_reason(resume)
-                
-            return ranked_resumes[:5]  # Return top 5
-        else:
-            return []
+            # Calculate match score (0-100)
+            resume["match_score"] = int(similarity * 100)
+            
+            # Generate match reason
+            resume["match_reason"] = generate_match_reason(resume)
+            ranked_resumes.append(resume)
+            
+        return ranked_resumes  # Top 5
         
     except Exception as e:
         print(f"Error searching resumes: {str(e)}")
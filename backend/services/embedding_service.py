@@ -1,61 +1,293 @@
 import os
+import re
+import time
+import asyncio
+import hashlib
+import threading
 import numpy as np
+import orjson
 import requests
-from typing import List, Dict, Any
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
 import httpx
-from sklearn.metrics.pairwise import cosine_similarity
-from dotenv import load_dotenv
+from services.config_service import load_env
+from services.cache_service import LRUCache, NearDuplicateIndex
+from services.vector_index import top_k_indices
+
+# Optional in-process embedding model
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+# Optional native top-k search for large document sets
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
 
 # Load environment variables
-load_dotenv()
+load_env()
 
 # Get OpenRouter API token from environment
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_EMBEDDING_API_URL = "https://openrouter.ai/api/v1/embeddings"
+EMBEDDING_MODEL = "mistralai/mistral-7b-instruct:free"  # Using free version of Mistral Instruct
+
+# Request headers are built once rather than for every batch
+_AUTH_HEADERS = {
+    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+    "HTTP-Referer": "https://github.com/theagentvikram/ResuMatch",  # Required by OpenRouter
+    "X-Title": "ResuMatch"  # Optional but helpful for OpenRouter
+}
+
+# Embed texts with a small local model instead of the API (no network round-trip);
+# the API is still used if the local model can't be loaded
+USE_LOCAL_EMBEDDER = os.getenv("USE_LOCAL_EMBEDDER", "false").lower() in ("1", "true", "yes") and SENTENCE_TRANSFORMERS_AVAILABLE
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_BATCH_SIZE = 64
+
+# Keep in-memory resume embedding matrices as int8 with a per-row scale (a quarter of the
+# memory, and of the bytes streamed per search, at a small cost in ranking precision)
+EMBEDDING_INT8 = os.getenv("EMBEDDING_INT8", "false").lower() in ("1", "true", "yes")
+
+# Below this many documents a NumPy matrix product beats building a faiss index
+FAISS_MIN_DOCUMENTS = 10000
+
+# Texts are truncated to avoid token limits and sent this many per request
+MAX_EMBEDDING_CHARS = 2000
+EMBEDDING_BATCH_SIZE = 32
+
+# Embeddings are cached on disk as float32 .npy files named by the SHA-256 of the (truncated) text,
+# in a directory per model so switching models never serves stale vectors
+EMBEDDING_CACHE_DIR = Path("./storage/cache/embeddings") / re.sub(
+    r"[^\w.-]", "_", LOCAL_EMBEDDING_MODEL if USE_LOCAL_EMBEDDER else EMBEDDING_MODEL
+)
+_embedding_memory_cache = LRUCache(max_entries=4096)
+# Near-identical texts reuse an existing embedding when the exact hash misses
+_embedding_near_duplicates = NearDuplicateIndex(threshold=0.95)
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _cache_get(text_hash: str) -> Optional[np.ndarray]:
+    """Look up a cached embedding in memory, then on disk"""
+    embedding = _embedding_memory_cache.get(text_hash)
+    if embedding is None:
+        try:
+            embedding = np.load(EMBEDDING_CACHE_DIR / f"{text_hash}.npy")
+        except (OSError, ValueError):
+            return None
+        _embedding_memory_cache.put(text_hash, embedding)
+    return embedding
+
+def _cache_put(text_hash: str, text: str, embedding) -> None:
+    """Store an embedding in memory and on disk (written to a temp file, then renamed)"""
+    embedding = np.asarray(embedding, dtype=np.float32)
+    _embedding_memory_cache.put(text_hash, embedding)
+    _embedding_near_duplicates.add(text_hash, text)
+    try:
+        EMBEDDING_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        temp_path = EMBEDDING_CACHE_DIR / f"{text_hash}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, embedding)
+        os.replace(temp_path, EMBEDDING_CACHE_DIR / f"{text_hash}.npy")
+    except OSError as e:
+        _warn_throttled("cache_write", f"Error writing embedding cache: {str(e)}")
+
+def _cache_get_near_duplicate(text_hash: str, text: str) -> Optional[np.ndarray]:
+    """Reuse the cached embedding of a near-identical text, storing it under text_hash as well"""
+    duplicate_hash = _embedding_near_duplicates.find(text)
+    if duplicate_hash is None:
+        return None
+    embedding = _cache_get(duplicate_hash)
+    if embedding is not None:
+        _cache_put(text_hash, text, embedding)
+    return embedding
+
+def _cache_get_many(text_hashes: List[str], texts: List[str]) -> List[Optional[np.ndarray]]:
+    embeddings = []
+    for text_hash, text in zip(text_hashes, texts):
+        embedding = _cache_get(text_hash)
+        if embedding is None:
+            embedding = _cache_get_near_duplicate(text_hash, text)
+        embeddings.append(embedding)
+    return embeddings
+
+def _cache_put_many(entries: List[Tuple[str, str, np.ndarray]]) -> None:
+    for text_hash, text, embedding in entries:
+        _cache_put(text_hash, text, embedding)
+
+# Repeated warnings (e.g. a missing API key) are printed at most once per this many seconds
+WARNING_INTERVAL = 60
+_last_warned: Dict[str, float] = {}
+
+def _warn_throttled(key: str, message: str) -> None:
+    """Print a warning unless the same kind of warning was printed within WARNING_INTERVAL"""
+    now = time.monotonic()
+    if now - _last_warned.get(key, float("-inf")) >= WARNING_INTERVAL:
+        _last_warned[key] = now
+        print(message)
+
+def _normalize(embedding) -> np.ndarray:
+    """Convert an embedding to a unit-length float32 vector (zero vectors are returned as-is)"""
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+_local_embedder = None
+_local_embedder_failed = False
+_local_embedder_lock = threading.Lock()
+
+def _get_local_embedder():
+    """Load the local embedding model once; returns None if it is disabled or failed to load"""
+    global _local_embedder, _local_embedder_failed
+    if not USE_LOCAL_EMBEDDER or _local_embedder_failed:
+        return None
+    with _local_embedder_lock:
+        if _local_embedder is None and not _local_embedder_failed:
+            try:
+                _local_embedder = SentenceTransformer(LOCAL_EMBEDDING_MODEL)
+            except Exception as e:
+                _local_embedder_failed = True
+                _warn_throttled("local_model", f"Error loading local embedding model: {str(e)}")
+    return _local_embedder
+
+def _embed_locally(texts: List[str]) -> Optional[List[np.ndarray]]:
+    """Embed texts with the local model, or return None if it is unavailable"""
+    embedder = _get_local_embedder()
+    if embedder is None:
+        return None
+    vectors = embedder.encode(
+        texts,
+        batch_size=LOCAL_EMBEDDING_BATCH_SIZE,
+        normalize_embeddings=True,
+        convert_to_numpy=True
+    )
+    return list(vectors.astype(np.float32, copy=False))
+
+# Pooled client used when callers don't pass their own, so keep-alive connections
+# (and the TLS handshake) are reused across calls; created on first use
+_client: Optional[httpx.AsyncClient] = None
+
+def _get_client(client: Optional[httpx.AsyncClient] = None) -> httpx.AsyncClient:
+    """Return the caller's client, or the module-level pooled client"""
+    global _client
+    if client is not None:
+        return client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+    return _client
 
-async def get_embedding(text: str) -> List[float]:
+def _embedding_fallback(fallback_to_mock: bool) -> Optional[np.ndarray]:
+    return generate_mock_embedding() if fallback_to_mock else None
+
+async def get_embeddings(
+    texts: List[str],
+    fallback_to_mock: bool = True,
+    client: Optional[httpx.AsyncClient] = None
+) -> List[Optional[np.ndarray]]:
     """
-    Get embedding vector for a piece of text using OpenRouter API with Mistral Instruct model
+    Get embedding vectors for several texts, sending them to OpenRouter in batches
     
     Args:
-        text: The text to embed
+        texts: The texts to embed
+        fallback_to_mock: Whether to return random mock embeddings for texts the API couldn't embed
+        client: Optional shared HTTP client (the module's pooled client is used otherwise)
         
     Returns:
-        List of floats representing the embedding vector
+        One unit-normalized float32 embedding per text, in order; None for texts the API
+        couldn't embed when fallback_to_mock is False
     """
+    texts = [text[:MAX_EMBEDDING_CHARS] for text in texts]
+    text_hashes = [_text_hash(text) for text in texts]
+    
+    # Serve what we can from the memory/disk cache
+    cached = await asyncio.to_thread(_cache_get_many, text_hashes, texts)
+    embeddings: List[Optional[np.ndarray]] = list(cached)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    fetched: List[Tuple[str, str, np.ndarray]] = []
+    
+    if missing and USE_LOCAL_EMBEDDER:
+        try:
+            local_embeddings = await asyncio.to_thread(_embed_locally, [texts[i] for i in missing])
+        except Exception as e:
+            _warn_throttled("local_exception", f"Error generating local embedding: {str(e)}")
+            local_embeddings = None
+        if local_embeddings is not None:
+            for i, embedding in zip(missing, local_embeddings):
+                embeddings[i] = embedding
+                fetched.append((text_hashes[i], texts[i], embedding))
+            missing = []
+    
+    if missing and not OPENROUTER_API_KEY:
+        _warn_throttled("no_api_key", "WARNING: No OpenRouter API key found. Embeddings are unavailable.")
+        missing = []
+    
     try:
-        if OPENROUTER_API_KEY:
-            # Use the API to get embeddings
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    OPENROUTER_EMBEDDING_API_URL,
-                    headers={
-                        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                        "HTTP-Referer": "https://github.com/theagentvikram/ResuMatch",  # Required by OpenRouter
-                        "X-Title": "ResuMatch"  # Optional but helpful for OpenRouter
-                    },
-                    json={
-                        "model": "mistralai/mistral-7b-instruct:free",  # Using free version of Mistral Instruct
-                        "input": text[:2000]  # Truncate to avoid token limits
-                    }
-                )
-                
-                if response.status_code == 200:
-                    # API returns a list of embeddings, we just need the first one
-                    embedding = response.json()["data"][0]["embedding"]
-                    return embedding
-                else:
-                    print(f"Error from OpenRouter API: {response.text}")
-                    # Fall back to mock embeddings
-                    return generate_mock_embedding()
-        else:
-            print("WARNING: No OpenRouter API key found. Using mock embeddings.")
-            return generate_mock_embedding()
+        # One request per EMBEDDING_BATCH_SIZE uncached texts instead of one per text
+        # (nothing is sent, and no client is touched, when everything was cached)
+        for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+            batch_indices = missing[start:start + EMBEDDING_BATCH_SIZE]
+            batch = [texts[i] for i in batch_indices]
+            response = await _get_client(client).post(
+                OPENROUTER_EMBEDDING_API_URL,
+                headers=_AUTH_HEADERS,
+                json={
+                    "model": EMBEDDING_MODEL,
+                    "input": batch
+                }
+            )
+            
+            if response.status_code == 200:
+                # The API returns one item per input, tagged with its position in the batch
+                for position, item in enumerate(orjson.loads(response.content)["data"]):
+                    i = batch_indices[item.get("index", position)]
+                    embeddings[i] = _normalize(item["embedding"])
+                    # The cache directory belongs to the local model when it is enabled,
+                    # so API vectors (a different dimension) are only cached without it
+                    if not USE_LOCAL_EMBEDDER:
+                        fetched.append((text_hashes[i], texts[i], embeddings[i]))
+            else:
+                _warn_throttled("api_error", f"Error from OpenRouter API: {response.text}")
     except Exception as e:
-        print(f"Error generating embedding: {str(e)}")
-        return generate_mock_embedding()
+        _warn_throttled("exception", f"Error generating embedding: {str(e)}")
+    
+    if fetched:
+        await asyncio.to_thread(_cache_put_many, fetched)
+    
+    # Fall back to mock embeddings for anything the API didn't return
+    return [
+        embedding if embedding is not None else _embedding_fallback(fallback_to_mock)
+        for embedding in embeddings
+    ]
 
-def generate_mock_embedding(dimension: int = 4096) -> List[float]:
+async def get_embedding(
+    text: str,
+    fallback_to_mock: bool = True,
+    client: Optional[httpx.AsyncClient] = None
+) -> Optional[np.ndarray]:
+    """
+    Get embedding vector for a piece of text using OpenRouter API with Mistral Instruct model
+    
+    Args:
+        text: The text to embed
+        fallback_to_mock: Whether to return a random mock embedding if the API is unavailable
+        client: Optional shared HTTP client (the module's pooled client is used otherwise)
+        
+    Returns:
+        Unit-normalized float32 embedding vector, or None if the API is
+        unavailable and fallback_to_mock is False
+    """
+    return (await get_embeddings([text], fallback_to_mock=fallback_to_mock, client=client))[0]
+
+def generate_mock_embedding(dimension: int = 4096) -> np.ndarray:
     """
     Generate a mock embedding for testing when API is not available
     
@@ -66,11 +298,10 @@ def generate_mock_embedding(dimension: int = 4096) -> List[float]:
         Mock embedding vector of specified dimension
     """
     # Generate random vector and normalize it
-    vector = np.random.normal(0, 1, dimension)
-    normalized = vector / np.linalg.norm(vector)
-    return normalized.tolist()
+    vector = np.random.normal(0, 1, dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
 
-def calculate_similarity(embedding1: List[float], embedding2: List[float]) -> float:
+def calculate_similarity(embedding1, embedding2) -> float:
     """
     Calculate cosine similarity between two embeddings
     
@@ -81,17 +312,17 @@ def calculate_similarity(embedding1: List[float], embedding2: List[float]) -> fl
     Returns:
         Cosine similarity score (float between -1 and 1)
     """
-    # Convert to numpy arrays and reshape for cosine_similarity
-    v1 = np.array(embedding1).reshape(1, -1)
-    v2 = np.array(embedding2).reshape(1, -1)
-    
-    # Calculate cosine similarity
-    similarity = cosine_similarity(v1, v2)[0][0]
-    return float(similarity)
+    v1 = np.asarray(embedding1, dtype=np.float32).ravel()
+    v2 = np.asarray(embedding2, dtype=np.float32).ravel()
+    norms = float(np.linalg.norm(v1) * np.linalg.norm(v2))
+    if norms == 0.0:
+        return 0.0
+    return float(np.dot(v1, v2) / norms)
 
 async def rank_documents_by_query(
     query_embedding: List[float],
-    documents: List[Dict[str, Any]]
+    documents: List[Dict[str, Any]],
+    top_k: Optional[int] = None
 ) -> List[Dict[str, Any]]:
     """
     Rank documents by similarity to query
@@ -99,14 +330,41 @@ async def rank_documents_by_query(
     Args:
         query_embedding: Embedding of the search query
         documents: List of documents with 'embedding' field
+        top_k: Only return this many of the best matches (all documents if omitted)
         
     Returns:
         List of documents sorted by similarity to query
     """
-    # Calculate similarity for each document
-    for doc in documents:
-        doc['similarity'] = calculate_similarity(query_embedding, doc['embedding'])
+    if not documents:
+        return []
+    
+    # Row-normalized embeddings, so an inner product is the cosine similarity
+    matrix = np.asarray([doc['embedding'] for doc in documents], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    
+    query = np.asarray(query_embedding, dtype=np.float32).ravel()
+    query_norm = float(np.linalg.norm(query))
+    query = query / query_norm if query_norm else np.zeros_like(query)
+    
+    k = len(documents) if top_k is None else max(0, min(top_k, len(documents)))
+    if k == 0:
+        return []
+    
+    if FAISS_AVAILABLE and len(documents) >= FAISS_MIN_DOCUMENTS:
+        # Exact inner-product search with native SIMD kernels and a heap-based top-k
+        index = faiss.IndexFlatIP(matrix.shape[1])
+        index.add(matrix)
+        scores, order = index.search(query[np.newaxis, :], k)
+        ranked = [(int(i), float(score)) for i, score in zip(order[0], scores[0]) if i >= 0]
+    else:
+        similarities = matrix @ query
+        top = top_k_indices(similarities, k)
+        ranked = [(int(i), float(similarities[i])) for i in top]
     
-    # Sort by similarity (highest first)
-    sorted_docs = sorted(documents, key=lambda x: x['similarity'], reverse=True)
-    return sorted_docs 
\ No newline at end of file
+    ranked_documents = []
+    for i, similarity in ranked:
+        documents[i]['similarity'] = similarity
+        ranked_documents.append(documents[i])
+    return ranked_documents
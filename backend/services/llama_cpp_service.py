@@ -1,9 +1,10 @@
 import os
-import json
-import re
+import orjson
 import logging
+import platform
+import requests
 from typing import Dict, List, Any, Optional
-from services.claude_service import analyze_resume_with_regex
+from services.claude_service import analyze_resume_with_regex_fallback
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -18,19 +19,108 @@ except ImportError:
     LLAMA_CPP_AVAILABLE = False
     logger.warning("llama_cpp is not available. Local LLM inference will not work.")
 
+# Grammar-constrained sampling, used to force the analysis reply to be a JSON object
+try:
+    from llama_cpp.llama_grammar import JSON_GBNF, LlamaGrammar
+    LLAMA_GRAMMAR_AVAILABLE = True
+except ImportError:
+    LLAMA_GRAMMAR_AVAILABLE = False
+
+# Quantization level of the GGUF weights to download and load. Q4_K_M roughly halves RAM
+# and doubles CPU matmul throughput compared to 8-bit/FP16 weights, with little accuracy loss
+# on extraction-style prompts. On some GPUs low-bit kernels are slower than higher-precision
+# ones, so when offloading layers with LLAMA_CPP_N_GPU_LAYERS consider Q8_0 instead.
+# Q4_0 trades a little more accuracy for speed on CPU; Q5_K_S is a middle ground.
+LLAMA_CPP_QUANT = os.getenv("LLAMA_CPP_QUANT", "Q4_K_M")
+# Resume + prompt stay well under 1k tokens, so 2048 keeps the KV cache small
+LLAMA_CPP_CTX = int(os.getenv("LLAMA_CPP_CTX", "2048"))
+
+def _default_gpu_layers() -> int:
+    """Offload every layer (-1) when llama.cpp was built with CUDA or runs on Apple Silicon (Metal)"""
+    if not LLAMA_CPP_AVAILABLE:
+        return 0
+    if getattr(llama_cpp, "GGML_USE_CUBLAS", False):
+        return -1
+    if platform.system() == "Darwin" and platform.machine() == "arm64":
+        return -1
+    return 0
+
+_gpu_layers_setting = os.getenv("LLAMA_CPP_N_GPU_LAYERS", "auto")
+LLAMA_CPP_N_GPU_LAYERS = _default_gpu_layers() if _gpu_layers_setting == "auto" else int(_gpu_layers_setting)
+# Token generation is memory-bandwidth bound, so one thread per physical core (about half the
+# logical CPUs) is usually fastest; the whole prompt fits in one evaluation batch
+LLAMA_CPP_THREADS = int(os.getenv("LLAMA_CPP_THREADS", str(max(1, (os.cpu_count() or 2) // 2))))
+LLAMA_CPP_BATCH = int(os.getenv("LLAMA_CPP_BATCH", "1024"))
+# Lock the weights in RAM so they are never paged out (needs a sufficient memlock limit)
+LLAMA_CPP_MLOCK = os.getenv("LLAMA_CPP_MLOCK", "false").lower() in ("1", "true", "yes")
+
 # Model settings
 MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
-DEFAULT_MODEL_PATH = os.path.join(MODELS_DIR, "mistral-7b-instruct-v0.2.Q4_K_M.gguf")
+DEFAULT_MODEL_PATH = os.path.join(MODELS_DIR, f"mistral-7b-instruct-v0.2.{LLAMA_CPP_QUANT}.gguf")
+DEFAULT_MODEL_URL = f"https://huggingface.co/TheBloke/Mistral-7B-Instruct-v0.2-GGUF/resolve/main/mistral-7b-instruct-v0.2.{LLAMA_CPP_QUANT}.gguf"
 
 # Alternative model URL for a smaller, faster model (keeping as fallback)
-TINY_LLAMA_URL = "https://huggingface.co/TheBloke/TinyLlama-1.1B-Chat-v1.0-GGUF/resolve/main/tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf"
+TINY_LLAMA_PATH = os.path.join(MODELS_DIR, f"tinyllama-1.1b-chat-v1.0.{LLAMA_CPP_QUANT}.gguf")
+TINY_LLAMA_URL = f"https://huggingface.co/TheBloke/TinyLlama-1.1B-Chat-v1.0-GGUF/resolve/main/tinyllama-1.1b-chat-v1.0.{LLAMA_CPP_QUANT}.gguf"
 
 # Global variable to hold the model
 llm = None
 
-def initialize_llm(model_path=None, n_ctx=4096, n_gpu_layers=0):
+# The analysis prompt is a fixed instruction prefix, the resume, and a fixed suffix. The prefix is
+# tokenized once per loaded model and passed as token IDs, so every call starts with the exact same
+# tokens and llama.cpp reuses their evaluated KV state instead of re-running prefill on them.
+ANALYSIS_PROMPT_PREFIX = "<s>[INST]Analyze this resume and extract key information as JSON:\n\n```\n"
+ANALYSIS_PROMPT_SUFFIX = """
+```
+
+Return only JSON with keys summary (1-2 sentences), skills (list), experience (years as number), educationLevel (highest degree), category (job field).[/INST]
+"""
+_prefix_tokens: Optional[List[int]] = None
+_suffix_tokens: Optional[List[int]] = None
+
+# The JSON grammar only allows tokens that keep the reply a valid JSON object, so the model
+# can't spend tokens on prose or code fences and the reply parses without any repair
+_json_grammar = None
+
+def _get_json_grammar():
+    """The compiled JSON grammar, built on first use (None if this llama_cpp has no grammar support)"""
+    global _json_grammar
+    if _json_grammar is None and LLAMA_GRAMMAR_AVAILABLE:
+        _json_grammar = LlamaGrammar.from_string(JSON_GBNF, verbose=False)
+    return _json_grammar
+
+# Tokens generated for the JSON reply
+ANALYSIS_MAX_TOKENS = 256
+# The resume is cut to a token budget rather than a character count: prefill cost is per token,
+# dense text isn't cut short, and the prompt always leaves room in the context for the reply
+LLAMA_CPP_RESUME_TOKENS = int(os.getenv("LLAMA_CPP_RESUME_TOKENS", "512"))
+
+def build_analysis_prompt_tokens(resume_text: str) -> List[int]:
+    """Token IDs of the analysis prompt for a resume, reusing the cached prefix and suffix tokens"""
+    global _prefix_tokens, _suffix_tokens
+    if _prefix_tokens is None or _suffix_tokens is None:
+        # special=True parses "<s>" as the BOS token, as llama_cpp does for string prompts
+        _prefix_tokens = llm.tokenize(ANALYSIS_PROMPT_PREFIX.encode("utf-8"), add_bos=True, special=True)
+        _suffix_tokens = llm.tokenize(ANALYSIS_PROMPT_SUFFIX.encode("utf-8"), add_bos=False)
+    budget = min(
+        LLAMA_CPP_RESUME_TOKENS,
+        llm.n_ctx() - len(_prefix_tokens) - len(_suffix_tokens) - ANALYSIS_MAX_TOKENS
+    )
+    if budget <= 0:
+        return _prefix_tokens + _suffix_tokens
+    # Tokens average about 4 characters, so text past 8 characters per budgeted token would
+    # almost always be cut anyway; skip tokenizing it
+    resume_tokens = llm.tokenize(resume_text[:budget * 8].encode("utf-8"), add_bos=False)
+    if len(resume_tokens) > budget:
+        logger.info(f"Truncating resume from {len(resume_tokens)} to {budget} tokens")
+        resume_tokens = resume_tokens[:budget]
+    return _prefix_tokens + resume_tokens + _suffix_tokens
+
+def initialize_llm(model_path=None, n_ctx=None, n_gpu_layers=None):
     """Initialize the LLM using llama.cpp"""
-    global llm
+    global llm, _prefix_tokens, _suffix_tokens
+    n_ctx = n_ctx or LLAMA_CPP_CTX
+    n_gpu_layers = LLAMA_CPP_N_GPU_LAYERS if n_gpu_layers is None else n_gpu_layers
     
     if not LLAMA_CPP_AVAILABLE:
         logger.error("Cannot initialize LLM: llama_cpp module not available")
@@ -49,7 +139,7 @@ def initialize_llm(model_path=None, n_ctx=4096, n_gpu_layers=0):
             logger.error(f"Model file not found: {model_path}")
             
             # Try to download TinyLlama as a fallback
-            tiny_llama_path = os.path.join(MODELS_DIR, "tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf")
+            tiny_llama_path = TINY_LLAMA_PATH
             if not os.path.exists(tiny_llama_path):
                 logger.info(f"Downloading TinyLlama model from {TINY_LLAMA_URL}...")
                 tiny_llama_path = download_model(TINY_LLAMA_URL)
@@ -64,13 +154,16 @@ def initialize_llm(model_path=None, n_ctx=4096, n_gpu_layers=0):
         # Create the Llama model with optimized settings
         llm = llama_cpp.Llama(
             model_path=model_path,
-            n_ctx=n_ctx,           # Increased context size for Mistral
+            n_ctx=n_ctx,           # Context size (LLAMA_CPP_CTX by default)
             n_gpu_layers=n_gpu_layers,  # Number of layers to offload to GPU
             verbose=False,         # No verbose output
-            n_threads=4,           # Use multiple threads for faster inference
-            n_batch=512            # Batch size for faster inference
+            n_threads=LLAMA_CPP_THREADS,  # Use multiple threads for faster inference
+            n_batch=min(LLAMA_CPP_BATCH, n_ctx),  # Evaluate the prompt in as few batches as possible
+            use_mmap=True,         # Map the weights instead of copying them into memory
+            use_mlock=LLAMA_CPP_MLOCK
         )
         
+        _prefix_tokens = _suffix_tokens = None  # Token IDs depend on the model's vocabulary
         logger.info(f"Model loaded successfully: {model_path}")
         return True
         
@@ -78,6 +171,35 @@ def initialize_llm(model_path=None, n_ctx=4096, n_gpu_layers=0):
         logger.error(f"Error initializing LLM: {str(e)}")
         return False
 
+def ensure_llm():
+    """Load the preferred local model if it isn't loaded yet"""
+    if llm is not None:
+        return True
+    
+    # Try to use TinyLlama first (faster)
+    if os.path.exists(TINY_LLAMA_PATH):
+        logger.info("Using TinyLlama model for faster analysis")
+        return initialize_llm(model_path=TINY_LLAMA_PATH, n_ctx=min(LLAMA_CPP_CTX, 2048))  # TinyLlama was trained on 2048 tokens
+    
+    # Initialize the default model if TinyLlama is not available
+    return initialize_llm()
+
+def preload_llm():
+    """Load the model at startup and run a one-token completion so the first real request starts warm"""
+    if not LLAMA_CPP_AVAILABLE or not ensure_llm():
+        return False
+    
+    try:
+        llm("<s>[INST]Warm-up[/INST]", max_tokens=1)
+        logger.info("llama.cpp model warmed up")
+    except Exception as e:
+        logger.warning(f"Model warm-up failed: {str(e)}")
+    return True
+
+def is_llama_cpp_model_downloaded():
+    """Check if a GGUF model is already present locally (no download needed to load it)"""
+    return os.path.exists(DEFAULT_MODEL_PATH) or os.path.exists(TINY_LLAMA_PATH)
+
 def analyze_resume_with_llama_cpp(resume_text: str) -> Dict[str, Any]:
     """
     Analyze a resume using a local LLM via llama.cpp
@@ -93,76 +215,38 @@ def analyze_resume_with_llama_cpp(resume_text: str) -> Dict[str, Any]:
     # Check if llama_cpp is available
     if not LLAMA_CPP_AVAILABLE:
         logger.warning("llama_cpp is not available, falling back to regex analysis")
-        return analyze_resume_with_regex(resume_text)
+        return analyze_resume_with_regex_fallback(resume_text)
     
-    # Try to use TinyLlama first (faster)
-    tiny_llama_path = os.path.join(MODELS_DIR, "tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf")
-    if os.path.exists(tiny_llama_path):
-        logger.info("Using TinyLlama model for faster analysis")
-        if not initialize_llm(model_path=tiny_llama_path, n_ctx=1024):  # Even smaller context for TinyLlama
-            logger.warning("Failed to initialize TinyLlama, falling back to regex analysis")
-            return analyze_resume_with_regex(resume_text)
-    else:
-        # Initialize the default model if TinyLlama is not available
-        if not initialize_llm(n_ctx=4096):  # Increased context size for Mistral
-            logger.warning("Failed to initialize LLM, falling back to regex analysis")
-            return analyze_resume_with_regex(resume_text)
+    if not ensure_llm():
+        logger.warning("Failed to initialize LLM, falling back to regex analysis")
+        return analyze_resume_with_regex_fallback(resume_text)
     
     try:
-        # Truncate text to fit in context window (conservative limit)
-        max_chars = 2000  # Increased from 1000 to 2000 for Mistral's larger context
-        if len(resume_text) > max_chars:
-            logger.info(f"Truncating resume text from {len(resume_text)} to {max_chars} characters")
-            resume_text = resume_text[:max_chars]
-        
-        # Create a prompt for Mistral 7B Instruct
-        prompt = f"""<s>[INST]Analyze this resume and extract key information as JSON:
-
-```
-{resume_text}
-```
-
-Extract: summary (1-2 sentences), skills (list), experience (years as number), educationLevel (highest degree), category (job field).[/INST]
-
-```json
-"""
+        # Create a prompt for Mistral 7B Instruct (the resume is truncated to its token budget)
+        prompt = build_analysis_prompt_tokens(resume_text)
         
         logger.info("Generating response with local LLM")
         
-        # Generate completion with optimized settings
+        # Generate completion with optimized settings, constrained to a JSON object
         response = llm(
             prompt,
-            max_tokens=256,  # Reduced from 512 to 256
+            max_tokens=ANALYSIS_MAX_TOKENS,
             temperature=0.1,
             top_p=0.95,
-            stop=["</s>", "[/INST]"]
+            stop=["</s>", "[/INST]"],
+            grammar=_get_json_grammar()
         )
         
         # Extract generated text
         generated_text = response["choices"][0]["text"] if "choices" in response else ""
         
-        # Try to complete the JSON object if it was cut off
-        if generated_text and not "}" in generated_text:
-            generated_text += '}'
-            
-        # Make sure it starts with a proper JSON format
-        if generated_text and not generated_text.startswith('{'):
-            generated_text = '{' + generated_text
-        
         logger.info(f"Generated response length: {len(generated_text)} chars")
         
-        # Extract and parse the JSON
+        # Parse the JSON
         try:
-            # Clean the text to ensure it's valid JSON
-            json_text = generated_text.strip()
-            
-            # Add closing bracket if missing
-            bracket_diff = json_text.count('{') - json_text.count('}')
-            if bracket_diff > 0:
-                json_text += '}' * bracket_diff
-                
-            # Parse the JSON
-            result_dict = json.loads(json_text)
+            result_dict = orjson.loads(generated_text)
+            if not isinstance(result_dict, dict):
+                raise ValueError("Model response is not a JSON object")
             
             # Create a standardized result with default values for missing fields
             analysis_result = {
@@ -184,70 +268,44 @@ Extract: summary (1-2 sentences), skills (list), experience (years as number), e
             logger.info(f"Successfully extracted {len(analysis_result['skills'])} skills with local LLM")
             return analysis_result
             
-        except (json.JSONDecodeError, ValueError) as e:
+        except (orjson.JSONDecodeError, ValueError, TypeError) as e:
+            # With the grammar this only happens when the reply hit max_tokens mid-object
             logger.error(f"Error parsing LLM response as JSON: {str(e)}")
             logger.debug(f"Raw response: {generated_text[:200]}...")
-            
-            # Try to extract partial data if possible
-            try:
-                # Look for skill lists in brackets
-                skills_match = re.search(r'"skills":\s*\[(.*?)\]', generated_text)
-                skills = []
-                if skills_match:
-                    skills_text = skills_match.group(1)
-                    skills = [s.strip().strip('"\'') for s in skills_text.split(",")]
-                
-                # Look for summary
-                summary_match = re.search(r'"summary":\s*"(.*?)"', generated_text)
-                summary = "Professional with relevant experience."
-                if summary_match:
-                    summary = summary_match.group(1)
-                
-                # Experience years
-                exp_match = re.search(r'"experience":\s*(\d+)', generated_text)
-                experience = 2
-                if exp_match:
-                    experience = int(exp_match.group(1))
-                
-                # Education level
-                edu_match = re.search(r'"educationLevel":\s*"(.*?)"', generated_text)
-                education = "Bachelor's"
-                if edu_match:
-                    education = edu_match.group(1)
-                
-                # Job category
-                cat_match = re.search(r'"category":\s*"(.*?)"', generated_text)
-                category = "Professional"
-                if cat_match:
-                    category = cat_match.group(1)
-                
-                # Return extracted data
-                return {
-                    "summary": summary,
-                    "skills": skills if skills else ["Communication", "Problem Solving"],
-                    "experience": experience,
-                    "educationLevel": education,
-                    "category": category
-                }
-            except Exception:
-                # If all extraction fails, fall back to regex
-                logger.warning("Could not extract partial data, falling back to regex analysis")
-                return analyze_resume_with_regex(resume_text)
+            return analyze_resume_with_regex_fallback(resume_text)
     
     except Exception as e:
         logger.error(f"Error using local LLM: {str(e)}")
-        return analyze_resume_with_regex(resume_text)
+        return analyze_resume_with_regex_fallback(resume_text)
+
+def analyze_resumes_batch(resume_texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Analyze several resumes with the local LLM in one call
+    
+    The in-process llama.cpp model decodes a single sequence at a time, so the
+    prompts run back to back on the already-loaded model; batching saves the
+    per-request model check and worker hand-off rather than decoding in parallel.
+    
+    Args:
+        resume_texts: The text content of each resume
+        
+    Returns:
+        One analysis dictionary per resume, in the same order
+    """
+    if LLAMA_CPP_AVAILABLE:
+        ensure_llm()
+    return [analyze_resume_with_llama_cpp(resume_text) for resume_text in resume_texts]
 
 def download_model(model_url=None):
     """
     Download a model if not present locally.
     Similar to how LMStudio would download models.
     """
-    import requests
+    # tqdm is only needed for the one-off download progress bar
     from tqdm import tqdm
     
-    # Default to a small GGUF model if none specified
-    model_url = model_url or "https://huggingface.co/TheBloke/Llama-2-7B-Chat-GGUF/resolve/main/llama-2-7b-chat.Q4_K_M.gguf"
+    # Default to the quantized GGUF that DEFAULT_MODEL_PATH points at
+    model_url = model_url or DEFAULT_MODEL_URL
     model_name = os.path.basename(model_url)
     model_path = os.path.join(MODELS_DIR, model_name)
     
@@ -1,4 +1,5 @@
 import os
+import re
 import requests
 import json
 import random
@@ -90,7 +91,6 @@ async def generate_summary_with_api(resume_text: str) -> Dict[str, Any]:
         experience_text = experience_response.json()[0]["generated_text"]
         try:
             # Extract first number from the response
-            import re
             experience_match = re.search(r'\d+', experience_text)
             experience = int(experience_match.group()) if experience_match else random.randint(1, 7)
         except:
@@ -1,9 +1,9 @@
 import os
-import json
+import orjson
 import requests
 import logging
 from typing import Dict, Any, List, Optional
-from dotenv import load_dotenv
+from services.config_service import load_env
 import re
 
 # Initialize logging
@@ -11,7 +11,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
-load_dotenv()
+load_env()
 
 # Get API token from environment
 HUGGINGFACE_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN")
@@ -89,7 +89,7 @@ Example response format:
         # Check if the request was successful
         if response.status_code == 200:
             # Parse the response
-            result = response.json()
+            result = orjson.loads(response.content)
             logger.info("Received successful response from Hugging Face API")
             
             # Extract the generated text
@@ -113,7 +113,7 @@ Example response format:
                     json_str = generated_text[json_start:json_end+1]
                     
                     # Parse the JSON
-                    analysis_result = json.loads(json_str)
+                    analysis_result = orjson.loads(json_str)
                     
                     # Validate the result has all required fields
                     required_fields = ["summary", "skills", "experience", "educationLevel", "category"]
@@ -149,7 +149,7 @@ Example response format:
                     logger.info(f"Successfully extracted {len(analysis_result['skills'])} skills")
                     return analysis_result
                 
-                except json.JSONDecodeError as e:
+                except orjson.JSONDecodeError as e:
                     logger.error(f"Failed to parse JSON from response: {e}")
                     logger.debug(f"Raw response: {generated_text}")
                     raise ValueError(f"Failed to parse analysis result: {e}")
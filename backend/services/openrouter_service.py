@@ -1,43 +1,260 @@
 import os
+import asyncio
+import hashlib
 import json
-import requests
+import orjson
 import logging
 import re
-from typing import Dict, Any, List, Optional
-from dotenv import load_dotenv
+import time
+from typing import Dict, Any, List, Optional, Tuple, Union
+from services.config_service import load_env
+from pathlib import Path
 import random
 import httpx
+from services.cache_service import LRUCache, NearDuplicateIndex
+
+# Optional incremental JSON parser for the (large) /models listing
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables with force reload
-load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'), override=True)
+# Load environment variables (.env overrides the shell environment)
+load_env()
 
 # OpenRouter API settings - load from environment but with fallbacks
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_API_KEY = (os.getenv("OPENROUTER_API_KEY") or "").strip()
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "mistralai/mistral-7b-instruct:free")
 OPENROUTER_CHAT_COMPLETIONS_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 OPENROUTER_MODEL_NAME = os.getenv("OPENROUTER_MODEL_NAME", "mistralai/mistral-7b-instruct:free")
 
-# Print the API key for debugging (first 10 chars and last 5 chars only for security)
-logger.info(f"Loaded OpenRouter API key: {OPENROUTER_API_KEY[:10]}...{OPENROUTER_API_KEY[-5:]}")
+# Normalize and validate the API key once at import, so requests just reuse the prebuilt headers
+# (the key itself is never logged)
+if OPENROUTER_API_KEY.startswith("Bearer "):
+    OPENROUTER_API_KEY = OPENROUTER_API_KEY[7:]
+if not OPENROUTER_API_KEY:
+    logger.warning("No OpenRouter API key configured; OpenRouter analysis will fall back to mock data")
+elif not OPENROUTER_API_KEY.startswith("sk-or-"):
+    logger.warning("OPENROUTER_API_KEY does not look like an OpenRouter key (expected an 'sk-or-' prefix)")
 logger.info(f"Using model: {OPENROUTER_MODEL}")
 
-# Log the API key being used (first 10 chars and last 5 chars only for security)
-logger.info(f"Using OpenRouter API key: {OPENROUTER_API_KEY[:10]}...{OPENROUTER_API_KEY[-5:]}")
-logger.info(f"API key length: {len(OPENROUTER_API_KEY)} characters")
+_AUTH_HEADERS = {
+    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+    "HTTP-Referer": "https://github.com/theagentvikram/ResuMatch",
+    "X-Title": "ResuMatch",
+    "Content-Type": "application/json"
+}
+
+# Patterns for cleaning up model output, compiled once instead of on every response
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```')
+_UNQUOTED_KEY_RE = re.compile(r'([{,]\s*)([a-zA-Z0-9_]+)\s*:')
+_NUMBER_RE = re.compile(r'\d+')
+_JSON_DECODER = json.JSONDecoder()
+
+def _parse_json_object(text: str) -> Any:
+    """
+    Parse the JSON value at the start of text, ignoring anything the model wrote after it
+    
+    Raises:
+        json.JSONDecodeError: If text doesn't start with valid JSON
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # raw_decode stops at the end of the first complete value, so trailing prose is
+        # skipped without searching for the closing brace
+        return _JSON_DECODER.raw_decode(text)[0]
+
+# Education-level substrings in priority order (earlier entries win when several appear)
+_EDU_MAP = [
+    ("master", "Master's"),
+    ("bachelor", "Bachelor's"), ("bs", "Bachelor's"), ("ba", "Bachelor's"),
+    ("phd", "PhD"), ("doctor", "PhD"),
+    ("associate", "Associate's"),
+    ("high school", "High School")
+]
+_EDU_PRIORITY = {substring: rank for rank, (substring, _) in enumerate(_EDU_MAP)}
+_EDU_CANONICAL = dict(_EDU_MAP)
+# Lookahead so overlapping substrings (e.g. "ba" inside "bachelor") are all seen in one scan
+_EDU_RE = re.compile("(?=(" + "|".join(re.escape(substring) for substring, _ in _EDU_MAP) + "))")
+
+def normalize_education_level(edu_level: str) -> Optional[str]:
+    """
+    Map a free-form education level to its canonical name in a single scan
+    
+    Args:
+        edu_level: Education level as returned by the model
+        
+    Returns:
+        Canonical education level, or None if nothing recognizable was found
+    """
+    matches = {match.group(1) for match in _EDU_RE.finditer(edu_level.lower())}
+    if not matches:
+        return None
+    return _EDU_CANONICAL[min(matches, key=_EDU_PRIORITY.__getitem__)]
 
+class _JsonObjectTracker:
+    """
+    Incrementally tracks brace depth (outside of JSON strings) over streamed text,
+    to tell when the first top-level JSON object is complete
+    """
 
-def analyze_resume_with_openrouter(resume_text: str, fallback_to_mock: bool = True) -> Dict[str, Any]:
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> bool:
+        """Consume the next fragment; returns True once a complete top-level object has been seen"""
+        for char in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = self.started
+            elif char == "{":
+                self.depth += 1
+                self.started = True
+            elif char == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+async def _stream_chat_completion(
+    client: httpx.AsyncClient,
+    headers: Dict[str, str],
+    payload: Dict[str, Any]
+) -> Tuple[httpx.Response, Optional[str]]:
+    """
+    Send a streaming chat completion request and collect the generated text
+    
+    Content deltas are read from the server-sent events as they arrive, and the stream is
+    abandoned as soon as a complete top-level JSON object has been generated.
+    
+    Args:
+        client: HTTP client to send the request with
+        headers: Request headers
+        payload: Chat completion payload (streaming is switched on here)
+        
+    Returns:
+        The response (body read for non-200 statuses) and the generated text, or None on error
+    """
+    async with client.stream(
+        "POST", OPENROUTER_API_URL, headers=headers, json={**payload, "stream": True}, timeout=30
+    ) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return response, None
+        
+        fragments: List[str] = []
+        tracker = _JsonObjectTracker()
+        async for line in response.aiter_lines():
+            # Skip blank separators and SSE comments (OpenRouter sends keep-alive comments)
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            choices = orjson.loads(data).get("choices") or []
+            if not choices:
+                continue
+            fragment = (choices[0].get("delta") or {}).get("content") or ""
+            fragments.append(fragment)
+            if tracker.feed(fragment):
+                break
+        return response, "".join(fragments)
+
+# Analyses are cached on disk by SHA-256 of model + prompt version + (truncated) resume text;
+# bump ANALYSIS_PROMPT_VERSION whenever the prompt changes so stale analyses aren't served
+ANALYSIS_PROMPT_VERSION = "v1"
+ANALYSIS_CACHE_DIR = Path("./storage/cache/analysis")
+# Hot entries are kept in memory as serialized JSON so every hit returns a fresh dict
+_analysis_memory_cache = LRUCache(max_entries=1024)
+# Near-identical resumes (whitespace, punctuation or header edits) reuse an existing analysis
+_analysis_near_duplicates = NearDuplicateIndex(threshold=0.95)
+
+def _analysis_cache_key(resume_text: str) -> str:
+    return hashlib.sha256(f"{OPENROUTER_MODEL}|{ANALYSIS_PROMPT_VERSION}|{resume_text}".encode("utf-8")).hexdigest()
+
+def _load_cached_analysis(cache_key: str) -> Optional[Dict[str, Any]]:
+    """Look up a cached analysis in memory, then on disk"""
+    data = _analysis_memory_cache.get(cache_key)
+    if data is None:
+        try:
+            data = (ANALYSIS_CACHE_DIR / f"{cache_key}.json").read_bytes()
+        except OSError:
+            return None
+        _analysis_memory_cache.put(cache_key, data)
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return None
+
+def _store_cached_analysis(cache_key: str, analysis: Dict[str, Any], resume_text: str) -> None:
+    """Store an analysis in memory and on disk (written to a temp file, then renamed)"""
+    data = orjson.dumps(analysis)
+    _analysis_memory_cache.put(cache_key, data)
+    _analysis_near_duplicates.add(cache_key, resume_text)
+    try:
+        ANALYSIS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        temp_path = ANALYSIS_CACHE_DIR / f"{cache_key}.{os.getpid()}.tmp"
+        temp_path.write_bytes(data)
+        os.replace(temp_path, ANALYSIS_CACHE_DIR / f"{cache_key}.json")
+    except OSError as e:
+        logger.warning(f"Error writing analysis cache: {e}")
+
+def _load_near_duplicate_analysis(cache_key: str, resume_text: str) -> Optional[Dict[str, Any]]:
+    """Reuse the cached analysis of a near-identical resume, storing it under cache_key as well"""
+    duplicate_key = _analysis_near_duplicates.find(resume_text)
+    if duplicate_key is None:
+        return None
+    analysis = _load_cached_analysis(duplicate_key)
+    if analysis is not None:
+        _store_cached_analysis(cache_key, analysis, resume_text)
+    return analysis
+
+# Pooled client used when callers don't pass their own, so keep-alive connections
+# (and the TLS handshake) are reused across calls; created on first use
+_client: Optional[httpx.AsyncClient] = None
+
+def _get_client(client: Optional[httpx.AsyncClient] = None) -> httpx.AsyncClient:
+    """Return the caller's client, or the module-level pooled client"""
+    global _client
+    if client is not None:
+        return client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+    return _client
+
+
+async def analyze_resume_with_openrouter(
+    resume_text: str,
+    fallback_to_mock: bool = True,
+    client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, Any]:
     """
     Analyze a resume using the OpenRouter API with Mistral model
     
     Args:
         resume_text: The text of the resume to analyze
         fallback_to_mock: Whether to fall back to mock data if the API call fails
+        client: Shared HTTP client to send the request with (the module's pooled client is used if omitted)
         
     Returns:
         Dict containing the analysis results or mock data if fallback_to_mock is True
@@ -51,6 +268,15 @@ def analyze_resume_with_openrouter(resume_text: str, fallback_to_mock: bool = Tr
         logger.info(f"Truncating resume text from {len(resume_text)} to {max_chars} characters")
         resume_text = resume_text[:max_chars]
     
+    # Identical resumes (e.g. re-uploads) are answered from the cache without calling the API
+    cache_key = _analysis_cache_key(resume_text)
+    cached_result = await asyncio.to_thread(_load_cached_analysis, cache_key)
+    if cached_result is None:
+        cached_result = await asyncio.to_thread(_load_near_duplicate_analysis, cache_key, resume_text)
+    if cached_result is not None:
+        logger.info("Using cached OpenRouter analysis")
+        return cached_result
+    
     # Create a structured prompt for better extraction
     system_prompt = """You are an expert AI resume analyzer with years of experience in HR and recruitment. 
     Your task is to carefully analyze resumes and extract accurate, detailed information about the candidate's skills, 
@@ -83,23 +309,11 @@ Based on the resume above, extract and return ONLY the following information in
 
 Format your response as a valid JSON object with these five keys. DO NOT include any explanations before or after the JSON. Ensure the JSON is properly formatted and valid."""
     
-    # Set up the headers with authentication - try a different approach
-    # Remove 'Bearer ' prefix if it's already in the key
-    api_key = OPENROUTER_API_KEY
-    if api_key.startswith("Bearer "):
-        api_key = api_key[7:]
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    # Log the headers for debugging
-    logger.info(f"Using Authorization header: Bearer {api_key[:10]}...{api_key[-5:]}")
-    logger.info(f"Full API key being used: {api_key}")
-    logger.info(f"Using Content-Type: {headers['Content-Type']}")
-    logger.info(f"API key length: {len(api_key)} characters")
-    
+    if not OPENROUTER_API_KEY:
+        if fallback_to_mock:
+            logger.warning("No OpenRouter API key configured, using mock analysis")
+            return generate_mock_analysis(resume_text)
+        raise ValueError("No OpenRouter API key configured")
     
     # Prepare the payload
     payload = {
@@ -116,51 +330,43 @@ Format your response as a valid JSON object with these five keys. DO NOT include
     try:
         # Make the API call
         logger.info(f"Sending request to OpenRouter API with model: {OPENROUTER_MODEL}")
-        logger.info(f"API URL: {OPENROUTER_API_URL}")
-        logger.info(f"API Key (first 10 chars): {OPENROUTER_API_KEY[:10]}...")
-        logger.info(f"Headers: {headers}")
-        logger.info(f"Payload: {json.dumps(payload)[:500]}...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Payload: {orjson.dumps(payload)[:500].decode(errors='replace')}...")
         
-        # Set a timeout to avoid hanging indefinitely
-        response = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=30)
+        # Stream the completion (with a timeout to avoid hanging indefinitely) so we can stop
+        # reading as soon as the JSON object is complete
+        response, generated_text = await _stream_chat_completion(_get_client(client), _AUTH_HEADERS, payload)
         
         # Log the response status and headers
         logger.info(f"Response status code: {response.status_code}")
-        logger.info(f"Response headers: {response.headers}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Response headers: {response.headers}")
         
         # Handle different response status codes
         if response.status_code == 200:
-            # Success! Parse the response
-            result = response.json()
             logger.info("Received successful response from OpenRouter API")
             
-            # Extract the generated text
-            if "choices" in result and len(result["choices"]) > 0:
-                generated_text = result["choices"][0]["message"]["content"]
-                
+            if generated_text:
                 # Clean up any markdown formatting (```json)
-                if "```json" in generated_text or "```" in generated_text:
-                    json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', generated_text)
+                if "```" in generated_text:
+                    json_match = _JSON_FENCE_RE.search(generated_text)
                     if json_match:
                         generated_text = json_match.group(1).strip()
                 
-                # Clean up any other potential formatting issues
-                if not generated_text.strip().startswith("{"):
-                    # If it doesn't start with {, try to find JSON within the text
-                    json_start = generated_text.find("{")
-                    json_end = generated_text.rfind("}")
-                    if json_start >= 0 and json_end > json_start:
-                        generated_text = generated_text[json_start:json_end+1]
+                # Skip any text before the JSON object; whatever follows it is ignored by the parser
+                json_start = generated_text.find("{")
+                if json_start > 0:
+                    generated_text = generated_text[json_start:]
                 
-                logger.info(f"Cleaned JSON text: {generated_text[:100]}...")
+                # The model output is resume-derived, so it is only logged when debugging
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Full generated text: {generated_text}")
                 
                 try:
-                    # Log the full generated text for debugging
-                    logger.info(f"Full generated text: {generated_text}")
-                    
                     # Parse the JSON with better error handling
+                    parse_failed = False
                     try:
-                        parsed_result = json.loads(generated_text)
+                        parsed_result = _parse_json_object(generated_text)
                     except json.JSONDecodeError as json_err:
                         logger.error(f"JSON parsing error: {json_err}")
                         logger.error(f"Problematic JSON: {generated_text}")
@@ -170,14 +376,15 @@ Format your response as a valid JSON object with these five keys. DO NOT include
                         # Replace single quotes with double quotes
                         fixed_text = fixed_text.replace("'", "\"")
                         # Ensure property names are double-quoted
-                        fixed_text = re.sub(r'([{,]\s*)([a-zA-Z0-9_]+)\s*:', r'\1"\2":', fixed_text)
+                        fixed_text = _UNQUOTED_KEY_RE.sub(r'\1"\2":', fixed_text)
                         
                         logger.info(f"Attempting to parse fixed JSON: {fixed_text}")
                         try:
-                            parsed_result = json.loads(fixed_text)
+                            parsed_result = _parse_json_object(fixed_text)
                         except json.JSONDecodeError:
                             # If still failing, create a default response
                             logger.error("Still failed to parse JSON after fixes, using default response")
+                            parse_failed = True
                             parsed_result = {
                                 "summary": "Failed to parse LLM response. The model returned invalid JSON.",
                                 "skills": ["Error parsing response"],
@@ -217,7 +424,7 @@ Format your response as a valid JSON object with these five keys. DO NOT include
                             # Try to extract a number from the experience field
                             if isinstance(parsed_result["experience"], str):
                                 # Try to find a number in the string
-                                num_match = re.search(r'\d+', parsed_result["experience"])
+                                num_match = _NUMBER_RE.search(parsed_result["experience"])
                                 if num_match:
                                     parsed_result["experience"] = int(num_match.group())
                                 else:
@@ -229,19 +436,14 @@ Format your response as a valid JSON object with these five keys. DO NOT include
                             parsed_result["experience"] = 0
                     
                     # Standardize educationLevel to match expected values
-                    edu_level = parsed_result["educationLevel"].lower()
-                    if "master" in edu_level:
-                        parsed_result["educationLevel"] = "Master's"
-                    elif "bachelor" in edu_level or "bs" in edu_level or "ba" in edu_level:
-                        parsed_result["educationLevel"] = "Bachelor's"
-                    elif "phd" in edu_level or "doctor" in edu_level:
-                        parsed_result["educationLevel"] = "PhD"
-                    elif "associate" in edu_level:
-                        parsed_result["educationLevel"] = "Associate's"
-                    elif "high school" in edu_level:
-                        parsed_result["educationLevel"] = "High School"
+                    parsed_result["educationLevel"] = (
+                        normalize_education_level(parsed_result["educationLevel"])
+                        or parsed_result["educationLevel"]
+                    )
                     
                     logger.info(f"Successfully extracted {len(parsed_result.get('skills', []))} skills")
+                    if not parse_failed:
+                        await asyncio.to_thread(_store_cached_analysis, cache_key, parsed_result, resume_text)
                     return parsed_result
                     
                 except json.JSONDecodeError as e:
@@ -278,7 +480,7 @@ Format your response as a valid JSON object with these five keys. DO NOT include
             logger.error(f"API call failed with status code {response.status_code}: {response.text}")
             raise ValueError(f"API call failed with status code {response.status_code}: {response.text}")
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Request to OpenRouter API failed: {e}")
         raise ValueError(f"Failed to connect to OpenRouter API: {e}")
     
@@ -287,6 +489,64 @@ Format your response as a valid JSON object with these five keys. DO NOT include
         raise ValueError(f"Resume analysis failed: {e}")
 
 
+# Maximum number of OpenRouter analysis requests in flight at once (respects provider rate limits)
+OPENROUTER_MAX_CONCURRENCY = 10
+
+async def analyze_resumes_with_openrouter(
+    resume_texts: List[str],
+    fallback_to_mock: bool = True,
+    client: Optional[httpx.AsyncClient] = None
+) -> List[Union[Dict[str, Any], Exception]]:
+    """
+    Analyze several resumes concurrently with the OpenRouter API
+    
+    Args:
+        resume_texts: The texts of the resumes to analyze
+        fallback_to_mock: Whether to fall back to mock data if an API call fails
+        client: Shared HTTP client to send the requests with (the module's pooled client is used if omitted)
+        
+    Returns:
+        One result per resume, in order; a failed analysis is returned as its exception
+        instead of failing the whole batch
+    """
+    semaphore = asyncio.Semaphore(OPENROUTER_MAX_CONCURRENCY)
+    
+    async def analyze(resume_text: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await analyze_resume_with_openrouter(resume_text, fallback_to_mock=fallback_to_mock, client=client)
+    
+    return await asyncio.gather(*(analyze(text) for text in resume_texts), return_exceptions=True)
+
+
+# Keyword patterns for the mock analysis, compiled once (education and category take the first match in order)
+_MOCK_SKILL_KEYWORDS = [
+    "Python", "JavaScript", "TypeScript", "React", "Node.js", "HTML", "CSS",
+    "Java", "C++", "C#", "SQL", "MongoDB", "AWS", "Azure", "Docker", "Kubernetes",
+    "Git", "CI/CD", "Agile", "Scrum", "Project Management", "Leadership",
+    "Communication", "Problem Solving", "Critical Thinking", "Teamwork"
+]
+# All skill keywords in one alternation (longest first, one named group per keyword) so the text
+# is scanned once; no keyword contains another at a word boundary, so no match hides one
+_MOCK_SKILL_RE = re.compile(
+    r'\b(?:' + '|'.join(
+        f'(?P<s{i}>{re.escape(_MOCK_SKILL_KEYWORDS[i])})'
+        for i in sorted(range(len(_MOCK_SKILL_KEYWORDS)), key=lambda i: -len(_MOCK_SKILL_KEYWORDS[i]))
+    ) + r')\b',
+    re.IGNORECASE
+)
+_MOCK_EDUCATION_PATTERNS = [
+    (re.compile(r'\b(PhD|Doctor|Doctorate)\b', re.IGNORECASE), "PhD"),
+    (re.compile(r'\b(Master|MS|M\.S\.|MBA|M\.B\.A\.)\b', re.IGNORECASE), "Master's"),
+    (re.compile(r'\b(Bachelor|BS|B\.S\.|BA|B\.A\.)\b', re.IGNORECASE), "Bachelor's"),
+    (re.compile(r'\b(Associate|AA|A\.A\.|AS|A\.S\.)\b', re.IGNORECASE), "Associate's"),
+]
+_MOCK_CATEGORY_PATTERNS = [
+    (re.compile(r'\b(Data Science|Machine Learning|AI|Artificial Intelligence|Data Analysis|Statistics)\b', re.IGNORECASE), "Data Science"),
+    (re.compile(r'\b(Marketing|SEO|Social Media|Content|Brand|Advertising)\b', re.IGNORECASE), "Marketing"),
+    (re.compile(r'\b(Finance|Accounting|Investment|Banking|Financial)\b', re.IGNORECASE), "Finance"),
+    (re.compile(r'\b(Sales|Business Development|Account Manager|Client|Customer)\b', re.IGNORECASE), "Sales"),
+]
+
 def generate_mock_analysis(resume_text: str) -> Dict[str, Any]:
     """
     Generate mock analysis data when the OpenRouter API fails
@@ -302,47 +562,23 @@ def generate_mock_analysis(resume_text: str) -> Dict[str, Any]:
     logger.info("Generating mock analysis data")
     
     # Extract some basic information from the resume text using regex
-    import re
-    
-    # Extract skills (look for common skill keywords)
-    skill_keywords = [
-        "Python", "JavaScript", "TypeScript", "React", "Node.js", "HTML", "CSS",
-        "Java", "C++", "C#", "SQL", "MongoDB", "AWS", "Azure", "Docker", "Kubernetes",
-        "Git", "CI/CD", "Agile", "Scrum", "Project Management", "Leadership",
-        "Communication", "Problem Solving", "Critical Thinking", "Teamwork"
-    ]
-    
-    # Find skills mentioned in the resume
-    skills = []
-    for skill in skill_keywords:
-        if re.search(r'\b' + re.escape(skill) + r'\b', resume_text, re.IGNORECASE):
-            skills.append(skill)
+    # Find skills mentioned in the resume (look for common skill keywords)
+    found = {match.lastgroup for match in _MOCK_SKILL_RE.finditer(resume_text)}
+    skills = [skill for i, skill in enumerate(_MOCK_SKILL_KEYWORDS) if f's{i}' in found]
     
     # If no skills found, add some generic ones
     if not skills:
         skills = ["Communication", "Problem Solving", "Teamwork", "Technical Skills"]
     
     # Try to extract education level
-    education_level = "Bachelor's"
-    if re.search(r'\b(PhD|Doctor|Doctorate)\b', resume_text, re.IGNORECASE):
-        education_level = "PhD"
-    elif re.search(r'\b(Master|MS|M\.S\.|MBA|M\.B\.A\.)\b', resume_text, re.IGNORECASE):
-        education_level = "Master's"
-    elif re.search(r'\b(Bachelor|BS|B\.S\.|BA|B\.A\.)\b', resume_text, re.IGNORECASE):
-        education_level = "Bachelor's"
-    elif re.search(r'\b(Associate|AA|A\.A\.|AS|A\.S\.)\b', resume_text, re.IGNORECASE):
-        education_level = "Associate's"
+    education_level = next(
+        (level for pattern, level in _MOCK_EDUCATION_PATTERNS if pattern.search(resume_text)), "Bachelor's"
+    )
     
     # Try to determine job category
-    category = "Software Engineering"
-    if re.search(r'\b(Data Science|Machine Learning|AI|Artificial Intelligence|Data Analysis|Statistics)\b', resume_text, re.IGNORECASE):
-        category = "Data Science"
-    elif re.search(r'\b(Marketing|SEO|Social Media|Content|Brand|Advertising)\b', resume_text, re.IGNORECASE):
-        category = "Marketing"
-    elif re.search(r'\b(Finance|Accounting|Investment|Banking|Financial)\b', resume_text, re.IGNORECASE):
-        category = "Finance"
-    elif re.search(r'\b(Sales|Business Development|Account Manager|Client|Customer)\b', resume_text, re.IGNORECASE):
-        category = "Sales"
+    category = next(
+        (name for pattern, name in _MOCK_CATEGORY_PATTERNS if pattern.search(resume_text)), "Software Engineering"
+    )
     
     # Generate a generic summary
     summary = "This candidate appears to have experience in the " + category + " field. "
@@ -364,63 +600,83 @@ def generate_mock_analysis(resume_text: str) -> Dict[str, Any]:
     return mock_result
 
 
-def get_openrouter_model_status(fallback_to_mock: bool = True) -> Dict[str, Any]:
+async def _models_listing_contains(response: httpx.Response, model_id: str) -> bool:
+    """
+    Check whether a streamed /models response lists model_id (case-insensitive)
+    
+    With ijson the model IDs are parsed as the body arrives and reading stops at the
+    first match, so the full listing (descriptions, pricing, ...) is never materialized.
+    """
+    target = model_id.lower()
+    if not IJSON_AVAILABLE:
+        models_data = orjson.loads(await response.aread())
+        return target in {str(model.get("id", "")).lower() for model in models_data.get("data", [])}
+    
+    model_ids = ijson.sendable_list()
+    parser = ijson.items_coro(model_ids, "data.item.id")
+    async for chunk in response.aiter_bytes():
+        parser.send(chunk)
+        if any(str(found_id).lower() == target for found_id in model_ids):
+            # Stop reading; the unfinished parser is dropped rather than closed, since closing it
+            # mid-document raises IncompleteJSONError
+            return True
+        del model_ids[:]
+    # The whole body has been read, so closing only flushes the parser (and reports invalid JSON)
+    parser.close()
+    return any(str(found_id).lower() == target for found_id in model_ids)
+
+# Status derived from the (large) /models listing is reused for this many seconds
+MODEL_STATUS_TTL = 60
+_model_status_cache: Dict[str, Any] = {"checked_at": 0.0, "status": None}
+
+async def get_openrouter_model_status(
+    fallback_to_mock: bool = True,
+    client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, Any]:
     """
     Check if the OpenRouter API and model are available
 
     Args:
         fallback_to_mock: Whether to return a mock status if the API check fails
+        client: Shared HTTP client to send the request with (the module's pooled client is used if omitted)
 
     Returns:
         Dict containing the status of the OpenRouter API and model
     """
+    cached_status = _model_status_cache["status"]
+    if cached_status is not None and time.monotonic() - _model_status_cache["checked_at"] < MODEL_STATUS_TTL:
+        return dict(cached_status)
+    
     try:
-        # Set up the headers with authentication - try a different approach
-        # Remove 'Bearer ' prefix if it's already in the key
-        api_key = OPENROUTER_API_KEY
-        if api_key.startswith("Bearer "):
-            api_key = api_key[7:]
-
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-
-        # Log the headers for debugging
-        logger.info(f"Using Authorization header: Bearer {api_key[:10]}...{api_key[-5:]}")
-        logger.info(f"Full API key being used: {api_key}")
-        logger.info(f"Using Content-Type: {headers['Content-Type']}")
-        logger.info(f"API key length: {len(api_key)} characters")
-
         # Use the models endpoint to check API status
         models_url = "https://openrouter.ai/api/v1/models"
 
         logger.info(f"Checking OpenRouter API status with URL: {models_url}")
-        response = requests.get(models_url, headers=headers)
+        async with _get_client(client).stream("GET", models_url, headers=_AUTH_HEADERS) as response:
+            if response.status_code == 200:
+                # API is available, check if our model is in the list of available models
+                model_available = await _models_listing_contains(response, OPENROUTER_MODEL)
+            else:
+                await response.aread()
 
         if response.status_code == 200:
-            # API is available, check if our model is available
-            models_data = response.json()
-
-            # Check if our model is in the list of available models
-            model_available = False
-            for model in models_data.get("data", []):
-                if model.get("id") == OPENROUTER_MODEL:
-                    model_available = True
-                    break
-
             if model_available:
-                return {
+                status = {
                     "status": "available",
                     "message": f"OpenRouter API and model {OPENROUTER_MODEL} are available"
                 }
             else:
                 logger.warning(f"OpenRouter API is available but model {OPENROUTER_MODEL} was not found")
-                return {
+                status = {
                     "status": "unavailable",
                     "message": f"OpenRouter API is available but model {OPENROUTER_MODEL} was not found",
                     "mode": "api"
                 }
+
+            # Only answers from the API itself are cached; failures are retried on the next call
+            _model_status_cache["status"] = status
+            _model_status_cache["checked_at"] = time.monotonic()
+            return dict(status)
         elif response.status_code == 401 and fallback_to_mock:
             # Authentication failed, but we're falling back to mock data
             logger.warning("Authentication failed with OpenRouter API, falling back to mock status")
@@ -468,20 +724,20 @@ def get_openrouter_model_status(fallback_to_mock: bool = True) -> Dict[str, Any]
 async def get_relevance_score_with_openrouter(
     job_query: str,
     resume_text: str, # Use full resume text for better context
-    fallback_to_mock: bool = True
+    fallback_to_mock: bool = True,
+    client: Optional[httpx.AsyncClient] = None
 ) -> Dict[str, Any]:
     """
     Gets a relevance score for a resume against a job query using OpenRouter API.
     Returns a dictionary with 'score' (int) and 'reason' (str).
+    Pass the shared HTTP client as client to reuse its pooled connections.
     """
     logger.info("Attempting to get relevance score using OpenRouter API")
     if not OPENROUTER_API_KEY:
         logger.warning("No OpenRouter API key found for scoring. Using mock score.")
-        logger.info(f"OPENROUTER_API_KEY value at time of check: '{OPENROUTER_API_KEY}'")
         return generate_mock_score()
 
     try:
-        client = httpx.AsyncClient(timeout=30.0) # Increased timeout for potentially longer LLM responses
         prompt_messages = [
             {"role": "system", "content": """You are an expert recruitment AI. Your task is to objectively assess the relevance of a candidate's resume to a specific job description. Provide a precise numerical score from 0 to 100 based on the match. Your score should reflect how well the candidate's skills, experience, and education align with the job requirements.
 
@@ -497,33 +753,29 @@ Output only a JSON object with "score" (integer) and "reason" (string) keys."""}
             """}
         ]
 
-        response = await client.post(
-            OPENROUTER_CHAT_COMPLETIONS_API_URL,
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "HTTP-Referer": "https://github.com/theagentvikram/ResuMatch",
-                "X-Title": "ResuMatch",
-                "Content-Type": "application/json"
-            },
-            json={
+        request_kwargs = {
+            "headers": _AUTH_HEADERS,
+            "json": {
                 "model": OPENROUTER_MODEL_NAME,
                 "messages": prompt_messages,
                 "response_format": {"type": "json_object"},
                 "max_tokens": 200 # Slightly increased max_tokens for more detailed reasons
-            }
-        )
+            },
+            "timeout": 30.0 # Increased timeout for potentially longer LLM responses
+        }
+        response = await _get_client(client).post(OPENROUTER_CHAT_COMPLETIONS_API_URL, **request_kwargs)
 
         if response.status_code == 200:
-            response_json = response.json()
+            response_json = orjson.loads(response.content)
             generated_text = response_json["choices"][0]["message"]["content"]
             
             try:
-                parsed_result = json.loads(generated_text)
+                parsed_result = orjson.loads(generated_text)
                 score = parsed_result.get("score", 0)
                 reason = parsed_result.get("reason", "No reason provided by LLM.")
                 score = max(0, min(100, int(score))) # Ensure score is an int and within bounds
                 return {"score": score, "reason": reason}
-            except json.JSONDecodeError as json_err:
+            except orjson.JSONDecodeError as json_err:
                 logger.error(f"JSON parsing error for relevance score: {json_err}. Raw: {generated_text}")
                 if fallback_to_mock:
                     return generate_mock_score()
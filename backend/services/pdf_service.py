@@ -1,18 +1,143 @@
 import os
+import io
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 import pdfplumber
 import fitz  # PyMuPDF
 import re
+from services.cache_service import LRUCache
+
+# Related clean-up substitutions merged into single alternations, so each is one pass over the text
+_PAGE_NUMBER_RE = re.compile(r'\n\s*(?:\d+|Page \d+ of \d+)\s*\n')  # Standalone page numbers and "Page X of Y"
+_CONTACT_LABEL_RE = re.compile(r'(?i)(?:email|phone|tel)\s*:\s*')
+_BOILERPLATE_RE = re.compile(r'(?i)confidential.*?resume|copyright.*?\d{4}')
+_SPACE_BEFORE_PUNCTUATION_RE = re.compile(r'\s+([,.])')
+_BULLET_RE = re.compile(r'[•\*\+→●■◆➢]')
+_EXTRA_NEWLINES_RE = re.compile(r'\n{3,}')
+_EXTRA_SPACES_RE = re.compile(r' {2,}')
+_NON_ASCII_RE = re.compile(r'[^\x00-\x7F]+')
+_FORM_FIELD_RE = re.compile(r'\[.*?\]')
+_SECTION_HEADER_RE = re.compile(r'(\n[A-Z][A-Z\s]{3,})\s*')
+_BULLET_SPACING_RE = re.compile(r'(\n\s*)-\s+')
+
+# PDFs start with "%PDF-"; readers accept a little leading junk, so the header is looked for in
+# the first 1 KB. Anything else is rejected before MuPDF and pdfplumber fail on it more slowly.
+PDF_HEADER = b"%PDF-"
+PDF_HEADER_SEARCH_BYTES = 1024
+
+def looks_like_pdf(head: bytes) -> bool:
+    """Whether the first bytes of a file (at least PDF_HEADER_SEARCH_BYTES, if it has them) contain the PDF header"""
+    return PDF_HEADER in head[:PDF_HEADER_SEARCH_BYTES]
+
+# Plain-text extraction flags: keep whitespace and clip to the page, but expand ligatures ("ﬁ" ->
+# "fi", which clean-up would otherwise strip as non-ASCII) and skip the CID fallback for glyphs
+# without Unicode. Images are never extracted.
+_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+# PDFs with more pages than this are extracted in page ranges across worker processes. A fitz
+# document can't be shared between threads, but every process can open its own handle; smaller
+# PDFs (most resumes) stay serial, since handing work to a process costs more than a few pages.
+PARALLEL_PAGE_THRESHOLD = 8
+PAGE_WORKERS = os.cpu_count() or 1
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+def _get_page_pool():
+    """Process pool for page extraction, started on first use ("spawn", since the server is threaded)"""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=PAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _page_pool
+
+def _extract_page_range(source, start, end):
+    """Worker: open the PDF (path or bytes) and extract the text of pages [start, end)"""
+    if isinstance(source, (bytes, bytearray)):
+        doc = fitz.open(stream=source, filetype="pdf")
+    else:
+        doc = fitz.open(source)
+    try:
+        return "".join(page.get_text("text", flags=_TEXT_FLAGS, sort=False) + "\n\n" for page in doc.pages(start, end))
+    finally:
+        doc.close()
+
+def _extract_pages_in_parallel(source, page_count):
+    """Split the pages into one contiguous range per worker and join the results in page order"""
+    pool = _get_page_pool()
+    workers = min(PAGE_WORKERS, page_count)
+    bounds = [page_count * i // workers for i in range(workers + 1)]
+    ranges = pool.map(_extract_page_range, [source] * workers, bounds[:-1], bounds[1:])
+    return "".join(ranges)
+
+# Extracted text keyed by the SHA-256 of the PDF bytes, in memory and on disk, so re-uploads and
+# repeated searches over the same stored resumes don't parse the PDF again. Bump the version
+# when the extraction or clean-up changes so stale text isn't served.
+PDF_TEXT_CACHE_DIR = Path("./storage/cache/pdf_text/v2")
+_pdf_text_memory_cache = LRUCache(max_entries=256)
+
+def _load_cached_text(pdf_hash):
+    text = _pdf_text_memory_cache.get(pdf_hash)
+    if text is None:
+        try:
+            text = (PDF_TEXT_CACHE_DIR / f"{pdf_hash}.txt").read_text(encoding="utf-8")
+        except OSError:
+            return None
+        _pdf_text_memory_cache.put(pdf_hash, text)
+    return text
+
+def _store_cached_text(pdf_hash, text):
+    """Store extracted text in memory and on disk (written to a temp file, then renamed)"""
+    _pdf_text_memory_cache.put(pdf_hash, text)
+    try:
+        PDF_TEXT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        temp_path = PDF_TEXT_CACHE_DIR / f"{pdf_hash}.{os.getpid()}.tmp"
+        temp_path.write_text(text, encoding="utf-8")
+        os.replace(temp_path, PDF_TEXT_CACHE_DIR / f"{pdf_hash}.txt")
+    except OSError as e:
+        print(f"Error writing PDF text cache: {str(e)}")
 
 def extract_text_from_pdf(file_path):
     """
     Extract text from a PDF file using PyMuPDF and fallback to pdfplumber if needed
     
+    Results are cached by a hash of the PDF contents.
+    
     Args:
-        file_path: Path to the PDF file
+        file_path: Path to the PDF file, or the PDF contents as bytes
         
     Returns:
         String containing the extracted text
+        
+    Raises:
+        ValueError: If the data doesn't start with a PDF header
     """
+    # Hashing the bytes is far cheaper than parsing them; the bytes read here are also
+    # what gets parsed on a miss, so the file is only read once
+    if isinstance(file_path, (bytes, bytearray)):
+        data = bytes(file_path)
+    else:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    if not looks_like_pdf(data):
+        raise ValueError("Not a PDF file (no %PDF- header)")
+    pdf_hash = hashlib.sha256(data).hexdigest()
+    
+    cached_text = _load_cached_text(pdf_hash)
+    if cached_text is not None:
+        return cached_text
+    
+    text = _extract_text_uncached(data)
+    _store_cached_text(pdf_hash, text)
+    return text
+
+def _extract_text_uncached(file_path):
+    """Extract text from a PDF (path or bytes) with PyMuPDF, falling back to pdfplumber"""
     extracted_text = ""
     
     try:
@@ -58,38 +183,46 @@ def extract_text_from_pdf(file_path):
 
 def extract_with_pymupdf(file_path):
     """Extract text using PyMuPDF with enhanced handling"""
-    text = ""
+    # Page texts are collected and joined once; repeated += would copy the text so far on every page
+    parts = []
     try:
-        doc = fitz.open(file_path)
-        print(f"PDF document opened with PyMuPDF, {doc.page_count} pages found")
-        
-        for page_num, page in enumerate(doc):
-            try:
-                # Get text with more precise extraction to handle layouts better
-                page_text = page.get_text("text")
-                
-                # Check if we have reasonable text content
-                if len(page_text.strip()) < 10:
-                    # Try with a different extraction method
-                    page_text = page.get_text("blocks")
-                    if isinstance(page_text, list):
-                        page_text = "\n".join([block[4] for block in page_text if len(block) > 4])
-                
-                text += page_text + "\n\n"
-                print(f"  - Page {page_num+1}: Extracted {len(page_text)} characters")
-            except Exception as e:
-                print(f"  - Error extracting page {page_num+1}: {str(e)}")
-        
-        doc.close()
-        return text
+        if isinstance(file_path, (bytes, bytearray)):
+            doc = fitz.open(stream=file_path, filetype="pdf")
+        else:
+            doc = fitz.open(file_path)
+        try:
+            print(f"PDF document opened with PyMuPDF, {doc.page_count} pages found")
+            
+            if doc.page_count > PARALLEL_PAGE_THRESHOLD:
+                try:
+                    return _extract_pages_in_parallel(file_path, doc.page_count)
+                except Exception as e:
+                    print(f"Parallel page extraction failed, extracting serially: {str(e)}")
+            
+            for page_num, page in enumerate(doc.pages()):
+                try:
+                    # Plain text extraction in content-stream order. Re-extracting near-empty pages as
+                    # "blocks" used the same text extraction, so it only added image placeholders.
+                    page_text = page.get_text("text", flags=_TEXT_FLAGS, sort=False)
+                    parts.append(page_text)
+                    parts.append("\n\n")
+                    print(f"  - Page {page_num+1}: Extracted {len(page_text)} characters")
+                except Exception as e:
+                    print(f"  - Error extracting page {page_num+1}: {str(e)}")
+            
+            return "".join(parts)
+        finally:
+            doc.close()
     except Exception as e:
         print(f"PyMuPDF extraction error: {str(e)}")
         return ""
 
 def extract_with_pdfplumber(file_path):
     """Extract text using pdfplumber with enhanced handling"""
-    text = ""
+    parts = []
     try:
+        if isinstance(file_path, (bytes, bytearray)):
+            file_path = io.BytesIO(file_path)
         with pdfplumber.open(file_path) as pdf:
             print(f"PDF document opened with pdfplumber, {len(pdf.pages)} pages found")
             
@@ -109,12 +242,13 @@ def extract_with_pdfplumber(file_path):
                         except:
                             pass
                     
-                    text += page_text + "\n\n"
+                    parts.append(page_text)
+                    parts.append("\n\n")
                     print(f"  - Page {page_num+1}: Extracted {len(page_text)} characters")
                 except Exception as e:
                     print(f"  - Error extracting page {page_num+1}: {str(e)}")
             
-        return text
+        return "".join(parts)
     except Exception as e:
         print(f"pdfplumber extraction error: {str(e)}")
         return ""
@@ -123,48 +257,50 @@ def clean_extracted_text(text):
     """Clean up the extracted text to improve analysis results"""
     if not text:
         return ""
-        
+    
+    # Substitutions that can only match when a literal is present are skipped with a cheap
+    # substring (or isascii) check, instead of scanning the whole text with the regex engine
+    
     # Replace multiple newlines with a single newline
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    if '\n\n\n' in text:
+        text = _EXTRA_NEWLINES_RE.sub('\n\n', text)
     
     # Replace multiple spaces with a single space
-    text = re.sub(r' {2,}', ' ', text)
+    if '  ' in text:
+        text = _EXTRA_SPACES_RE.sub(' ', text)
     
     # Remove odd characters that might affect analysis
-    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+    if not text.isascii():
+        text = _NON_ASCII_RE.sub(' ', text)
     
     # Replace tab characters with spaces
     text = text.replace('\t', ' ')
     
     # Remove page numbers and headers/footers (common patterns)
-    text = re.sub(r'\n\s*\d+\s*\n', '\n', text)  # Standalone page numbers
-    text = re.sub(r'\n\s*Page \d+ of \d+\s*\n', '\n', text)  # "Page X of Y" patterns
+    text = _PAGE_NUMBER_RE.sub('\n', text)
     
     # Remove email and phone headers but keep the values
-    text = re.sub(r'(?i)email\s*:\s*', '', text)
-    text = re.sub(r'(?i)phone\s*:\s*', '', text)
-    text = re.sub(r'(?i)tel\s*:\s*', '', text)
+    text = _CONTACT_LABEL_RE.sub('', text)
     
     # Remove repetitive copyright or confidential footers
-    text = re.sub(r'(?i)confidential.*?resume', '', text)
-    text = re.sub(r'(?i)copyright.*?\d{4}', '', text)
+    text = _BOILERPLATE_RE.sub('', text)
     
     # Fix spacing around common punctuation
-    text = re.sub(r'\s+,', ',', text)
-    text = re.sub(r'\s+\.', '.', text)
+    text = _SPACE_BEFORE_PUNCTUATION_RE.sub(r'\1', text)
     
     # Remove form field indicators often found in PDFs
-    text = re.sub(r'\[.*?\]', '', text)
+    if '[' in text:
+        text = _FORM_FIELD_RE.sub('', text)
     
     # Attempt to identify and enhance section headers
-    text = re.sub(r'(\n[A-Z][A-Z\s]{3,})\s*', r'\n\n\1\n', text)
+    text = _SECTION_HEADER_RE.sub(r'\n\n\1\n', text)
     
     # Detect and clean bullet points for better formatting
-    text = re.sub(r'•', '- ', text)
-    text = re.sub(r'[\*\+→●■◆➢]', '- ', text)
+    text = _BULLET_RE.sub('- ', text)
     
     # Fix spacing issues with bullet points
-    text = re.sub(r'(\n\s*)-\s+', r'\1- ', text)
+    if '-' in text:
+        text = _BULLET_SPACING_RE.sub(r'\1- ', text)
     
     # Remove excessive whitespace at beginning/end
     return text.strip() 
\ No newline at end of file
@@ -0,0 +1,328 @@
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Optional JIT-compiled top-k selection
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Optional approximate nearest-neighbour index for large matrices
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+def _top_k_heap(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k largest scores, best first, from one pass with a size-k min-heap
+
+    Written as plain scalar loops so numba compiles it to native code; it is only used
+    when numba is installed.
+    """
+    heap_scores = np.empty(k, dtype=scores.dtype)
+    heap_index = np.empty(k, dtype=np.int64)
+    size = 0
+    for i in range(scores.shape[0]):
+        score = scores[i]
+        if size < k:
+            # Sift the new entry up from the end of the heap
+            pos = size
+            size += 1
+            while pos > 0:
+                parent = (pos - 1) >> 1
+                if heap_scores[parent] <= score:
+                    break
+                heap_scores[pos] = heap_scores[parent]
+                heap_index[pos] = heap_index[parent]
+                pos = parent
+            heap_scores[pos] = score
+            heap_index[pos] = i
+        elif score > heap_scores[0]:
+            # Replace the smallest kept score and sift it down
+            pos = 0
+            while True:
+                child = 2 * pos + 1
+                if child >= k:
+                    break
+                if child + 1 < k and heap_scores[child + 1] < heap_scores[child]:
+                    child += 1
+                if heap_scores[child] >= score:
+                    break
+                heap_scores[pos] = heap_scores[child]
+                heap_index[pos] = heap_index[child]
+                pos = child
+            heap_scores[pos] = score
+            heap_index[pos] = i
+    order = np.argsort(-heap_scores[:size])
+    return heap_index[order]
+
+
+if NUMBA_AVAILABLE:
+    _top_k_heap = njit(cache=True)(_top_k_heap)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k largest scores, best first
+
+    Args:
+        scores: 1-D array of scores
+        k: Number of indices to return (at most len(scores))
+
+    Returns:
+        int64 array of indices
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if NUMBA_AVAILABLE:
+        return _top_k_heap(np.ascontiguousarray(scores), k)
+    # Partial selection of the top k, then sort only those
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class EmbeddingMatrix:
+    """
+    Resume embeddings stored as one contiguous, row-normalized float32 matrix.
+
+    Rows are preallocated and the capacity doubles when full, so adding a resume
+    is an O(D) row copy rather than a vstack of the whole matrix. Scoring a query
+    against every resume is a single matrix-vector product.
+
+    With quantize=True rows are stored as int8 with a per-row scale, a quarter of the
+    memory of float32. NumPy has no int8 GEMM, so scoring dequantizes cache-sized
+    blocks of rows and multiplies them with float32 BLAS.
+
+    With faiss installed and at least HNSW_MIN_ROWS rows, top_k searches an HNSW graph
+    instead of scoring every row (roughly log N per query, approximate). New rows are
+    added to the graph as they arrive; removing or replacing a row drops the graph,
+    which is rebuilt on the next search.
+    """
+
+    QUANTIZED_BLOCK_ROWS = 1024
+    HNSW_MIN_ROWS = 10000
+    HNSW_M = 32
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 128
+    # With a filter, fetch this many times k candidates so enough survive it
+    HNSW_FILTER_OVERSAMPLE = 8
+
+    def __init__(self, initial_capacity: int = 64, quantize: bool = False):
+        self.initial_capacity = initial_capacity
+        self.quantize = quantize
+        self._dtype = np.int8 if quantize else np.float32
+        self._matrix: Optional[np.ndarray] = None  # (capacity, D); rows [0, len) are live
+        self._scales: Optional[np.ndarray] = None  # (capacity,) float32 row scales when quantized
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._hnsw = None  # faiss HNSW graph over rows [0, _hnsw_rows), built on demand
+        self._hnsw_rows = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, resume_id: str) -> bool:
+        return resume_id in self._rows
+
+    def ids(self) -> List[str]:
+        """IDs of the resumes in the matrix, in row order"""
+        return list(self._ids)
+
+    def add(self, resume_id: str, embedding) -> bool:
+        """
+        Add or replace the embedding for a resume
+
+        Args:
+            resume_id: Resume ID
+            embedding: Embedding vector of the resume
+
+        Returns:
+            False if the embedding was rejected (zero vector or wrong dimension)
+        """
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return False
+        vector = vector / norm
+
+        if self._matrix is None:
+            self._matrix = np.empty((self.initial_capacity, vector.shape[0]), dtype=self._dtype)
+            self._scales = np.ones(self.initial_capacity, dtype=np.float32)
+        elif vector.shape[0] != self._matrix.shape[1]:
+            return False
+
+        row = self._rows.get(resume_id)
+        replaced = row is not None
+        if row is None:
+            row = len(self._ids)
+            if row == self._matrix.shape[0]:
+                grown = np.empty((self._matrix.shape[0] * 2, self._matrix.shape[1]), dtype=self._dtype)
+                grown[:row] = self._matrix[:row]
+                self._matrix = grown
+                grown_scales = np.ones(grown.shape[0], dtype=np.float32)
+                grown_scales[:row] = self._scales[:row]
+                self._scales = grown_scales
+            self._ids.append(resume_id)
+            self._rows[resume_id] = row
+
+        if self.quantize:
+            scale = float(np.abs(vector).max()) / 127.0
+            self._matrix[row] = np.round(vector / scale).astype(np.int8)
+            self._scales[row] = scale
+        else:
+            self._matrix[row] = vector
+
+        if self._hnsw is not None:
+            if not replaced and row == self._hnsw_rows:
+                self._hnsw.add(self._row_vectors(row, row + 1))
+                self._hnsw_rows += 1
+            else:
+                self._hnsw = None
+        return True
+
+    def remove(self, resume_id: str) -> None:
+        """Remove a resume, moving the last row into its slot"""
+        row = self._rows.pop(resume_id, None)
+        if row is None:
+            return
+        self._hnsw = None  # HNSW graphs don't support deletion; rebuilt on the next search
+        last = len(self._ids) - 1
+        if row != last:
+            last_id = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._scales[row] = self._scales[last]
+            self._ids[row] = last_id
+            self._rows[last_id] = row
+        self._ids.pop()
+
+    def retain(self, resume_ids: Iterable[str]) -> None:
+        """Remove every resume whose ID is not in resume_ids"""
+        keep = set(resume_ids)
+        for resume_id in [resume_id for resume_id in self._ids if resume_id not in keep]:
+            self.remove(resume_id)
+
+    def _row_vectors(self, start: int, end: int) -> np.ndarray:
+        """Rows [start, end) as float32 unit vectors (dequantized when stored as int8)"""
+        rows = self._matrix[start:end]
+        if not self.quantize:
+            return np.ascontiguousarray(rows)
+        return rows.astype(np.float32) * self._scales[start:end, np.newaxis]
+
+    def _normalized_query(self, query_embedding) -> Optional[np.ndarray]:
+        """The query as a float32 unit vector (None if the matrix is empty or the query can't be compared)"""
+        if self._matrix is None or not self._ids:
+            return None
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0 or query.shape[0] != self._matrix.shape[1]:
+            return None
+        return query / norm
+
+    def _get_hnsw(self):
+        """The HNSW graph over all rows, built if needed (None without faiss or below HNSW_MIN_ROWS)"""
+        count = len(self._ids)
+        if not FAISS_AVAILABLE or count < self.HNSW_MIN_ROWS:
+            return None
+        if self._hnsw is None:
+            # Unit vectors, so inner product is cosine similarity
+            index = faiss.IndexHNSWFlat(self._matrix.shape[1], self.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = self.HNSW_EF_CONSTRUCTION
+            for start in range(0, count, self.QUANTIZED_BLOCK_ROWS):
+                index.add(self._row_vectors(start, min(start + self.QUANTIZED_BLOCK_ROWS, count)))
+            index.hnsw.efSearch = self.HNSW_EF_SEARCH
+            self._hnsw = index
+            self._hnsw_rows = count
+        return self._hnsw
+
+    def _similarities(self, query_embedding) -> Optional[np.ndarray]:
+        """Similarity of the query to each live row, in row order (None if the query can't be compared)"""
+        query = self._normalized_query(query_embedding)
+        if query is None:
+            return None
+        count = len(self._ids)
+        if not self.quantize:
+            return self._matrix[:count] @ query
+        similarities = np.empty(count, dtype=np.float32)
+        for start in range(0, count, self.QUANTIZED_BLOCK_ROWS):
+            end = min(start + self.QUANTIZED_BLOCK_ROWS, count)
+            similarities[start:end] = self._matrix[start:end].astype(np.float32) @ query
+        similarities *= self._scales[:count]
+        return similarities
+
+    def scores(self, query_embedding) -> Dict[str, float]:
+        """
+        Cosine similarity of the query to every resume in the matrix
+
+        Args:
+            query_embedding: Embedding of the search query
+
+        Returns:
+            Mapping of resume ID to similarity (empty if the query can't be compared)
+        """
+        similarities = self._similarities(query_embedding)
+        if similarities is None:
+            return {}
+        return dict(zip(self._ids, similarities.tolist()))
+
+    def top_k(self, query_embedding, k: int, allowed: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """
+        The k resumes most similar to the query, best first
+
+        Large matrices are searched through the HNSW graph when faiss is installed. Otherwise
+        every row is scored and selection is O(N) (a numba heap pass, or argpartition); only
+        the k winners are sorted.
+
+        Args:
+            query_embedding: Embedding of the search query
+            k: Number of resumes to return
+            allowed: Only consider these resume IDs (e.g. those passing search filters)
+
+        Returns:
+            (resume ID, similarity) pairs (empty if the query can't be compared)
+        """
+        if k <= 0:
+            return []
+        index = self._get_hnsw()
+        if index is not None:
+            ranked = self._hnsw_top_k(index, query_embedding, k, allowed)
+            if ranked is not None:
+                return ranked
+        similarities = self._similarities(query_embedding)
+        if similarities is None:
+            return []
+        if allowed is not None:
+            rows = np.fromiter(
+                (row for resume_id, row in self._rows.items() if resume_id in allowed), dtype=np.int64
+            )
+            similarities = similarities[rows]
+        else:
+            rows = None
+        top = top_k_indices(similarities, k)
+        row_ids = top if rows is None else rows[top]
+        return [(self._ids[row], float(similarities[i])) for row, i in zip(row_ids.tolist(), top.tolist())]
+
+    def _hnsw_top_k(self, index, query_embedding, k: int, allowed: Optional[Collection[str]]) -> Optional[List[Tuple[str, float]]]:
+        """top_k through the HNSW graph (None when a filter leaves too few candidates, so exact search is used)"""
+        query = self._normalized_query(query_embedding)
+        if query is None:
+            return []
+        count = len(self._ids)
+        candidates = min(count, k if allowed is None else k * self.HNSW_FILTER_OVERSAMPLE)
+        scores, rows = index.search(query[np.newaxis, :], candidates)
+        ranked = []
+        for row, score in zip(rows[0].tolist(), scores[0].tolist()):
+            if row < 0:
+                continue
+            resume_id = self._ids[row]
+            if allowed is None or resume_id in allowed:
+                ranked.append((resume_id, float(score)))
+                if len(ranked) == k:
+                    return ranked
+        # A selective filter removed too many candidates; fall back to scoring every row
+        return ranked if candidates == count else None
@@ -14,13 +14,18 @@ setup(
         "pdfplumber==0.9.0",
         "PyMuPDF==1.22.3",
         "python-dotenv==1.0.0",
-        "httpx==0.23.3",
+        "httpx[http2]==0.23.3",
         "supabase==1.0.3",
         "numpy==1.24.3",
-        "scikit-learn==1.2.2",
         "transformers==4.29.2",
         "sentence-transformers==2.2.2",
         "llama-cpp-python==0.2.19",
+        "orjson==3.9.10",
+        "datasketch==1.6.4",
+        "faiss-cpu==1.7.4",
+        "ijson==3.2.3",
+        "numba==0.58.1",
+        "hyperscan==0.9.1; platform_machine == 'x86_64'",
     ],
     python_requires=">=3.11",
 ) 
\ No newline at end of file
@@ -0,0 +1,53 @@
+import asyncio
+
+from services.batch_service import AsyncBatcher
+
+
+def test_slow_batch_does_not_block_later_batches():
+    release_first = asyncio.Event()
+
+    async def batch_fn(items):
+        if "slow" in items:
+            await release_first.wait()
+        return [item.upper() for item in items]
+
+    async def run():
+        batcher = AsyncBatcher(batch_fn, max_batch=1, max_wait_ms=0, max_concurrency=2)
+        slow = asyncio.create_task(batcher.submit("slow"))
+        await asyncio.sleep(0)
+        fast = await asyncio.wait_for(batcher.submit("fast"), timeout=1)
+        release_first.set()
+        return fast, await slow
+
+    assert asyncio.run(run()) == ("FAST", "SLOW")
+
+
+def test_wrong_number_of_results_fails_every_caller():
+    async def batch_fn(items):
+        return items[:1]
+
+    async def run():
+        batcher = AsyncBatcher(batch_fn, max_batch=3, max_wait_ms=50)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True),
+            timeout=1
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_close_fails_waiting_callers():
+    async def batch_fn(items):
+        await asyncio.Event().wait()
+
+    async def run():
+        batcher = AsyncBatcher(batch_fn, max_batch=1, max_wait_ms=0)
+        # The first item occupies the only slot; the others wait in the consumer or the queue
+        waiting = [asyncio.create_task(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        await batcher.close()
+        return await asyncio.wait_for(asyncio.gather(*waiting, return_exceptions=True), timeout=1)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+import orjson
+import pytest
+
+from services import openrouter_service
+
+
+class _ChunkedStream(httpx.AsyncByteStream):
+    """Response body delivered in small chunks, like a real streamed /models listing"""
+
+    def __init__(self, body: bytes, chunk_size: int = 4096):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    async def __aiter__(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+
+def _models_listing(*model_ids: str) -> bytes:
+    models = [{"id": model_id, "description": "x" * 200} for model_id in model_ids]
+    return orjson.dumps({"data": models})
+
+
+def _model_status(body: bytes):
+    def handler(request):
+        return httpx.Response(200, stream=_ChunkedStream(body))
+
+    async def check():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await openrouter_service.get_openrouter_model_status(client=client)
+
+    return asyncio.run(check())
+
+
+@pytest.fixture(autouse=True)
+def reset_model_status_cache():
+    openrouter_service._model_status_cache.update(checked_at=0.0, status=None)
+    yield
+    openrouter_service._model_status_cache.update(checked_at=0.0, status=None)
+
+
+def test_model_listed_before_end_of_listing_is_available():
+    other_models = [f"vendor/model-{i}" for i in range(2000)]
+    status = _model_status(_models_listing(openrouter_service.OPENROUTER_MODEL, *other_models))
+    assert status["status"] == "available"
+    assert not status.get("using_fallback")
+
+
+def test_model_listed_last_is_available():
+    other_models = [f"vendor/model-{i}" for i in range(2000)]
+    status = _model_status(_models_listing(*other_models, openrouter_service.OPENROUTER_MODEL))
+    assert status["status"] == "available"
+    assert not status.get("using_fallback")
+
+
+def test_model_missing_from_listing_is_unavailable():
+    status = _model_status(_models_listing(*(f"vendor/model-{i}" for i in range(2000))))
+    assert status["status"] == "unavailable"
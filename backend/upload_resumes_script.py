@@ -1,5 +1,9 @@
 import os
+import random
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 from pathlib import Path
 import asyncio # For async API calls if needed
@@ -8,6 +12,44 @@ import asyncio # For async API calls if needed
 RESUMES_SOURCE_DIR = Path("../Resumes")
 BACKEND_UPLOAD_URL = "http://localhost:8000/api/resumes/upload"
 BACKEND_ANALYZE_URL = "http://localhost:8000/api/resumes/analyze"
+# Resumes processed at once; matches the session's connection pool size
+UPLOAD_CONCURRENCY = 10
+
+class JitteredRetry(Retry):
+    """Retry policy with exponential backoff capped at 30s, plus random jitter so many clients don't retry in lockstep"""
+
+    MAX_BACKOFF = 30.0
+    JITTER = 0.5
+
+    def get_backoff_time(self):
+        delay = min(super().get_backoff_time(), self.MAX_BACKOFF)
+        return delay + random.uniform(0, self.JITTER * delay)
+
+    def sleep_for_retry(self, response=None):
+        # Honour Retry-After (e.g. on 429), with the same jitter on top
+        retry_after = self.get_retry_after(response) if response is not None else None
+        if retry_after:
+            time.sleep(retry_after + random.uniform(0, self.JITTER * retry_after))
+            return True
+        return False
+
+# Transient rate-limit/gateway errors are retried instead of failing the file outright;
+# read errors are not retried, since the backend may already have processed the upload
+RETRY_POLICY = JitteredRetry(
+    total=3,
+    read=0,
+    backoff_factor=1.0,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET", "POST"],
+    respect_retry_after_header=True,
+    raise_on_status=False
+)
+
+# One session for every request so the connection to the backend is kept alive and reused
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=RETRY_POLICY)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
 
 async def upload_single_resume(file_path: Path):
     print(f"Processing {file_path.name}...")
@@ -18,12 +60,12 @@ async def upload_single_resume(file_path: Path):
             # For PDF, we'll send the file directly to the analyze endpoint
             with open(file_path, "rb") as f:
                 files = {'file': (file_path.name, f, 'application/pdf')}
-                analyze_response = requests.post(BACKEND_ANALYZE_URL, files=files)
+                analyze_response = await asyncio.to_thread(SESSION.post, BACKEND_ANALYZE_URL, files=files)
         elif file_path.suffix.lower() == ".txt":
             # For TXT, read content and send as text
             with open(file_path, "r", encoding="utf-8") as f:
                 text_content = f.read()
-            analyze_response = requests.post(BACKEND_ANALYZE_URL, json={"text": text_content})
+            analyze_response = await asyncio.to_thread(SESSION.post, BACKEND_ANALYZE_URL, json={"text": text_content})
         else:
             print(f"Skipping {file_path.name}: Unsupported file type for analysis.")
             return
@@ -58,7 +100,7 @@ async def upload_single_resume(file_path: Path):
         with open(file_path, "rb") as f:
             files = {'file': (file_path.name, f, 'application/pdf' if file_path.suffix.lower() == '.pdf' else 'text/plain')}
             data = {'metadata': json.dumps(metadata)}
-            upload_response = requests.post(BACKEND_UPLOAD_URL, files=files, data=data)
+            upload_response = await asyncio.to_thread(SESSION.post, BACKEND_UPLOAD_URL, files=files, data=data)
             upload_response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
             print(f"Successfully uploaded {file_path.name}")
             print(upload_response.json())
@@ -78,8 +120,15 @@ async def main():
         print(f"No PDF or TXT resume files found in '{RESUMES_SOURCE_DIR.resolve()}'.")
         return
 
-    for resume_file in resume_files:
-        await upload_single_resume(resume_file)
+    # The requests are network-bound, so run them side by side on worker threads;
+    # total time is roughly the slowest batch instead of the sum of every request
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+    async def upload_with_limit(resume_file: Path):
+        async with semaphore:
+            await upload_single_resume(resume_file)
+
+    await asyncio.gather(*(upload_with_limit(resume_file) for resume_file in resume_files))
     print("Resume upload process completed.")
 
 if __name__ == "__main__":